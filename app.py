@@ -1,5 +1,6 @@
 import streamlit as st
 import os
+from database.connection import query_stats
 from database.models import initialize_database, seed_initial_data
 from pages.booking import show_booking_page
 from pages.staff import show_staff_page
@@ -24,6 +25,9 @@ def init_database():
 def main():
     """Main application entry point"""
 
+    # Count database queries per script run for the Diagnostics page
+    query_stats.begin_render(st.session_state.get('page', 'public'))
+
     # Inject custom CSS
     inject_custom_css()
 
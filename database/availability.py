@@ -0,0 +1,374 @@
+"""
+In-memory interval index for unit availability
+
+Staff pages ask the same "is this unit free?" questions many times per
+rerun. AvailabilityIndex loads every booking in a blocking status, every
+unit_blocks range and every unexpired booking hold once (four reads in one
+batch), keeps them per unit as intervals sorted by start with a running
+maximum of end dates, and then answers overlap questions with a binary
+search instead of a query.
+
+Writes made through BookingOperations call invalidate() after they commit;
+the index also reloads after AVAILABILITY_INDEX_TTL seconds so changes made
+by other processes are picked up, and as soon as its earliest hold expires.
+Loads always read the Turso primary, never the local replica, so a write
+that invalidated the index is in the next load.
+Checks inside transaction() always go to the database, which is
+authoritative while the write lock is held.
+"""
+
+import logging
+import threading
+import time
+import heapq
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+from database.connection import config, get_db_connection
+
+
+def _iso(value) -> str:
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+class UnitIntervals:
+    """
+    Busy intervals of one unit, sorted by start date
+
+    Dates are ISO strings, compared the same way SQLite compares them.
+    ends_max[i] is the latest end among intervals 0..i, so every interval
+    that could overlap [start, end) lies before bisect_left(starts, end),
+    and one of them does iff ends_max there is after start.
+    """
+
+    __slots__ = ('starts', 'ends', 'ends_max', 'sources')
+
+    def __init__(self, intervals):
+        intervals = sorted(intervals)
+        self.starts = [interval[0] for interval in intervals]
+        self.ends = [interval[1] for interval in intervals]
+        # ('booking', booking id), ('block', unit_blocks id) or ('hold', wizard session id)
+        self.sources = [interval[2] for interval in intervals]
+        self.ends_max = []
+        latest = ""
+        for end in self.ends:
+            latest = max(latest, end)
+            self.ends_max.append(latest)
+
+    def overlaps(self, start: str, end: str) -> bool:
+        k = bisect_left(self.starts, end)
+        return k > 0 and self.ends_max[k - 1] > start
+
+    def overlapping(self, start: str, end: str) -> List[int]:
+        """Positions of intervals overlapping [start, end), latest start first"""
+        positions = []
+        i = bisect_left(self.starts, end) - 1
+        # ends_max only grows with i, so stop once nothing earlier can reach start
+        while i >= 0 and self.ends_max[i] > start:
+            if self.ends[i] > start:
+                positions.append(i)
+            i -= 1
+        return positions
+
+    def free_gaps(self, earliest: str, latest: str):
+        """Yield the free (start, end) gaps inside [earliest, latest), in date order"""
+        # ends_max is sorted, so skip every interval over before earliest
+        i = bisect_right(self.ends_max, earliest)
+        cursor = earliest
+        while i < len(self.starts) and self.starts[i] < latest:
+            if self.starts[i] > cursor:
+                yield cursor, self.starts[i]
+            cursor = max(cursor, self.ends[i])
+            i += 1
+        if cursor < latest:
+            yield cursor, latest
+
+    def __len__(self):
+        return len(self.starts)
+
+
+class _Snapshot:
+    """One load of the index; replaced whole so readers never see a partial load"""
+
+    __slots__ = ('version', 'key', 'statuses', 'loaded_at', 'expires_at', 'units', 'unit_order', 'intervals')
+
+    def __init__(self, version, key, statuses, units, intervals, hold_seconds=None):
+        self.version = version
+        self.key = key
+        self.statuses = statuses
+        self.loaded_at = time.monotonic()
+        # The first hold to expire frees its dates, so the load is stale from then
+        self.expires_at = self.loaded_at + hold_seconds if hold_seconds is not None else float('inf')
+        self.units = {unit['id']: unit for unit in units}
+        self.unit_order = [unit['id'] for unit in units]
+        self.intervals = intervals
+
+    def is_free(self, unit_id: int, start: str, end: str, allowed=()) -> bool:
+        """No interval overlaps [start, end) except those whose source is in allowed"""
+        intervals = self.intervals.get(unit_id)
+        if intervals is None:
+            return True
+        if not allowed:
+            return not intervals.overlaps(start, end)
+        return all(intervals.sources[i] in allowed for i in intervals.overlapping(start, end))
+
+    def free_units(self, check_in, check_out, guests: int = 1,
+                   hold_session_id: Optional[str] = None) -> List[Dict]:
+        """Active units with room for guests and no interval overlapping the dates"""
+        start, end = _iso(check_in), _iso(check_out)
+        allowed = (('hold', hold_session_id),) if hold_session_id else ()
+        free = []
+        for unit_id in self.unit_order:
+            unit = self.units[unit_id]
+            if not unit.get('is_active') or (unit.get('capacity') or 0) < guests:
+                continue
+            if self.is_free(unit_id, start, end, allowed):
+                free.append(dict(unit))
+        return free
+
+    def fitting_gaps(self, stay: timedelta, guests: int, earliest: date, latest: date,
+                     location: Optional[str] = None):
+        """(display order, unit id, gap start, gap end) for every free gap that fits the stay"""
+        for order, unit_id in enumerate(self.unit_order):
+            unit = self.units[unit_id]
+            if (not unit.get('is_active') or (unit.get('capacity') or 0) < guests
+                    or (location and unit.get('location') != location)):
+                continue
+            intervals = self.intervals.get(unit_id)
+            gaps = (intervals.free_gaps(earliest.isoformat(), latest.isoformat()) if intervals
+                    else [(earliest.isoformat(), latest.isoformat())])
+            for gap_start, gap_end in gaps:
+                gap_start, gap_end = date.fromisoformat(gap_start[:10]), date.fromisoformat(gap_end[:10])
+                if gap_end - gap_start >= stay:
+                    yield order, unit_id, gap_start, gap_end
+
+
+def _database_key() -> tuple:
+    settings = config.settings
+    return (settings.backend, settings.turso_url if settings.use_turso else settings.local_db_path)
+
+
+class AvailabilityIndex:
+    """Per-unit busy intervals loaded from the database, refreshed on demand"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._snapshot: Optional[_Snapshot] = None
+        self.loads = 0
+
+    def invalidate(self):
+        """Drop the loaded data; the next question reloads it"""
+        with self._lock:
+            self._version += 1
+
+    def _fresh(self, snapshot: Optional[_Snapshot]) -> bool:
+        settings = config.settings
+        return (snapshot is not None
+                and snapshot.version == self._version
+                and snapshot.key == _database_key()
+                and snapshot.statuses == settings.blocking_statuses
+                and time.monotonic() - snapshot.loaded_at <= settings.availability_index_ttl
+                and time.monotonic() < snapshot.expires_at)
+
+    def _current(self) -> _Snapshot:
+        snapshot = self._snapshot
+        if self._fresh(snapshot):
+            return snapshot
+        with self._lock:
+            if not self._fresh(self._snapshot):
+                self._snapshot = self._load()
+            return self._snapshot
+
+    def _load(self, window: Optional[tuple] = None, statuses: Optional[tuple] = None) -> _Snapshot:
+        """Read units and busy intervals; window=(start, end) limits them to one date range"""
+        statuses = tuple(statuses) if statuses else config.settings.blocking_statuses
+        placeholders = ", ".join("?" for _ in statuses)
+        booking_range = block_range = hold_range = ""
+        range_params = ()
+        if window:
+            booking_range = hold_range = "AND check_out > ? AND check_in < ?"
+            block_range = "WHERE end_date > ? AND start_date < ?"
+            range_params = (_iso(window[0]), _iso(window[1]))
+        started = time.perf_counter()
+
+        # Read the primary: a lagging replica's answer would be cached as fresh for every session
+        conn = get_db_connection(primary=True)
+        try:
+            units_cursor, bookings_cursor, blocks_cursor, holds_cursor = conn.execute_batch([
+                ("SELECT * FROM lodging_units ORDER BY display_order, location, name", ()),
+                (f"""
+                    SELECT id, lodging_unit_id, check_in, check_out FROM booking_requests
+                    WHERE status IN ({placeholders}) AND lodging_unit_id IS NOT NULL {booking_range}
+                """, statuses + range_params),
+                (f"SELECT id, lodging_unit_id, start_date, end_date FROM unit_blocks {block_range}", range_params),
+                # Seconds each hold has left, so the load knows when it goes stale
+                (f"""
+                    SELECT session_id, lodging_unit_id, check_in, check_out,
+                           (julianday(expires_at) - julianday('now')) * 86400
+                    FROM booking_holds WHERE expires_at > CURRENT_TIMESTAMP {hold_range}
+                """, range_params),
+            ])
+            units = [dict(row) for row in units_cursor.fetchall()]
+            bookings = bookings_cursor.fetchall()
+            blocks = blocks_cursor.fetchall()
+            holds = holds_cursor.fetchall()
+        finally:
+            conn.close()
+
+        busy: Dict[int, list] = {}
+        for booking_id, unit_id, check_in, check_out in bookings:
+            busy.setdefault(unit_id, []).append((_iso(check_in), _iso(check_out), ('booking', booking_id)))
+        for block_id, unit_id, start_date, end_date in blocks:
+            busy.setdefault(unit_id, []).append((_iso(start_date), _iso(end_date), ('block', block_id)))
+        for session_id, unit_id, check_in, check_out, seconds_left in holds:
+            busy.setdefault(unit_id, []).append((_iso(check_in), _iso(check_out), ('hold', session_id)))
+
+        self.loads += 1
+        logging.debug(f"Availability index loaded {len(bookings)} bookings, {len(blocks)} blocks and "
+                      f"{len(holds)} holds in {(time.perf_counter() - started) * 1000:.1f}ms")
+        return _Snapshot(self._version, _database_key(), statuses, units,
+                         {unit_id: UnitIntervals(intervals) for unit_id, intervals in busy.items()},
+                         min((max(hold[4], 0) for hold in holds), default=None))
+
+    def is_free(self, lodging_unit_id: int, check_in, check_out,
+                exclude_booking_id: Optional[int] = None, hold_session_id: Optional[str] = None) -> bool:
+        """True if the unit exists and nothing blocks [check_in, check_out)"""
+        snapshot = self._current()
+        if lodging_unit_id not in snapshot.units:
+            return False
+        allowed = []
+        if exclude_booking_id is not None:
+            allowed.append(('booking', exclude_booking_id))
+        if hold_session_id:
+            allowed.append(('hold', hold_session_id))
+        return snapshot.is_free(lodging_unit_id, _iso(check_in), _iso(check_out), allowed)
+
+    def conflicts(self, lodging_unit_id: int, check_in, check_out) -> List[Dict]:
+        """Bookings, blocked ranges and holds overlapping [check_in, check_out), by start date"""
+        intervals = self._current().intervals.get(lodging_unit_id)
+        if intervals is None:
+            return []
+        found = []
+        for i in reversed(intervals.overlapping(_iso(check_in), _iso(check_out))):
+            kind, source_id = intervals.sources[i]
+            found.append({'type': kind, 'booking_id': source_id if kind == 'booking' else None,
+                          'block_id': source_id if kind == 'block' else None,
+                          'start': intervals.starts[i], 'end': intervals.ends[i]})
+        return found
+
+    def free_units(self, check_in, check_out, guests: int = 1,
+                   hold_session_id: Optional[str] = None) -> List[Dict]:
+        """Active units with room for guests that are free for the dates, in display order"""
+        return self._current().free_units(check_in, check_out, guests, hold_session_id)
+
+    def free_units_bulk(self, requests, statuses: Optional[tuple] = None,
+                        use_index: bool = True) -> List[List[Dict]]:
+        """
+        free_units() for many (check_in, check_out, guests) requests at once
+
+        Uses the loaded index when allowed; otherwise reads the intervals
+        overlapping the union of the requested ranges once and answers every
+        request from that.
+        """
+        requests = [(_iso(check_in), _iso(check_out), guests) for check_in, check_out, guests in requests]
+        if not requests:
+            return []
+        if use_index:
+            snapshot = self._current()
+        else:
+            window = (min(r[0] for r in requests), max(r[1] for r in requests))
+            snapshot = self._load(window, statuses)
+        return [snapshot.free_units(check_in, check_out, guests) for check_in, check_out, guests in requests]
+
+    def find_windows(self, nights: int, guests: int = 1, earliest=None, latest=None,
+                     location: Optional[str] = None, limit: int = 5, prefer: str = 'soonest',
+                     target=None) -> List[Dict]:
+        """
+        Top free stays of `nights` nights between earliest and latest (last check-out)
+
+        One pass over each unit's sorted intervals collects the free gaps and
+        keeps one candidate stay per gap. prefer ranks the candidates:
+        'soonest' (earliest check-in), 'best_fit' (tightest gap, leaving the
+        fewest unusable nights) or 'closest' (check-in nearest target).
+        """
+        earliest = date.fromisoformat(_iso(earliest or date.today())[:10])
+        latest = date.fromisoformat(_iso(latest or earliest + timedelta(days=90))[:10])
+        target = date.fromisoformat(_iso(target or earliest)[:10])
+        stay = timedelta(days=nights)
+        snapshot = self._search_snapshot()
+
+        candidates = []
+        for order, unit_id, gap_start, gap_end in snapshot.fitting_gaps(stay, guests, earliest, latest, location):
+            check_in = min(max(target, gap_start), gap_end - stay) if prefer == 'closest' else gap_start
+            # A gap running to `latest` is open-ended, so it never fits tightly
+            slack = (gap_end - gap_start - stay).days if gap_end < latest else float('inf')
+            if prefer == 'best_fit':
+                key = (slack, check_in, order)
+            elif prefer == 'closest':
+                key = (abs((check_in - target).days), check_in, slack, order)
+            else:
+                key = (check_in, slack, order)
+            candidates.append((key, unit_id, check_in, gap_end - gap_start))
+
+        windows = []
+        for key, unit_id, check_in, gap in heapq.nsmallest(limit, candidates, key=lambda c: c[0]):
+            windows.append({
+                'lodging_unit_id': unit_id,
+                'unit': dict(snapshot.units[unit_id]),
+                'check_in': check_in,
+                'check_out': check_in + stay,
+                'free_nights': gap.days,
+            })
+        return windows
+
+    def suggest_dates(self, nights: int, target, guests: int = 1, earliest=None, latest=None,
+                      location: Optional[str] = None, limit: int = 5) -> List[Dict]:
+        """
+        The `limit` distinct stays of `nights` nights with check-in nearest target
+
+        Many units are usually free for the same dates, so candidates are
+        grouped by date pair before ranking: each suggestion has check_in,
+        check_out and the units free for it, in display order. Within one
+        gap only its `limit` check-ins nearest target can make the cut.
+        """
+        target = date.fromisoformat(_iso(target)[:10])
+        earliest = date.fromisoformat(_iso(earliest or date.today())[:10])
+        latest = date.fromisoformat(_iso(latest or earliest + timedelta(days=90))[:10])
+        stay = timedelta(days=nights)
+        snapshot = self._search_snapshot()
+        closeness = lambda day: (abs((day - target).days), day)
+
+        free_for = {}  # check-in -> unit ids, in display order
+        for order, unit_id, gap_start, gap_end in snapshot.fitting_gaps(stay, guests, earliest, latest, location):
+            last_check_in = gap_end - stay
+            nearest = min(max(target, gap_start), last_check_in)
+            first = max(gap_start, nearest - timedelta(days=limit))
+            span = (min(last_check_in, nearest + timedelta(days=limit)) - first).days + 1
+            for check_in in heapq.nsmallest(limit, (first + timedelta(days=i) for i in range(span)), key=closeness):
+                free_for.setdefault(check_in, []).append(unit_id)
+
+        return [{
+            'check_in': check_in,
+            'check_out': check_in + stay,
+            'units': [dict(snapshot.units[unit_id]) for unit_id in free_for[check_in]],
+        } for check_in in heapq.nsmallest(limit, free_for, key=closeness)]
+
+    def _search_snapshot(self):
+        # The search needs every interval; without the index, load them just for this call
+        return self._current() if config.settings.availability_index_enabled else self._load()
+
+    def stats(self) -> Dict:
+        """Summary for the Diagnostics page"""
+        snapshot = self._snapshot
+        return {
+            'enabled': config.settings.availability_index_enabled,
+            'loads': self.loads,
+            'units': len(snapshot.units) if snapshot else 0,
+            'intervals': sum(len(intervals) for intervals in snapshot.intervals.values()) if snapshot else 0,
+            'age_seconds': round(time.monotonic() - snapshot.loaded_at, 1) if snapshot else None,
+        }
+
+
+availability_index = AvailabilityIndex()
@@ -5,7 +5,18 @@ Supports both local SQLite and Turso cloud database
 
 import sqlite3
 import os
+import random
+import re
+import sys
+import time
+import atexit
 import logging
+import threading
+import weakref
+from collections import Counter, deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional
 
 # Try to import Turso client (optional for local development)
@@ -23,8 +34,56 @@ try:
 except ImportError:
     USE_STREAMLIT = False
 
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """Immutable snapshot of the resolved database configuration"""
+
+    use_turso: bool
+    turso_url: Optional[str]
+    turso_auth_token: Optional[str]
+    local_db_path: str
+    sqlite_max_lifetime: float
+    turso_batch_size: int
+    turso_replica_path: Optional[str]
+    turso_replica_max_staleness: float
+    turso_replica_sync_on_write: bool
+    stream_page_size: int
+    turso_pool_size: int
+    turso_pool_max_clients: int
+    turso_pool_checkout_timeout: float
+    turso_idle_timeout: float
+    turso_health_check_interval: float
+    turso_retry_attempts: int
+    turso_retry_base_delay: float
+    turso_retry_max_delay: float
+    turso_breaker_threshold: int
+    turso_breaker_reset_timeout: float
+    blocking_statuses: tuple
+    query_stats_enabled: bool
+    slow_query_ms: float
+    slow_query_log_path: Optional[str]
+    availability_index_enabled: bool
+    availability_index_ttl: float
+    booking_hold_ttl: float
+    booking_hold_sweep_interval: float
+
+    @property
+    def backend(self) -> str:
+        """Name of the configured backend: 'turso' or 'sqlite'"""
+        return "turso" if self.use_turso else "sqlite"
+
+
 class DatabaseConfig:
-    """Database configuration from environment or Streamlit secrets"""
+    """
+    Database configuration from environment or Streamlit secrets
+
+    Values are resolved once into a DatabaseSettings snapshot on first use;
+    call reload() after changing secrets or environment variables.
+    """
+
+    def __init__(self):
+        self._settings: Optional[DatabaseSettings] = None
+        self._lock = threading.Lock()
 
     @staticmethod
     def get(key: str, default: Optional[str] = None) -> Optional[str]:
@@ -36,32 +95,342 @@ class DatabaseConfig:
                 return os.getenv(key, default)
         return os.getenv(key, default)
 
+    @classmethod
+    def resolve(cls) -> DatabaseSettings:
+        """Read every database setting from secrets/environment"""
+        get = cls.get
+        return DatabaseSettings(
+            # Turso is only used when requested and the client is installed
+            use_turso=get("USE_TURSO", "false").lower() == "true" and TURSO_AVAILABLE,
+            turso_url=get("TURSO_DATABASE_URL"),
+            turso_auth_token=get("TURSO_AUTH_TOKEN"),
+            local_db_path=get("DATABASE_PATH", "wellspring_bookings.db"),
+            # Seconds a cached per-thread SQLite connection is reused before reopening
+            sqlite_max_lifetime=float(get("SQLITE_CONNECTION_MAX_LIFETIME", "300")),
+            # Maximum statements sent in one Turso batch request
+            turso_batch_size=int(get("TURSO_BATCH_SIZE", "500")),
+            # Local SQLite file that mirrors Turso for reads (unset disables replica mode)
+            turso_replica_path=get("TURSO_REPLICA_PATH") or None,
+            # Seconds replica data may lag the primary before reads go to Turso
+            turso_replica_max_staleness=float(get("TURSO_REPLICA_MAX_STALENESS", "30")),
+            # Refresh the replica in the background after every write
+            turso_replica_sync_on_write=get("TURSO_REPLICA_SYNC_ON_WRITE", "true").lower() == "true",
+            # Rows fetched per page when streaming large reads
+            stream_page_size=int(get("DB_STREAM_PAGE_SIZE", "500")),
+            # Maximum number of idle Turso clients kept alive for reuse
+            turso_pool_size=int(get("TURSO_POOL_SIZE", "4")),
+            # Maximum Turso clients checked out at once; further requests wait for one
+            turso_pool_max_clients=int(get("TURSO_POOL_MAX_CLIENTS", "16")),
+            # Seconds a request waits for a free client before failing
+            turso_pool_checkout_timeout=float(get("TURSO_POOL_CHECKOUT_TIMEOUT", "10")),
+            # Seconds an idle Turso client may sit in the pool before eviction
+            turso_idle_timeout=float(get("TURSO_POOL_IDLE_TIMEOUT", "300")),
+            # Idle seconds after which a pooled client is pinged before reuse
+            turso_health_check_interval=float(get("TURSO_HEALTH_CHECK_INTERVAL", "30")),
+            # Extra attempts for a Turso request after a connection or server error
+            turso_retry_attempts=int(get("TURSO_RETRY_ATTEMPTS", "2")),
+            # First retry waits up to this many seconds, doubling per attempt (with jitter)
+            turso_retry_base_delay=float(get("TURSO_RETRY_BASE_DELAY", "0.2")),
+            # Upper bound in seconds for a single retry delay
+            turso_retry_max_delay=float(get("TURSO_RETRY_MAX_DELAY", "2")),
+            # Consecutive failed Turso requests that open the circuit breaker
+            turso_breaker_threshold=int(get("TURSO_BREAKER_THRESHOLD", "5")),
+            # Seconds the breaker stays open before letting a trial request through
+            turso_breaker_reset_timeout=float(get("TURSO_BREAKER_RESET_TIMEOUT", "30")),
+            # Booking statuses that hold a unit's dates (others leave the unit free)
+            blocking_statuses=tuple(
+                status.strip() for status in get("BOOKING_BLOCKING_STATUSES", "pending,confirmed").split(",")
+                if status.strip()
+            ),
+            # Record per-query timings for the staff Diagnostics panel (off by default:
+            # each recorded statement walks the stack to find its call site)
+            query_stats_enabled=get("QUERY_STATS_ENABLED", "false").lower() == "true",
+            # Statements slower than this many milliseconds go to the slow-query log
+            slow_query_ms=float(get("SLOW_QUERY_MS", "200")),
+            # File that receives slow-query log lines (unset logs through the root logger only)
+            slow_query_log_path=get("SLOW_QUERY_LOG") or None,
+            # Answer availability checks from an in-memory interval index
+            availability_index_enabled=get("AVAILABILITY_INDEX", "true").lower() == "true",
+            # Seconds the index is trusted before reloading (catches other processes' writes)
+            availability_index_ttl=float(get("AVAILABILITY_INDEX_TTL", "30")),
+            # Seconds a unit picked in the public booking wizard is held for that guest
+            booking_hold_ttl=float(get("BOOKING_HOLD_TTL", "600")),
+            # Seconds between background purges of expired holds
+            booking_hold_sweep_interval=float(get("BOOKING_HOLD_SWEEP_INTERVAL", "60")),
+        )
+
+    @property
+    def settings(self) -> DatabaseSettings:
+        """Current configuration snapshot, resolved on first access"""
+        settings = self._settings
+        if settings is None:
+            with self._lock:
+                if self._settings is None:
+                    self._settings = self.resolve()
+                settings = self._settings
+        return settings
+
+    def reload(self) -> DatabaseSettings:
+        """Re-read configuration (after secret rotation or in tests)"""
+        settings = self.resolve()
+        with self._lock:
+            self._settings = settings
+        return settings
+
+    @property
+    def backend(self) -> str:
+        """Name of the configured backend: 'turso' or 'sqlite'"""
+        return self.settings.backend
+
     @property
     def use_turso(self) -> bool:
         """Check if Turso should be used"""
-        return self.get("USE_TURSO", "false").lower() == "true" and TURSO_AVAILABLE
+        return self.settings.use_turso
 
     @property
     def turso_url(self) -> Optional[str]:
         """Get Turso database URL"""
-        return self.get("TURSO_DATABASE_URL")
+        return self.settings.turso_url
 
     @property
     def turso_auth_token(self) -> Optional[str]:
         """Get Turso auth token"""
-        return self.get("TURSO_AUTH_TOKEN")
+        return self.settings.turso_auth_token
 
     @property
     def local_db_path(self) -> str:
         """Get local database path"""
-        return self.get("DATABASE_PATH", "wellspring_bookings.db")
+        return self.settings.local_db_path
 
 
 # Global config instance
 config = DatabaseConfig()
 
 
-def get_db_connection():
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_TRANSACTION_CONTROL = ("begin", "commit", "rollback", "savepoint", "release")
+
+
+@lru_cache(maxsize=1024)
+def fingerprint_sql(sql: str) -> str:
+    """Normalise a statement so queries differing only in literals group together"""
+    text = " ".join(sql.split())
+    text = _STRING_LITERAL.sub("?", text)
+    text = _NUMBER_LITERAL.sub("?", text)
+    return _PLACEHOLDER_LIST.sub("(...)", text)
+
+
+def _call_site() -> str:
+    """Qualified name of the nearest caller outside this module"""
+    frame = sys._getframe(2)
+    while frame is not None and frame.f_code.co_filename == __file__:
+        frame = frame.f_back
+    if frame is None:
+        return "unknown"
+    code = frame.f_code
+    return getattr(code, 'co_qualname', code.co_name)
+
+
+class QueryRecord:
+    """One executed statement as seen by the instrumentation hook"""
+
+    __slots__ = ('sql', 'fingerprint', 'param_count', 'backend', 'duration_ms',
+                 'rows', 'call_site', 'session', 'recorded_at', 'batch_size')
+
+    def __init__(self, sql, param_count, backend, duration_ms, rows, call_site,
+                 session, batch_size=1):
+        self.sql = sql
+        self.fingerprint = fingerprint_sql(sql)
+        self.param_count = param_count
+        self.backend = backend
+        self.duration_ms = duration_ms
+        self.rows = rows
+        self.call_site = call_site
+        self.session = session
+        self.recorded_at = time.time()
+        self.batch_size = batch_size
+
+    def as_dict(self) -> dict:
+        return {
+            'fingerprint': self.fingerprint,
+            'params': self.param_count,
+            'backend': self.backend,
+            'duration_ms': round(self.duration_ms, 2),
+            'rows': self.rows,
+            'call_site': self.call_site,
+            'batch_size': self.batch_size,
+            'recorded_at': self.recorded_at,
+        }
+
+
+class QueryInstrumentation:
+    """
+    Collects timings for every statement the database layer runs
+
+    Statements are aggregated by fingerprint and by page render (see
+    begin_render()) while QUERY_STATS_ENABLED is set or a listener is
+    registered; anything slower than SLOW_QUERY_MS is written to the
+    slow-query log either way. Listeners added with add_listener() receive
+    each QueryRecord together with its parameters.
+    """
+
+    def __init__(self, history_size: int = 200, max_sessions: int = 100):
+        self._lock = threading.Lock()
+        self._listeners = []
+        self._fingerprints = {}
+        self._renders = {}  # session -> [previous render, current render]
+        self._max_sessions = max_sessions
+        self.slow_queries = deque(maxlen=history_size)
+        self._slow_log = logging.getLogger("wellspring.slow_queries")
+        self._slow_log_path = None
+
+    @property
+    def enabled(self) -> bool:
+        return config.settings.query_stats_enabled or bool(self._listeners)
+
+    def add_listener(self, listener):
+        """Call listener(record, parameters) for every recorded statement"""
+        with self._lock:
+            self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        with self._lock:
+            if listener in self._listeners:
+                self._listeners.remove(listener)
+
+    def begin_render(self, label: str = ""):
+        """Start counting queries for a new script run of the current session"""
+        session = _session_key()
+        render = {'label': label, 'started_at': time.time(), 'queries': 0,
+                  'duration_ms': 0.0, 'rows': 0, 'call_sites': Counter()}
+        with self._lock:
+            previous = self._renders.pop(session, [None, None])[1]
+            self._renders[session] = [previous, render]
+            while len(self._renders) > self._max_sessions:
+                self._renders.pop(next(iter(self._renders)))
+
+    def render_stats(self, session=None):
+        """(previous, current) render counters for a session"""
+        with self._lock:
+            previous, current = self._renders.get(
+                session if session is not None else _session_key(), [None, None])
+            return _copy_render(previous), _copy_render(current)
+
+    def record(self, sql: str, parameters, backend: str, duration_ms: float,
+               rows: int = 0, batch_size: int = 1) -> Optional[QueryRecord]:
+        """Record one executed statement"""
+        if sql.lstrip()[:9].lower().startswith(_TRANSACTION_CONTROL):
+            return None
+        if not self.enabled:
+            # Only slow statements pay for the call-site lookup
+            if duration_ms >= config.settings.slow_query_ms:
+                self._log_slow(QueryRecord(sql, len(parameters) if parameters else 0, backend,
+                                           duration_ms, rows, _call_site(), _session_key(), batch_size))
+            return None
+
+        record = QueryRecord(sql, len(parameters) if parameters else 0, backend, duration_ms,
+                             rows, _call_site(), _session_key(), batch_size)
+        with self._lock:
+            stats = self._fingerprints.get(record.fingerprint)
+            if stats is None:
+                stats = self._fingerprints[record.fingerprint] = {
+                    'fingerprint': record.fingerprint, 'backend': backend, 'calls': 0,
+                    'total_ms': 0.0, 'max_ms': 0.0, 'rows': 0, 'call_sites': set(),
+                }
+            stats['calls'] += 1
+            stats['total_ms'] += duration_ms
+            stats['max_ms'] = max(stats['max_ms'], duration_ms)
+            stats['rows'] += rows
+            stats['call_sites'].add(record.call_site)
+
+            render = self._renders.get(record.session, [None, None])[1]
+            if render is not None:
+                render['queries'] += 1
+                render['duration_ms'] += duration_ms
+                render['rows'] += rows
+                render['call_sites'][record.call_site] += 1
+            listeners = list(self._listeners)
+
+        if duration_ms >= config.settings.slow_query_ms:
+            self._log_slow(record)
+        for listener in listeners:
+            try:
+                listener(record, parameters)
+            except Exception as e:
+                logging.error(f"Query listener failed: {e}")
+        return record
+
+    def add_fetch(self, record: QueryRecord, rows: int, duration_ms: float):
+        """Add rows fetched lazily after execute() to an existing record"""
+        threshold = config.settings.slow_query_ms
+        was_slow = record.duration_ms >= threshold
+        with self._lock:
+            record.rows += rows
+            record.duration_ms += duration_ms
+            stats = self._fingerprints.get(record.fingerprint)
+            if stats is not None:
+                stats['rows'] += rows
+                stats['total_ms'] += duration_ms
+                stats['max_ms'] = max(stats['max_ms'], record.duration_ms)
+            render = self._renders.get(record.session, [None, None])[1]
+            if render is not None:
+                render['rows'] += rows
+                render['duration_ms'] += duration_ms
+        if not was_slow and record.duration_ms >= threshold:
+            self._log_slow(record)
+
+    def summary(self) -> list:
+        """Per-fingerprint aggregates, slowest total first"""
+        with self._lock:
+            rows = [dict(stats, call_sites=sorted(stats['call_sites']))
+                    for stats in self._fingerprints.values()]
+        for row in rows:
+            row['avg_ms'] = row['total_ms'] / row['calls']
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+    def reset(self):
+        """Forget aggregated statistics and the slow-query history"""
+        with self._lock:
+            self._fingerprints = {}
+            self._renders = {}
+            self.slow_queries.clear()
+
+    def _log_slow(self, record: QueryRecord):
+        self.slow_queries.append(record)
+        self._configure_slow_log()
+        self._slow_log.warning(
+            f"Slow query {record.duration_ms:.1f} ms [{record.backend}] "
+            f"{record.call_site} ({record.param_count} params): {record.fingerprint}"
+        )
+
+    def _configure_slow_log(self):
+        path = config.settings.slow_query_log_path
+        if path == self._slow_log_path:
+            return
+        with self._lock:
+            for handler in list(self._slow_log.handlers):
+                self._slow_log.removeHandler(handler)
+                handler.close()
+            if path:
+                handler = logging.FileHandler(path)
+                handler.setFormatter(logging.Formatter("%(asctime)s %(message)s"))
+                self._slow_log.addHandler(handler)
+            self._slow_log_path = path
+
+
+def _copy_render(render):
+    if render is None:
+        return None
+    return dict(render, call_sites=dict(render['call_sites']))
+
+
+# Global query statistics, shown on the staff Diagnostics page
+query_stats = QueryInstrumentation()
+
+
+def get_db_connection(primary: bool = False):
     """
     Create and return database connection
 
@@ -69,51 +438,975 @@ def get_db_connection():
     - Turso cloud database (production)
     - Local SQLite database (development)
 
+    primary=True never serves reads from the Turso replica, for callers
+    that cache what they read for every session.
+
     Returns:
         Connection object with Row factory enabled
     """
 
-    if config.use_turso:
+    # Inside transaction() every helper shares the pinned connection
+    pinned = getattr(_unit_of_work, 'connection', None)
+    if pinned is not None:
+        pinned.join_transaction()
+        return pinned
+
+    settings = config.settings
+
+    if settings.use_turso:
         # Use Turso cloud database
-        logging.info("Connecting to Turso cloud database")
+        logging.debug("Connecting to Turso cloud database")
 
-        if not config.turso_url or not config.turso_auth_token:
+        if not settings.turso_url or not settings.turso_auth_token:
             raise ValueError(
                 "Turso credentials missing. Set TURSO_DATABASE_URL and TURSO_AUTH_TOKEN"
             )
 
+        # Reuse a pooled client so the keep-alive HTTPS connection survives.
+        # The client is checked out on first use, so replica reads need none;
+        # an unreachable primary raises DatabaseUnavailableError.
+        pool = get_turso_pool()
+        conn = TursoConnectionWrapper(None, pool, None if primary else get_turso_replica())
+        conn.row_factory = Row
+        return conn
+
+    # Use local SQLite database (cached per thread)
+    return _sqlite_connections.get(settings.local_db_path, settings.sqlite_max_lifetime)
+
+
+_unit_of_work = threading.local()
+
+
+@contextmanager
+def transaction():
+    """
+    Run several statements as one unit of work on a single connection
+
+    The outermost block checks out a connection and begins a transaction
+    (BEGIN IMMEDIATE on SQLite, an interactive transaction on Turso). Until
+    it exits, get_db_connection() on this thread returns that connection, so
+    helpers called inside reuse it and their commit()/close() calls are
+    deferred. Nested blocks join the outer one. The transaction commits when
+    the outermost block exits normally and rolls back if it raises.
+
+    Usage:
+        with transaction() as conn:
+            conn.execute(...)
+            BookingOperations.check_availability(...)  # same connection
+    """
+    pinned = getattr(_unit_of_work, 'connection', None)
+    if pinned is not None:
+        yield pinned
+        return
+
+    conn = get_db_connection()
+    try:
+        conn.begin_transaction()
+    except BaseException:
+        conn.close()
+        raise
+
+    _unit_of_work.connection = conn
+    _unit_of_work.after_commit = []
+    try:
+        yield conn
+    except BaseException:
+        _unit_of_work.connection = None
+        _unit_of_work.after_commit = []
+        conn.end_transaction(commit=False)
+        raise
+    else:
+        _unit_of_work.connection = None
+        callbacks, _unit_of_work.after_commit = _unit_of_work.after_commit, []
+        conn.end_transaction(commit=True)
+        for callback in callbacks:
+            callback()
+
+
+def in_transaction() -> bool:
+    """True while this thread is inside a transaction() block"""
+    return getattr(_unit_of_work, 'connection', None) is not None
+
+
+def after_commit(callback):
+    """
+    Run callback once the current unit of work commits
+
+    Outside transaction() it runs immediately; if the transaction rolls
+    back it is dropped.
+    """
+    if in_transaction():
+        _unit_of_work.after_commit.append(callback)
+    else:
+        callback()
+
+
+class PooledSQLiteConnection(sqlite3.Connection):
+    """
+    sqlite3 connection whose close() hands it back to the per-thread cache
+
+    Checkouts are counted so a helper that closes its connection while the
+    caller still holds the same one does not end the caller's transaction.
+    Use dispose() to really close the underlying database handle.
+    """
+
+    backend = "sqlite"
+    # True while a transaction() block owns the connection
+    in_unit_of_work = False
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.path = args[0] if args else kwargs.get('database')
+        self.opened_at = time.monotonic()
+        self.checkouts = 0
+
+    def cursor(self, factory=None):
+        return super().cursor(factory or RowCursor)
+
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
+
+    def commit(self):
+        """Commit, unless a transaction() block will commit later"""
+        if not self.in_unit_of_work:
+            super().commit()
+
+    def begin_transaction(self):
+        """Take the write lock up front so checks and writes see the same data"""
+        self.execute("BEGIN IMMEDIATE")
+        self.in_unit_of_work = True
+
+    def join_transaction(self):
+        """Check the pinned connection out again for a nested helper"""
+        self.checkouts += 1
+
+    def end_transaction(self, commit: bool):
+        """Finish the transaction() block and return the connection"""
+        self.in_unit_of_work = False
         try:
+            if commit:
+                super().commit()
+            elif self.in_transaction:
+                self.rollback()
+        finally:
+            self.close()
+
+    def close(self):
+        """Return the connection, rolling back anything left uncommitted"""
+        if self.checkouts > 0:
+            self.checkouts -= 1
+        if self.checkouts == 0 and self.in_transaction:
+            # Don't leak an abandoned transaction into the next checkout
+            self.rollback()
+
+    def batch(self, statements):
+        """
+        Run (sql, parameters) pairs atomically
+
+        Returns one fully fetched cursor per statement, matching
+        TursoConnectionWrapper.batch().
+        """
+        cursors = []
+        self.execute("SAVEPOINT batch")
+        try:
+            for sql, parameters in statements:
+                cursor = self.execute(sql, parameters or ())
+                cursors.append(_materialize_cursor(cursor))
+        except Exception:
+            self.execute("ROLLBACK TO SAVEPOINT batch")
+            self.execute("RELEASE SAVEPOINT batch")
+            raise
+        self.execute("RELEASE SAVEPOINT batch")
+        return cursors
+
+    def execute_batch(self, statements):
+        """Run several statements in one transaction, returning one cursor each"""
+        return self.batch(statements)
+
+    def stream(self, sql: str, parameters=None, page_size: Optional[int] = None, *,
+               key: str, descending: bool = False):
+        """
+        Yield rows of a query a page at a time with bounded memory
+
+        Pages are read by keyset on key, as on Turso. Each page is fetched
+        completely before its rows are yielded, so no statement (and no
+        read lock) stays open while the caller works through them.
+        """
+        def fetch_page(page_sql, page_params):
+            cursor = self.execute(page_sql, page_params)
+            try:
+                return cursor.fetchall()
+            finally:
+                cursor.close()
+
+        for page in _keyset_pages(fetch_page, sql, parameters, page_size, key, descending):
+            yield from page
+
+    def dispose(self):
+        """Close the underlying SQLite handle"""
+        self.checkouts = 0
+        super().close()
+
+
+class RowCursor(sqlite3.Cursor):
+    """
+    sqlite3 cursor that builds compact Row objects sharing one column map
+
+    Every statement is reported to query_stats; rows fetched afterwards are
+    added to the same record.
+    """
+
+    _query = None
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        super().execute(sql, parameters)
+        elapsed = (time.perf_counter() - started) * 1000
+        if self.description and self.connection.row_factory in (Row, sqlite3.Row):
+            self.row_factory = Row.factory(self.description)
+        self._query = query_stats.record(
+            sql, parameters, getattr(self.connection, 'backend', 'sqlite'), elapsed,
+            0 if self.description else max(self.rowcount, 0),
+        )
+        return self
+
+    def executemany(self, sql, seq_of_parameters):
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_parameters)
+        self._query = query_stats.record(
+            sql, seq_of_parameters[0] if seq_of_parameters else None,
+            getattr(self.connection, 'backend', 'sqlite'),
+            (time.perf_counter() - started) * 1000, max(self.rowcount, 0),
+            batch_size=len(seq_of_parameters),
+        )
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(0 if row is None else 1, started)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(self.arraysize if size is None else size)
+        self._fetched(len(rows), started)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(len(rows), started)
+        return rows
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def _fetched(self, rows: int, started: float):
+        if self._query is not None and rows:
+            query_stats.add_fetch(self._query, rows, (time.perf_counter() - started) * 1000)
+
+
+class SQLiteConnectionManager:
+    """
+    Hands out one cached SQLite connection per thread
+
+    Streamlit runs each session on its own thread, so a thread-local
+    connection avoids reopening the database file and re-reading the schema
+    on every query. Connections are recycled once older than max_lifetime.
+    """
+
+    def __init__(self, backend: str = "sqlite"):
+        self.backend = backend
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._connections = weakref.WeakSet()
+
+    def get(self, path: str, max_lifetime: float) -> PooledSQLiteConnection:
+        """Check out this thread's connection, opening a fresh one if needed"""
+        conn = getattr(self._local, 'connection', None)
+
+        if conn is not None and conn.checkouts == 0:
+            expired = time.monotonic() - conn.opened_at > max_lifetime
+            if expired or conn.path != path:
+                self._dispose(conn)
+                conn = None
+
+        if conn is None:
+            logging.debug(f"Connecting to local SQLite database: {path}")
+            conn = sqlite3.connect(path, check_same_thread=False, factory=PooledSQLiteConnection)
+            conn.row_factory = Row
+            conn.backend = self.backend
+            self._local.connection = conn
+            with self._lock:
+                self._connections.add(conn)
+
+        conn.checkouts += 1
+        return conn
+
+    def reset(self):
+        """Close every cached connection on every thread"""
+        with self._lock:
+            connections = list(self._connections)
+            self._connections = weakref.WeakSet()
+        for conn in connections:
+            try:
+                conn.dispose()
+            except sqlite3.Error:
+                pass
+        self._local = threading.local()
+
+    def _dispose(self, conn):
+        with self._lock:
+            self._connections.discard(conn)
+        self._local.connection = None
+        try:
+            conn.dispose()
+        except sqlite3.Error:
+            pass
+
+
+_sqlite_connections = SQLiteConnectionManager()
+
+
+def _materialize_cursor(cursor):
+    """Fetch a sqlite3 cursor into a standalone cursor that outlives its statement"""
+    columns = tuple(d[0] for d in cursor.description) if cursor.description else ()
+    rows = cursor.fetchall() if columns else []
+    result = StaticResult(columns, rows, max(cursor.rowcount, 0), cursor.lastrowid)
+    # Rows were already built by the connection's row factory
+    return TursoCursorWrapper(result)
+
+
+def _keyset_pages(fetch_page, sql: str, parameters, page_size: Optional[int], key: str,
+                  descending: bool):
+    """
+    Yield a query's rows as fully fetched pages in key order
+
+    fetch_page(sql, parameters) runs one page query and returns its rows.
+    Pages are read by keyset on key (a unique, sortable column of the
+    query) in ascending or descending order. An ORDER BY inside sql does
+    not order the outer query, so LIMIT/OFFSET paging could skip or repeat
+    rows.
+    """
+    size = page_size or config.settings.stream_page_size
+    params = list(parameters or [])
+    order, after = (f'"{key}" DESC', "<") if descending else (f'"{key}"', ">")
+    last_key = None
+
+    while True:
+        if last_key is None:
+            rows = fetch_page(f"SELECT * FROM ({sql}) ORDER BY {order} LIMIT ?", params + [size])
+        else:
+            rows = fetch_page(
+                f'SELECT * FROM ({sql}) WHERE "{key}" {after} ? ORDER BY {order} LIMIT ?',
+                params + [last_key, size],
+            )
+
+        yield rows
+        if len(rows) < size:
+            return
+        last_key = rows[-1][key]
+
+
+def reset_sqlite_connections():
+    """Drop all cached SQLite connections (for tests and after swapping the database file)"""
+    _sqlite_connections.reset()
+
+
+class DatabaseUnavailableError(Exception):
+    """The Turso primary could not be reached (retries exhausted or circuit open)"""
+
+
+class BookingConflictError(ValueError):
+    """A booking write lost to an overlapping booking or block for the same unit"""
+
+
+def _is_connection_error(error: Exception) -> bool:
+    """Check if an error means the Turso client itself is unusable"""
+    if isinstance(error, (ConnectionError, TimeoutError, OSError)):
+        return True
+    if TURSO_AVAILABLE and isinstance(error, libsql_client.LibsqlError):
+        return error.code == "CLIENT_CLOSED"
+    # aiohttp is only present alongside libsql-client
+    return type(error).__module__.startswith("aiohttp")
+
+
+def _classify_error(error: Exception) -> Optional[str]:
+    """
+    Decide how a failed Turso request may be retried
+
+    Returns "connection" when the client is unusable and must be replaced,
+    "transient" for a server-side failure (HTTP 5xx/429) worth retrying, or
+    None for errors a retry cannot fix (SQL errors, constraint violations).
+    """
+    if _is_connection_error(error):
+        return "connection"
+    if TURSO_AVAILABLE and isinstance(error, libsql_client.LibsqlError):
+        return "transient" if error.code == "SERVER_ERROR" else None
+    return None
+
+
+def _is_unsent_error(error: Exception) -> bool:
+    """Check if a request failed before reaching the server, so a write is safe to retry"""
+    if isinstance(error, ConnectionRefusedError):
+        return True
+    if TURSO_AVAILABLE and isinstance(error, libsql_client.LibsqlError):
+        return error.code == "CLIENT_CLOSED"
+    return type(error).__name__ == "ClientConnectorError"
+
+
+def _backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (1-based)"""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the Turso primary is unreachable
+
+    After failure_threshold consecutive failed requests the circuit opens and
+    every call raises DatabaseUnavailableError immediately. Once
+    reset_timeout seconds have passed a single trial request is let through;
+    its outcome closes the circuit again or keeps it open for another period.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = max(failure_threshold, 1)
+        self.reset_timeout = reset_timeout
+
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """'closed', 'open' or 'half-open'"""
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return "open"
+            return "half-open"
+
+    def before_call(self):
+        """Raise DatabaseUnavailableError unless a request may be attempted now"""
+        with self._lock:
+            if self._opened_at is None:
+                return
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+            if remaining > 0 or self._trial_running:
+                raise DatabaseUnavailableError(
+                    f"Turso is unavailable; retrying in {max(remaining, 0):.0f}s"
+                )
+            self._trial_running = True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logging.info("Turso reachable again, closing circuit breaker")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            trial_failed = self._trial_running
+            self._trial_running = False
+            if trial_failed or (self._opened_at is None and self._failures >= self.failure_threshold):
+                if self._opened_at is None:
+                    self.times_opened += 1
+                    logging.error(
+                        f"Opening Turso circuit breaker after {self._failures} failures"
+                    )
+                self._opened_at = time.monotonic()
+
+    def stats(self) -> dict:
+        """Breaker counters for diagnostics"""
+        state = self.state
+        with self._lock:
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'times_opened': self.times_opened,
+            }
+
+
+class TursoClientPool:
+    """
+    Thread-safe pool of long-lived Turso clients
+
+    Every libsql client owns an HTTP session with keep-alive, so handing the
+    same few clients out again avoids a fresh TLS handshake per operation.
+    Idle clients are evicted after ``idle_timeout`` seconds and pinged before
+    reuse once they have been idle longer than ``health_check_interval``.
+    At most ``max_clients`` clients are checked out at once; acquire() waits
+    up to ``checkout_timeout`` seconds for one to be released and then
+    raises DatabaseUnavailableError. The pool's circuit breaker is shared by
+    every request to the primary.
+    """
+
+    def __init__(self, url: str, auth_token: str, max_size: int = 4,
+                 idle_timeout: float = 300.0, health_check_interval: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None, max_clients: int = 16,
+                 checkout_timeout: float = 10.0):
+        self.url = url
+        self.auth_token = auth_token
+        self.max_size = max_size
+        self.max_clients = max(max_clients, 1)
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self.checkout_timeout = checkout_timeout
+        self.breaker = breaker or CircuitBreaker()
+
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        self._idle = []  # (client, last_used) pairs, most recently used last
+        self._checked_out = 0
+        self._ws_client = None
+        self._closed = False
+        self.clients_created = 0
+
+    def acquire(self):
+        """Get a healthy client, creating one only if no idle client is usable"""
+        self._reserve()
+        try:
+            while True:
+                with self._lock:
+                    self._evict_expired_locked()
+                    entry = self._idle.pop() if self._idle else None
+
+                if entry is None:
+                    return self._create_client()
+
+                client, last_used = entry
+                idle_for = time.monotonic() - last_used
+                if idle_for > self.health_check_interval and not self._is_healthy(client):
+                    logging.info("Discarding unhealthy pooled Turso client")
+                    self._close_client(client)
+                    continue
+                return client
+        except BaseException:
+            self._unreserve()
+            raise
+
+    def release(self, client, discard: bool = False):
+        """Return a client to the pool, or close it if broken or surplus"""
+        if client is None:
+            return
+        self._unreserve()
+        if not discard and not getattr(client, 'closed', False):
+            with self._lock:
+                if not self._closed and len(self._idle) < self.max_size:
+                    self._idle.append((client, time.monotonic()))
+                    return
+        self._close_client(client)
+
+    def transaction_client(self):
+        """
+        Shared WebSocket client for interactive transactions
+
+        The HTTP clients in the pool cannot hold a transaction open, so
+        transaction() runs on one long-lived WebSocket client; each
+        transaction gets its own stream on it.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Turso client pool is closed")
+            client = self._ws_client
+        if client is not None and not getattr(client, 'closed', False):
+            return client
+
+        client = self._create_client(websocket=True)
+        with self._lock:
+            if self._ws_client is not None and not getattr(self._ws_client, 'closed', False):
+                # Another thread connected first
+                client, extra = self._ws_client, client
+                self._close_client(extra)
+            else:
+                self._ws_client = client
+        return client
+
+    def discard_transaction_client(self):
+        """Drop the WebSocket client after a connection failure"""
+        with self._lock:
+            client, self._ws_client = self._ws_client, None
+        if client is not None:
+            self._close_client(client)
+
+    def close(self):
+        """Close every idle client and refuse further checkouts"""
+        with self._lock:
+            self._closed = True
+            self._released.notify_all()
+            idle, self._idle = self._idle, []
+            ws_client, self._ws_client = self._ws_client, None
+        for client, _ in idle:
+            self._close_client(client)
+        if ws_client is not None:
+            self._close_client(ws_client)
+
+    def stats(self) -> dict:
+        """Pool counters for diagnostics"""
+        with self._lock:
+            return {
+                'idle_clients': len(self._idle),
+                'checked_out': self._checked_out,
+                'clients_created': self.clients_created,
+                'max_size': self.max_size,
+                'max_clients': self.max_clients,
+                'circuit': self.breaker.stats(),
+            }
+
+    def _reserve(self):
+        """Claim one of the max_clients checkout slots, waiting for a release"""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Turso client pool is closed")
+                if self._checked_out < self.max_clients:
+                    self._checked_out += 1
+                    return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise DatabaseUnavailableError(
+                        f"All {self.max_clients} Turso clients are busy; try again shortly"
+                    )
+                self._released.wait(remaining)
+
+    def _unreserve(self):
+        with self._lock:
+            if self._checked_out > 0:
+                self._checked_out -= 1
+                self._released.notify()
+
+    def _evict_expired_locked(self):
+        now = time.monotonic()
+        keep = []
+        for client, last_used in self._idle:
+            if now - last_used > self.idle_timeout or getattr(client, 'closed', False):
+                self._close_client(client)
+            else:
+                keep.append((client, last_used))
+        self._idle = keep
+
+    def _create_client(self, websocket: bool = False):
+        if websocket:
+            url = self.url.replace("libsql://", "wss://").replace("https://", "wss://").replace("http://", "ws://")
+        else:
             # Use HTTP URL instead of WebSocket for reliability
-            http_url = config.turso_url.replace("libsql://", "https://")
+            url = self.url.replace("libsql://", "https://")
+        client = libsql_client.create_client_sync(url=url, auth_token=self.auth_token)
+        with self._lock:
+            self.clients_created += 1
+        logging.info("Opened new Turso client")
+        return client
 
-            client = libsql_client.create_client_sync(
-                url=http_url,
-                auth_token=config.turso_auth_token
+    @staticmethod
+    def _is_healthy(client) -> bool:
+        try:
+            client.execute("SELECT 1")
+            return True
+        except Exception as e:
+            logging.warning(f"Turso health check failed: {e}")
+            return False
+
+    @staticmethod
+    def _close_client(client):
+        try:
+            client.close()
+        except Exception:
+            pass
+
+
+_turso_pool: Optional[TursoClientPool] = None
+_turso_pool_lock = threading.Lock()
+
+
+def get_turso_pool() -> TursoClientPool:
+    """Get the process-wide Turso client pool, rebuilding it if credentials changed"""
+    global _turso_pool
+
+    settings = config.settings
+    url, token = settings.turso_url, settings.turso_auth_token
+    with _turso_pool_lock:
+        pool = _turso_pool
+        if pool is None or pool.url != url or pool.auth_token != token:
+            if pool is not None:
+                pool.close()
+            pool = TursoClientPool(
+                url,
+                token,
+                max_size=settings.turso_pool_size,
+                idle_timeout=settings.turso_idle_timeout,
+                health_check_interval=settings.turso_health_check_interval,
+                max_clients=settings.turso_pool_max_clients,
+                checkout_timeout=settings.turso_pool_checkout_timeout,
+                breaker=CircuitBreaker(
+                    failure_threshold=settings.turso_breaker_threshold,
+                    reset_timeout=settings.turso_breaker_reset_timeout,
+                ),
             )
+            _turso_pool = pool
+        return pool
+
 
-            # Wrap Turso client to be compatible with sqlite3.Connection interface
-            return TursoConnectionWrapper(client)
+def reset_turso_pool():
+    """Close all pooled Turso clients (used at shutdown and in tests)"""
+    global _turso_pool
 
+    with _turso_pool_lock:
+        pool, _turso_pool = _turso_pool, None
+    if pool is not None:
+        pool.close()
+
+
+atexit.register(reset_turso_pool)
+
+
+def _is_read_query(sql: str) -> bool:
+    """Check if a statement only reads data and may be served by the replica"""
+    words = sql.lstrip().split(None, 1)
+    if not words:
+        return False
+    keyword = words[0].lower()
+    if keyword == "select":
+        return True
+    if keyword == "with":
+        lowered = sql.lower()
+        return not any(f"{word} " in lowered for word in ("insert", "update", "delete", "replace"))
+    return False
+
+
+def _session_key():
+    """Identify the current Streamlit session (or thread outside Streamlit)"""
+    if USE_STREAMLIT:
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+            ctx = get_script_run_ctx(suppress_warning=True)
+            if ctx is not None:
+                return ctx.session_id
+        except Exception:
+            pass
+    return threading.get_ident()
+
+
+class TursoReplica:
+    """
+    Local SQLite copy of the Turso primary used to serve reads
+
+    The dataset is small, so a sync copies every table and index from the
+    primary (one schema query plus one batch request) and swaps it into the
+    local file in a single transaction. Reads are served locally while the
+    copy is younger than max_staleness; a session that wrote keeps reading
+    from the primary until a sync started after its write has finished.
+    """
+
+    def __init__(self, path: str, max_staleness: float = 30.0, sync_on_write: bool = True):
+        self.path = path
+        self.max_staleness = max_staleness
+        self.sync_on_write = sync_on_write
+
+        self._connections = SQLiteConnectionManager(backend="replica")
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._syncing = False
+        self._last_writes = {}  # session -> monotonic time of its last write
+        self.synced_at = None
+        self.syncs = 0
+
+    def can_serve(self, session=None) -> bool:
+        """Check if the replica is fresh enough to answer reads for a session"""
+        synced_at = self.synced_at
+        if synced_at is None or time.monotonic() - synced_at > self.max_staleness:
+            return False
+        with self._lock:
+            last_write = self._last_writes.get(session if session is not None else _session_key())
+        return last_write is None or last_write < synced_at
+
+    def execute(self, sql: str, parameters=None):
+        """Run a read against the local copy, returning a fetched cursor"""
+        conn = self._connections.get(self.path, config.settings.sqlite_max_lifetime)
+        try:
+            return _materialize_cursor(conn.execute(sql, parameters or ()))
+        finally:
+            conn.close()
+
+    def execute_batch(self, statements):
+        """Run several reads against the local copy in one transaction"""
+        conn = self._connections.get(self.path, config.settings.sqlite_max_lifetime)
+        try:
+            return conn.batch(statements)
+        finally:
+            conn.close()
+
+    def note_write(self, pool: Optional[TursoClientPool] = None):
+        """Record a write by the current session and schedule a refresh"""
+        with self._lock:
+            self._last_writes[_session_key()] = time.monotonic()
+        if self.sync_on_write and pool is not None:
+            self.request_sync(pool)
+
+    def request_sync(self, pool: TursoClientPool):
+        """Start a background sync unless one is already running"""
+        with self._lock:
+            if self._syncing:
+                return
+            self._syncing = True
+        threading.Thread(target=self._sync_in_background, args=(pool,),
+                         name="turso-replica-sync", daemon=True).start()
+
+    def sync(self, client):
+        """Copy the primary into the local file"""
+        with self._sync_lock:
+            started = time.monotonic()
+            schema = client.execute(
+                "SELECT type, name, sql FROM sqlite_master "
+                "WHERE type IN ('table', 'index') AND sql IS NOT NULL "
+                "AND name NOT LIKE 'sqlite_%' ORDER BY type DESC"
+            )
+            tables = [(row[1], row[2]) for row in schema.rows if row[0] == 'table']
+            indexes = [row[2] for row in schema.rows if row[0] == 'index']
+            results = client.batch([f'SELECT * FROM "{name}"' for name, _ in tables]) if tables else []
+
+            conn = sqlite3.connect(self.path, isolation_level=None)
+            try:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("BEGIN IMMEDIATE")
+                existing = conn.execute(
+                    "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%'"
+                ).fetchall()
+                for (name,) in existing:
+                    conn.execute(f'DROP TABLE "{name}"')
+                for (name, create_sql), result in zip(tables, results):
+                    conn.execute(create_sql)
+                    if result.rows:
+                        placeholders = ", ".join("?" for _ in result.columns)
+                        conn.executemany(
+                            f'INSERT INTO "{name}" VALUES ({placeholders})',
+                            [tuple(row) for row in result.rows],
+                        )
+                for create_sql in indexes:
+                    conn.execute(create_sql)
+                conn.execute("COMMIT")
+            except Exception:
+                if conn.in_transaction:
+                    conn.execute("ROLLBACK")
+                raise
+            finally:
+                conn.close()
+
+            with self._lock:
+                self.synced_at = started
+                self.syncs += 1
+                # Writes older than this sync are now visible locally
+                self._last_writes = {
+                    session: written for session, written in self._last_writes.items()
+                    if written >= started
+                }
+            logging.info(f"Synced Turso replica to {self.path}")
+
+    def stats(self) -> dict:
+        """Replica counters for diagnostics"""
+        synced_at = self.synced_at
+        return {
+            'path': self.path,
+            'syncs': self.syncs,
+            'age_seconds': None if synced_at is None else round(time.monotonic() - synced_at, 1),
+            'max_staleness': self.max_staleness,
+        }
+
+    def close(self):
+        """Close local read connections"""
+        self._connections.reset()
+
+    def _sync_in_background(self, pool: TursoClientPool):
+        client = None
+        broken = False
+        try:
+            client = pool.acquire()
+            pool.breaker.before_call()
+            self.sync(client)
+            pool.breaker.record_success()
+        except DatabaseUnavailableError as e:
+            logging.warning(f"Skipping Turso replica sync: {e}")
         except Exception as e:
-            logging.error(f"Failed to connect to Turso: {e}")
-            logging.warning("Falling back to local SQLite database")
-            # Fall through to local database
+            kind = _classify_error(e)
+            if kind is not None:
+                pool.breaker.record_failure()
+            broken = kind == "connection"
+            logging.error(f"Turso replica sync failed: {e}")
+        finally:
+            pool.release(client, discard=broken)
+            with self._lock:
+                self._syncing = False
+
+
+_turso_replica: Optional[TursoReplica] = None
+
+
+def get_turso_replica() -> Optional[TursoReplica]:
+    """Get the read replica when TURSO_REPLICA_PATH is configured"""
+    global _turso_replica
+
+    settings = config.settings
+    path = settings.turso_replica_path
+    with _turso_pool_lock:
+        replica = _turso_replica
+        if path is None:
+            replica = None
+        elif replica is None or replica.path != path:
+            if replica is not None:
+                replica.close()
+            replica = TursoReplica(
+                path,
+                max_staleness=settings.turso_replica_max_staleness,
+                sync_on_write=settings.turso_replica_sync_on_write,
+            )
+        _turso_replica = replica
+        return replica
+
+
+def reset_turso_replica():
+    """Close the read replica's local connections"""
+    global _turso_replica
+
+    with _turso_pool_lock:
+        replica, _turso_replica = _turso_replica, None
+    if replica is not None:
+        replica.close()
 
-    # Use local SQLite database
-    logging.debug(f"Connecting to local SQLite database: {config.local_db_path}")
-    conn = sqlite3.connect(config.local_db_path, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+
+atexit.register(reset_turso_replica)
 
 
 class TursoConnectionWrapper:
     """
     Wrapper to make Turso client compatible with sqlite3.Connection interface
+
+    Failed requests raise: SQL errors as-is, and an unreachable primary as
+    DatabaseUnavailableError once retries are exhausted.
     """
 
-    def __init__(self, client):
+    def __init__(self, client, pool: Optional[TursoClientPool] = None,
+                 replica: Optional[TursoReplica] = None):
         self.client = client
+        self.pool = pool
+        self.replica = replica
         self._row_factory = None
+        self._transaction = None
+        self._pending_write = False
 
     @property
     def row_factory(self):
@@ -125,26 +1418,151 @@ class TursoConnectionWrapper:
 
     def execute(self, sql: str, parameters=None):
         """Execute SQL query"""
+        if self.replica is not None and self._transaction is None and _is_read_query(sql):
+            cursor = self._replica_read(sql, parameters)
+            if cursor is not None:
+                return cursor
+
+        is_read = _is_read_query(sql)
+        started = time.perf_counter()
+        if parameters:
+            params = self._prepare_params(parameters)
+            result = self._call(lambda client: client.execute(sql, params), idempotent=is_read)
+        else:
+            result = self._call(lambda client: client.execute(sql), idempotent=is_read)
+        query_stats.record(sql, parameters, "turso", (time.perf_counter() - started) * 1000,
+                           _result_row_count(result))
+
+        if not is_read:
+            self._note_write()
+        return TursoCursorWrapper(result, self._row_factory)
+
+    def _replica_read(self, sql: str, parameters=None):
+        """Serve a read from the replica, or return None to use the primary"""
+        if not self.replica.can_serve():
+            if self.pool is not None:
+                self.replica.request_sync(self.pool)
+            return None
         try:
-            if parameters:
-                # Convert parameters tuple to list for Turso
-                params = list(parameters) if isinstance(parameters, tuple) else parameters
-                # Convert datetime objects to strings for Turso
-                params = self._convert_params(params)
-                result = self.client.execute(sql, params)
-            else:
-                result = self.client.execute(sql)
+            return self.replica.execute(sql, parameters)
+        except sqlite3.Error as e:
+            logging.warning(f"Replica read failed, using primary: {e}")
+            return None
+
+    def _note_write(self):
+        if self._transaction is not None:
+            # Tell the replica only once the write is committed
+            self._pending_write = True
+        elif self.replica is not None:
+            self.replica.note_write(self.pool)
 
-            return TursoCursorWrapper(result, self._row_factory)
+    def begin_transaction(self):
+        """Open an interactive transaction on the pool's WebSocket client"""
+        breaker = self.pool.breaker
+        breaker.before_call()
+        try:
+            self._transaction = self.pool.transaction_client().transaction()
         except Exception as e:
-            # Log the error for debugging
-            logging.error(f"Turso execute error: {e}")
-            # Return empty cursor on error
-            class EmptyResult:
-                rows = []
-                columns = []
-                rows_affected = 0
-            return TursoCursorWrapper(EmptyResult(), self._row_factory)
+            if _classify_error(e) is None:
+                raise
+            breaker.record_failure()
+            self.pool.discard_transaction_client()
+            raise DatabaseUnavailableError(f"Could not start Turso transaction: {e}") from e
+        self._pending_write = False
+
+    def join_transaction(self):
+        """Nested helpers share the wrapper; its close() waits for the transaction"""
+
+    def end_transaction(self, commit: bool):
+        """Commit or roll back the transaction() block and return the client"""
+        try:
+            if self._transaction is not None:
+                if commit:
+                    self._call(lambda transaction: transaction.commit())
+                else:
+                    try:
+                        self._transaction.rollback()
+                    except Exception as e:
+                        logging.warning(f"Turso rollback failed: {e}")
+        finally:
+            transaction, self._transaction = self._transaction, None
+            if transaction is not None:
+                try:
+                    transaction.close()
+                except Exception:
+                    pass
+            if commit and self._pending_write:
+                self._note_write()
+            self._pending_write = False
+            self.close()
+
+    def _call(self, operation, idempotent: bool = True):
+        """
+        Run an operation against the client with classified retries
+
+        Broken clients are replaced and server errors retried with jittered
+        exponential backoff, up to TURSO_RETRY_ATTEMPTS extra attempts.
+        Writes (idempotent=False) are only retried when the request never
+        reached the server. Failures count towards the pool's circuit
+        breaker, which fails fast while the primary is down.
+        """
+        if self._transaction is not None:
+            # Statements in an interactive transaction cannot be replayed
+            try:
+                return operation(self._transaction)
+            except Exception as e:
+                if _classify_error(e) is None:
+                    raise
+                self.pool.breaker.record_failure()
+                self.pool.discard_transaction_client()
+                raise DatabaseUnavailableError(f"Turso transaction failed: {e}") from e
+
+        settings = config.settings
+        breaker = self.pool.breaker if self.pool is not None else None
+        attempt = 0
+        while True:
+            if self.client is None:
+                # Waiting for a free client says nothing about the primary,
+                # so it happens before the breaker admits the request
+                self.client = self.pool.acquire()
+            if breaker is not None:
+                breaker.before_call()
+            try:
+                result = operation(self.client)
+            except Exception as e:
+                kind = _classify_error(e)
+                if kind is None:
+                    # The server answered; the statement itself failed
+                    if breaker is not None:
+                        breaker.record_success()
+                    raise
+                if breaker is not None:
+                    breaker.record_failure()
+                if kind == "connection" and self.pool is not None:
+                    self.pool.release(self.client, discard=True)
+                    self.client = None
+
+                attempt += 1
+                can_retry = self.pool is not None and (idempotent or _is_unsent_error(e))
+                if not can_retry or attempt > settings.turso_retry_attempts:
+                    raise DatabaseUnavailableError(f"Turso request failed: {e}") from e
+                delay = _backoff_delay(attempt, settings.turso_retry_base_delay,
+                                       settings.turso_retry_max_delay)
+                logging.warning(f"Turso request failed ({e}), retry {attempt} in {delay:.2f}s")
+                time.sleep(delay)
+                continue
+
+            if breaker is not None:
+                breaker.record_success()
+            return result
+
+    def _prepare_params(self, parameters):
+        """Convert a parameters tuple to a Turso-compatible list"""
+        if not parameters:
+            return []
+        params = list(parameters) if isinstance(parameters, tuple) else parameters
+        # Convert datetime objects to strings for Turso
+        return self._convert_params(params)
 
     def _convert_params(self, params):
         """Convert Python types to Turso-compatible types"""
@@ -162,46 +1580,112 @@ class TursoConnectionWrapper:
                 converted.append(param)
         return converted
 
+    def batch(self, statements, chunk_size: Optional[int] = None):
+        """
+        Run (sql, parameters) pairs as libsql batch requests
+
+        Statements are sent chunk_size at a time (TURSO_BATCH_SIZE by
+        default); each request runs inside a single transaction on the
+        server, so a chunk either applies completely or not at all. Chunks
+        are sent in order and the first failing chunk raises, leaving later
+        chunks unsent.
+
+        Returns:
+            One cursor per statement
+        """
+        stmts = [(sql, self._prepare_params(parameters)) for sql, parameters in statements]
+        size = chunk_size or config.settings.turso_batch_size
+
+        is_read = all(_is_read_query(sql) for sql, _ in stmts)
+        cursors = []
+        for start in range(0, len(stmts), size):
+            chunk = stmts[start:start + size]
+            started = time.perf_counter()
+            if self._transaction is not None:
+                # Interactive transactions have no batch call; they are atomic anyway
+                results = [self._call(lambda transaction, sql=sql, params=params: transaction.execute(sql, params))
+                           for sql, params in chunk]
+            else:
+                results = self._call(lambda client: client.batch(chunk), idempotent=is_read)
+            # One round trip serves the whole chunk; spread its latency evenly
+            elapsed = (time.perf_counter() - started) * 1000 / len(chunk)
+            for (sql, params), result in zip(chunk, results):
+                query_stats.record(sql, params, "turso", elapsed, _result_row_count(result),
+                                   batch_size=len(chunk))
+            cursors.extend(TursoCursorWrapper(result, self._row_factory) for result in results)
+
+        if not is_read:
+            self._note_write()
+        return cursors
+
+    def execute_batch(self, statements):
+        """
+        Run several statements in a single round trip
+
+        Unlike batch(), the statements are never split across requests, so
+        related reads (e.g. dashboard counts) cost one network hop.
+
+        Returns:
+            One cursor per statement
+        """
+        statements = list(statements)
+        if self.replica is not None and self._transaction is None and all(_is_read_query(sql) for sql, _ in statements):
+            if self.replica.can_serve():
+                try:
+                    return self.replica.execute_batch(statements)
+                except sqlite3.Error as e:
+                    logging.warning(f"Replica read failed, using primary: {e}")
+            elif self.pool is not None:
+                self.replica.request_sync(self.pool)
+        return self.batch(statements, chunk_size=max(len(statements), 1))
+
+    def stream(self, sql: str, parameters=None, page_size: Optional[int] = None, *,
+               key: str, descending: bool = False):
+        """
+        Yield rows of a query a page at a time with bounded memory
+
+        Each page is its own request, read by keyset on key. The pooled
+        client goes back to the pool between pages, so a slow consumer
+        does not hold a checkout for the whole stream.
+        """
+        def fetch_page(page_sql, page_params):
+            rows = self.execute(page_sql, page_params).fetchall()
+            if self.pool is not None:
+                # Re-acquired for the next page (a no-op inside transaction())
+                self.close()
+            return rows
+
+        for page in _keyset_pages(fetch_page, sql, parameters, page_size, key, descending):
+            yield from page
+
+    def cursor(self):
+        """sqlite3-style cursor for code that calls conn.cursor() (maintenance scripts)"""
+        return TursoCursor(self)
+
     def executemany(self, sql: str, seq_of_parameters):
-        """Execute SQL query multiple times with different parameters"""
-        try:
-            total_affected = 0
-            for parameters in seq_of_parameters:
-                # Convert parameters tuple to list for Turso
-                params = list(parameters) if isinstance(parameters, tuple) else parameters
-                # Convert datetime objects to strings for Turso
-                params = self._convert_params(params)
-                result = self.client.execute(sql, params)
-                # Track rows affected
-                if hasattr(result, 'rows_affected'):
-                    total_affected += result.rows_affected
-                elif hasattr(result, '__dict__') and 'rows_affected' in result.__dict__:
-                    total_affected += result.__dict__['rows_affected']
-
-            # Return a cursor with the total rows affected
-            class BatchResult:
-                rows = []
-                columns = []
-                rows_affected = total_affected
-
-            return TursoCursorWrapper(BatchResult(), self._row_factory)
-        except Exception as e:
-            logging.error(f"Turso executemany error: {e}")
-            # Return empty cursor on error
-            class EmptyResult:
-                rows = []
-                columns = []
-                rows_affected = 0
-            return TursoCursorWrapper(EmptyResult(), self._row_factory)
+        """Execute SQL query for every parameter set in batched requests"""
+        cursors = self.batch((sql, parameters) for parameters in seq_of_parameters)
+        # Return a cursor with the total rows affected
+        total_affected = sum(cursor.rowcount for cursor in cursors)
+        return TursoCursorWrapper(StaticResult(rows_affected=total_affected), self._row_factory)
 
     def commit(self):
         """Commit transaction (Turso auto-commits)"""
         pass
 
     def close(self):
-        """Close connection"""
+        """Return the client to the pool (or close it when unpooled)"""
+        if self._transaction is not None:
+            # Released by end_transaction() when the transaction() block exits
+            return
+        client, self.client = self.client, None
+        if client is None:
+            return
+        if self.pool is not None:
+            self.pool.release(client)
+            return
         try:
-            self.client.close()
+            client.close()
         except:
             pass
 
@@ -212,16 +1696,65 @@ class TursoConnectionWrapper:
         self.close()
 
 
+class TursoCursor:
+    """Reusable cursor over a TursoConnectionWrapper, like sqlite3.Connection.cursor()"""
+
+    def __init__(self, connection: TursoConnectionWrapper):
+        self.connection = connection
+        self._cursor = TursoCursorWrapper(StaticResult(), connection.row_factory)
+
+    def execute(self, sql: str, parameters=None):
+        self._cursor = self.connection.execute(sql, parameters)
+        return self
+
+    def executemany(self, sql: str, seq_of_parameters):
+        self._cursor = self.connection.executemany(sql, seq_of_parameters)
+        return self
+
+    def close(self):
+        pass
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        # fetchone/fetchall/rowcount/lastrowid/description of the last statement
+        return getattr(self._cursor, name)
+
+
+def _result_row_count(result) -> int:
+    """Rows returned by a read, or rows affected by a write"""
+    if result.columns:
+        return len(result.rows)
+    return result.rows_affected or 0
+
+
+class StaticResult:
+    """Already-fetched result set with the same shape as a libsql ResultSet"""
+
+    def __init__(self, columns=(), rows=None, rows_affected: int = 0,
+                 last_insert_rowid: Optional[int] = None):
+        self.columns = columns
+        self.rows = rows if rows is not None else []
+        self.rows_affected = rows_affected
+        self.last_insert_rowid = last_insert_rowid
+
+
 class TursoCursorWrapper:
     """
     Wrapper to make Turso result compatible with sqlite3.Cursor interface
+
+    Also used for SQLite results that were fetched eagerly by batch().
     """
 
+    arraysize = 100
+
     def __init__(self, result, row_factory=None):
         self.result = result
         self._row_factory = row_factory
         self._rows = None
         self._index = 0
+        self._columns = None
 
         # Extract rows from result - handle different result formats
         if hasattr(result, 'rows'):
@@ -244,27 +1777,73 @@ class TursoCursorWrapper:
             return self.result['rows_affected']
         return len(self._rows) if self._rows else 0
 
+    @property
+    def lastrowid(self):
+        """Row id of the last inserted row"""
+        return getattr(self.result, 'last_insert_rowid', None)
+
     def fetchone(self):
         """Fetch one row"""
         if self._index < len(self._rows):
             row = self._rows[self._index]
             self._index += 1
-
-            if self._row_factory == sqlite3.Row:
-                # Convert to dict-like Row object
-                columns = self._get_columns()
-                return DictRow(dict(zip(columns, row)))
-            return row
+            return self._make_row(row)
 
         return None
 
+    def fetchmany(self, size: Optional[int] = None):
+        """Fetch the next size rows (arraysize by default)"""
+        size = self.arraysize if size is None else size
+        rows = self._rows[self._index:self._index + size]
+        self._index += len(rows)
+
+        if self._named_rows():
+            column_index = self._column_index()
+            values = _row_values_getter(rows)
+            return [Row(column_index, values(row)) for row in rows]
+
+        return list(rows)
+
     def fetchall(self):
-        """Fetch all rows"""
-        if self._row_factory == sqlite3.Row:
-            columns = self._get_columns()
-            return [DictRow(dict(zip(columns, row))) for row in self._rows]
+        """Fetch all remaining rows"""
+        rows = self._rows[self._index:] if self._index else self._rows
+        self._index = len(self._rows)
+
+        if self._named_rows():
+            column_index = self._column_index()
+            values = _row_values_getter(rows)
+            return [Row(column_index, values(row)) for row in rows]
+
+        return list(rows)
 
-        return self._rows
+    def __iter__(self):
+        while True:
+            row = self.fetchone()
+            if row is None:
+                return
+            yield row
+
+    @property
+    def description(self):
+        """sqlite3-style column descriptions"""
+        columns = self._get_columns()
+        if not columns:
+            return None
+        return tuple((name, None, None, None, None, None, None) for name in columns)
+
+    def _named_rows(self) -> bool:
+        return self._row_factory is Row or self._row_factory is sqlite3.Row
+
+    def _make_row(self, row):
+        if self._named_rows():
+            return Row(self._column_index(), _row_values_getter((row,))(row))
+        return row
+
+    def _column_index(self):
+        """Column name -> position map shared by every row of this result"""
+        if self._columns is None:
+            self._columns = Row.column_index(self._get_columns())
+        return self._columns
 
     def _get_columns(self):
         """Get column names from result"""
@@ -277,16 +1856,82 @@ class TursoCursorWrapper:
         return []
 
 
-class DictRow(dict):
+def _row_values_getter(rows):
+    """Pick the cheapest way to get a value tuple out of rows of this type"""
+    for row in rows:
+        if isinstance(row, tuple):
+            return lambda row: row
+        if hasattr(row, 'astuple'):
+            # libsql rows keep their values as a tuple already
+            return lambda row: row.astuple()
+        break
+    return tuple
+
+
+class Row:
     """
-    Dictionary that also supports attribute access
-    Compatible with sqlite3.Row interface
+    Compact result row used by both backends
+
+    Values are kept in a tuple and every row of a result set shares one
+    column name -> index map. Supports row['col'], row[0], row.col,
+    iteration over values and keys(), so dict(row) works like it does
+    for sqlite3.Row.
     """
+
+    __slots__ = ('_index', '_values')
+
+    def __init__(self, index: dict, values: tuple):
+        self._index = index
+        self._values = values
+
+    @staticmethod
+    def column_index(columns) -> dict:
+        """Build the shared name -> position map (first column wins on duplicates)"""
+        index = {}
+        for position, name in enumerate(columns):
+            index.setdefault(name, position)
+        return index
+
+    @classmethod
+    def factory(cls, description):
+        """Build a sqlite3 row factory for one cursor's result set"""
+        index = cls.column_index(column[0] for column in description)
+        return lambda cursor, values: cls(index, values)
+
+    def keys(self):
+        return list(self._index)
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return self._values[self._index[key]]
+        return self._values[key]
+
     def __getattr__(self, key):
+        # Private and dunder names are never columns; answering them here would
+        # recurse on a row whose slots are not set yet (copy, pickle)
+        if key.startswith('_'):
+            raise AttributeError(key)
         try:
-            return self[key]
+            return self._values[self._index[key]]
         except KeyError:
             raise AttributeError(f"'{type(self).__name__}' object has no attribute '{key}'")
 
-    def __setattr__(self, key, value):
-        self[key] = value
+    def __reduce__(self):
+        return type(self), (self._index, self._values)
+
+    def __iter__(self):
+        return iter(self._values)
+
+    def __len__(self):
+        return len(self._values)
+
+    def __eq__(self, other):
+        if isinstance(other, Row):
+            return self._values == other._values and self.keys() == other.keys()
+        return NotImplemented
+
+    def __hash__(self):
+        return hash(self._values)
+
+    def __repr__(self):
+        return f"Row({dict(zip(self._index, self._values))!r})"
@@ -0,0 +1,103 @@
+"""
+Materialized daily occupancy
+
+unit_day_occupancy holds one row per booking per night for every booking in
+a blocking status (BOOKING_BLOCKING_STATUSES) and every confirmed booking,
+so "who is here on day X" and per-day counts over a range are indexed
+lookups instead of interval scans over booking_requests. Confirmed bookings
+are always included because active stays and the dashboard's occupancy
+count read them from here, whatever the blocking statuses are. Bookings
+without a unit yet are included with a NULL lodging_unit_id.
+
+BookingOperations calls refresh_booking_occupancy() in the same transaction
+as every booking insert or update; a trigger removes the rows of deleted
+bookings. rebuild_occupancy() recomputes the whole table and
+check_occupancy() reports drift; both are available from
+rebuild_occupancy.py and the staff Diagnostics page.
+"""
+
+import logging
+from typing import Dict
+
+from database.connection import config, get_db_connection, transaction
+
+# Every night [check_in, check_out) of the bookings in a materialized status
+# (a further condition on booking_requests may be appended) as the CTE
+# "expected". Parameters: materialized_statuses(), then any for the condition.
+_EXPECTED_NIGHTS = """
+    WITH RECURSIVE nights (booking_id, lodging_unit_id, day, check_out, status) AS (
+        SELECT id, lodging_unit_id, date(check_in), date(check_out), status
+        FROM booking_requests
+        WHERE status IN ({placeholders}) AND date(check_in) < date(check_out) {where}
+        UNION ALL
+        SELECT booking_id, lodging_unit_id, date(day, '+1 day'), check_out, status
+        FROM nights WHERE date(day, '+1 day') < check_out
+    ),
+    expected AS (SELECT lodging_unit_id, day, booking_id, status FROM nights)
+"""
+
+
+def materialized_statuses() -> tuple:
+    """Booking statuses kept in unit_day_occupancy: the blocking statuses plus 'confirmed'"""
+    statuses = config.settings.blocking_statuses
+    return statuses if 'confirmed' in statuses else statuses + ('confirmed',)
+
+
+def _expected_nights(where: str = "") -> str:
+    placeholders = ", ".join("?" for _ in materialized_statuses())
+    return _EXPECTED_NIGHTS.format(placeholders=placeholders, where=where)
+
+
+def refresh_booking_occupancy(conn, booking_id: int):
+    """Replace the occupancy rows of one booking; call inside its write transaction"""
+    conn.execute("DELETE FROM unit_day_occupancy WHERE booking_id = ?", (booking_id,))
+    conn.execute(
+        "INSERT INTO unit_day_occupancy (lodging_unit_id, day, booking_id, status) "
+        + _expected_nights("AND id = ?") + "SELECT * FROM expected",
+        materialized_statuses() + (booking_id,)
+    )
+
+
+def rebuild_occupancy() -> int:
+    """Recompute unit_day_occupancy from booking_requests; returns the row count"""
+    with transaction() as conn:
+        conn.execute("DELETE FROM unit_day_occupancy")
+        conn.execute(
+            "INSERT INTO unit_day_occupancy (lodging_unit_id, day, booking_id, status) "
+            + _expected_nights() + "SELECT * FROM expected",
+            materialized_statuses()
+        )
+        count = conn.execute("SELECT COUNT(*) FROM unit_day_occupancy").fetchone()[0]
+    logging.info(f"Rebuilt unit_day_occupancy with {count} rows")
+    return count
+
+
+def check_occupancy(sample_size: int = 10) -> Dict:
+    """
+    Compare unit_day_occupancy with what booking_requests implies
+
+    Returns counts of missing and unexpected rows plus a few examples of each.
+    """
+    expected = _expected_nights()
+    actual = "SELECT lodging_unit_id, day, booking_id, status FROM unit_day_occupancy"
+    missing_sql = f"{expected} SELECT * FROM expected EXCEPT {actual}"
+    extra_sql = f"{expected} {actual} EXCEPT SELECT * FROM expected"
+    statuses = materialized_statuses()
+
+    conn = get_db_connection()
+    try:
+        cursors = conn.execute_batch([
+            (missing_sql, statuses),
+            (extra_sql, statuses),
+        ])
+        missing_rows = [dict(row) for row in cursors[0].fetchall()]
+        extra_rows = [dict(row) for row in cursors[1].fetchall()]
+        return {
+            'consistent': not missing_rows and not extra_rows,
+            'missing_rows': len(missing_rows),
+            'extra_rows': len(extra_rows),
+            'missing_examples': missing_rows[:sample_size],
+            'extra_examples': extra_rows[:sample_size],
+        }
+    finally:
+        conn.close()
@@ -0,0 +1,65 @@
+"""
+Tentative holds on units picked in the public booking wizard
+
+When a guest selects a unit at step 4, BookingOperations.hold_unit() writes
+a booking_holds row for their wizard session that expires after
+BOOKING_HOLD_TTL seconds. Every availability check treats an unexpired
+hold like a booking, except for the session that owns it; submitting the
+inquiry consumes the hold in the same transaction.
+
+Expired holds are ignored by every query as soon as they expire, so the
+sweeper only keeps the table small: a daemon thread deletes them every
+BOOKING_HOLD_SWEEP_INTERVAL seconds once the first hold has been placed.
+"""
+
+import logging
+import threading
+
+from database.connection import config, get_db_connection
+
+
+def purge_expired_holds() -> int:
+    """Delete expired holds; returns how many were removed"""
+    conn = get_db_connection()
+    try:
+        cursor = conn.execute("DELETE FROM booking_holds WHERE expires_at <= CURRENT_TIMESTAMP")
+        conn.commit()
+        return max(cursor.rowcount, 0)
+    finally:
+        conn.close()
+
+
+class HoldSweeper:
+    """Background thread that purges expired holds"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop = threading.Event()
+        self.purged = 0
+
+    def start(self):
+        """Start the sweeper unless it is already running"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="booking-hold-sweeper", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.wait(config.settings.booking_hold_sweep_interval):
+            try:
+                removed = purge_expired_holds()
+            except Exception as e:
+                logging.warning(f"Hold sweep failed: {e}")
+                continue
+            if removed:
+                self.purged += removed
+                logging.debug(f"Purged {removed} expired booking holds")
+
+
+hold_sweeper = HoldSweeper()
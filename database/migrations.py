@@ -0,0 +1,482 @@
+"""
+Versioned schema migrations
+
+Each migration runs once per database and is recorded in the
+schema_migrations table. initialize_database() calls migrate(), which reads
+the current version and applies only the pending steps inside one
+transaction, so a warm start costs a single query. Works on SQLite and Turso.
+
+To change the schema, append a function decorated with
+@migration(<next version>, "<description>"); never edit one that has shipped.
+"""
+
+import logging
+import threading
+from typing import List, Tuple
+
+from database.connection import DatabaseUnavailableError, config, get_db_connection, transaction
+
+# (version, description, apply(conn)) in ascending version order
+MIGRATIONS: List[Tuple[int, str, object]] = []
+
+# Databases already brought up to date by this process
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def migration(version: int, description: str):
+    """Register a schema migration step"""
+    def decorator(func):
+        if MIGRATIONS and version <= MIGRATIONS[-1][0]:
+            raise ValueError(f"Migration {version} must be newer than {MIGRATIONS[-1][0]}")
+        MIGRATIONS.append((version, description, func))
+        return func
+    return decorator
+
+
+def latest_version() -> int:
+    """Version the code expects the schema to be at"""
+    return MIGRATIONS[-1][0] if MIGRATIONS else 0
+
+
+def _read_version(conn) -> int:
+    try:
+        row = conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_migrations").fetchone()
+    except DatabaseUnavailableError:
+        raise
+    except Exception as e:
+        if "no such table" in str(e):
+            return 0
+        raise
+    return row[0] if row else 0
+
+
+def current_version() -> int:
+    """Schema version recorded in the database"""
+    conn = get_db_connection()
+    try:
+        return _read_version(conn)
+    finally:
+        conn.close()
+
+
+def _database_key() -> tuple:
+    settings = config.settings
+    return (settings.backend, settings.turso_url if settings.use_turso else settings.local_db_path)
+
+
+def migrate() -> List[int]:
+    """
+    Apply every pending migration
+
+    Returns:
+        Versions applied by this call (empty when already up to date)
+    """
+    key = _database_key()
+    if key in _migrated:
+        return []
+
+    with _migrate_lock:
+        if key in _migrated:
+            return []
+
+        if current_version() >= latest_version():
+            _migrated.add(key)
+            return []
+
+        applied = []
+        with transaction() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Re-read inside the transaction: another process may have migrated meanwhile
+            version = _read_version(conn)
+            for step_version, description, apply in MIGRATIONS:
+                if step_version <= version:
+                    continue
+                logging.info(f"Applying schema migration {step_version}: {description}")
+                apply(conn)
+                conn.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (?, ?)",
+                    (step_version, description)
+                )
+                applied.append(step_version)
+
+        _migrated.add(key)
+        return applied
+
+
+def reset_migration_cache():
+    """Forget which databases were migrated (for tests and after swapping the database)"""
+    with _migrate_lock:
+        _migrated.clear()
+
+
+def _column_exists(conn, table: str, column: str) -> bool:
+    return any(row[1] == column for row in conn.execute(f"PRAGMA table_info({table})").fetchall())
+
+
+@migration(1, "baseline schema")
+def _baseline_schema(conn):
+    # Create lodging_units table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS lodging_units (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name VARCHAR(100) NOT NULL,
+            location VARCHAR(50) NOT NULL,
+            type VARCHAR(50) NOT NULL,
+            capacity INTEGER NOT NULL,
+            description TEXT,
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+
+    # Create booking_requests table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS booking_requests (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guest_name VARCHAR(100) NOT NULL,
+            email VARCHAR(150) NOT NULL,
+            phone VARCHAR(20),
+            booking_type VARCHAR(20) NOT NULL,
+            check_in DATE NOT NULL,
+            check_out DATE NOT NULL,
+            guests INTEGER NOT NULL,
+            lodging_unit_id INTEGER,
+            status VARCHAR(20) DEFAULT 'pending',
+            notes TEXT,
+            special_requests TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+
+    # Create availability_calendar table
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS availability_calendar (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            date DATE NOT NULL,
+            is_available BOOLEAN DEFAULT 1,
+            notes TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id),
+            UNIQUE(lodging_unit_id, date)
+        )
+    """)
+
+    # Property management tables
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS property_notes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            note_type VARCHAR(50) NOT NULL,
+            title VARCHAR(200) NOT NULL,
+            content TEXT NOT NULL,
+            priority VARCHAR(20) DEFAULT 'medium',
+            created_by VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_tasks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            task_title VARCHAR(200) NOT NULL,
+            description TEXT,
+            task_type VARCHAR(50) NOT NULL,
+            priority VARCHAR(20) DEFAULT 'medium',
+            status VARCHAR(20) DEFAULT 'pending',
+            scheduled_date DATE,
+            completed_date DATE,
+            assigned_to VARCHAR(100),
+            estimated_cost DECIMAL(10,2),
+            actual_cost DECIMAL(10,2),
+            created_by VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS property_todos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER,
+            title VARCHAR(200) NOT NULL,
+            description TEXT,
+            priority VARCHAR(20) DEFAULT 'medium',
+            status VARCHAR(20) DEFAULT 'pending',
+            due_date DATE,
+            assigned_to VARCHAR(100),
+            category VARCHAR(50),
+            created_by VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            completed_at TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS property_files (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            file_name VARCHAR(255) NOT NULL,
+            file_type VARCHAR(50) NOT NULL,
+            file_category VARCHAR(50) NOT NULL,
+            file_path VARCHAR(500) NOT NULL,
+            file_size INTEGER,
+            description TEXT,
+            uploaded_by VARCHAR(100),
+            uploaded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS property_inspections (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            inspection_type VARCHAR(50) NOT NULL,
+            inspection_date DATE NOT NULL,
+            inspector_name VARCHAR(100),
+            overall_rating INTEGER CHECK(overall_rating BETWEEN 1 AND 5),
+            checklist_data TEXT,
+            issues_found TEXT,
+            recommendations TEXT,
+            next_inspection_date DATE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS maintenance_schedules (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            schedule_name VARCHAR(200) NOT NULL,
+            task_type VARCHAR(50) NOT NULL,
+            frequency VARCHAR(50) NOT NULL,
+            next_due_date DATE NOT NULL,
+            last_completed DATE,
+            description TEXT,
+            estimated_cost DECIMAL(10,2),
+            is_active BOOLEAN DEFAULT 1,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+
+
+@migration(2, "lodging_units.display_order")
+def _lodging_display_order(conn):
+    # Databases set up by reorganize_rooms.py already have the column
+    if not _column_exists(conn, "lodging_units", "display_order"):
+        conn.execute("ALTER TABLE lodging_units ADD COLUMN display_order INTEGER DEFAULT 999")
+
+
+@migration(3, "secondary indexes for booking and property queries")
+def _secondary_indexes(conn):
+    indexes = [
+        # Availability checks: one unit, blocking statuses, overlapping dates
+        "CREATE INDEX IF NOT EXISTS idx_booking_requests_unit_status_dates "
+        "ON booking_requests (lodging_unit_id, status, check_in, check_out)",
+        # Dashboard counts and active stays: status plus a check-in range
+        "CREATE INDEX IF NOT EXISTS idx_booking_requests_status_check_in "
+        "ON booking_requests (status, check_in)",
+        # Request lists, newest first, with and without a status filter
+        "CREATE INDEX IF NOT EXISTS idx_booking_requests_status_created "
+        "ON booking_requests (status, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_booking_requests_created "
+        "ON booking_requests (created_at)",
+
+        "CREATE INDEX IF NOT EXISTS idx_property_notes_unit_created "
+        "ON property_notes (lodging_unit_id, created_at)",
+        "CREATE INDEX IF NOT EXISTS idx_property_notes_created "
+        "ON property_notes (created_at)",
+
+        "CREATE INDEX IF NOT EXISTS idx_maintenance_tasks_status_scheduled "
+        "ON maintenance_tasks (status, scheduled_date)",
+        "CREATE INDEX IF NOT EXISTS idx_maintenance_tasks_unit_scheduled "
+        "ON maintenance_tasks (lodging_unit_id, scheduled_date)",
+        "CREATE INDEX IF NOT EXISTS idx_maintenance_tasks_scheduled "
+        "ON maintenance_tasks (scheduled_date)",
+
+        "CREATE INDEX IF NOT EXISTS idx_property_todos_status_due "
+        "ON property_todos (status, due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_property_todos_unit_status_due "
+        "ON property_todos (lodging_unit_id, status, due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_property_todos_due "
+        "ON property_todos (due_date)",
+
+        "CREATE INDEX IF NOT EXISTS idx_property_files_unit_uploaded "
+        "ON property_files (lodging_unit_id, uploaded_at)",
+        "CREATE INDEX IF NOT EXISTS idx_property_files_uploaded "
+        "ON property_files (uploaded_at)",
+
+        "CREATE INDEX IF NOT EXISTS idx_property_inspections_unit_date "
+        "ON property_inspections (lodging_unit_id, inspection_date)",
+        "CREATE INDEX IF NOT EXISTS idx_property_inspections_date "
+        "ON property_inspections (inspection_date)",
+        "CREATE INDEX IF NOT EXISTS idx_property_inspections_next "
+        "ON property_inspections (next_inspection_date)",
+
+        "CREATE INDEX IF NOT EXISTS idx_maintenance_schedules_active_due "
+        "ON maintenance_schedules (is_active, next_due_date)",
+        "CREATE INDEX IF NOT EXISTS idx_maintenance_schedules_unit_due "
+        "ON maintenance_schedules (lodging_unit_id, next_due_date)",
+    ]
+    for sql in indexes:
+        conn.execute(sql)
+
+
+@migration(4, "index blocked calendar days by date")
+def _blocked_dates_index(conn):
+    # Staff calendars read every blocked day in a date range across all units
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS idx_availability_calendar_available_date "
+        "ON availability_calendar (is_available, date)"
+    )
+
+
+@migration(5, "unit_day_occupancy materialized nights")
+def _unit_day_occupancy(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS unit_day_occupancy (
+            lodging_unit_id INTEGER,
+            day DATE NOT NULL,
+            booking_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            PRIMARY KEY (booking_id, day),
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id),
+            FOREIGN KEY (booking_id) REFERENCES booking_requests (id)
+        )
+    """)
+    # Who is in on a day / per-day counts over a range
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_unit_day_occupancy_day_status "
+                 "ON unit_day_occupancy (day, status)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_unit_day_occupancy_unit_day "
+                 "ON unit_day_occupancy (lodging_unit_id, day)")
+    # Inserts and updates are maintained by BookingOperations; deletes here
+    conn.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_booking_requests_delete_occupancy
+        AFTER DELETE ON booking_requests
+        BEGIN
+            DELETE FROM unit_day_occupancy WHERE booking_id = OLD.id;
+        END
+    """)
+
+    # Backfill with the statuses in force when this migration was written, so
+    # every database gets the same rows. Where BOOKING_BLOCKING_STATUSES
+    # differs, rebuild_occupancy() brings the table in line.
+    conn.execute("""
+        INSERT OR IGNORE INTO unit_day_occupancy (lodging_unit_id, day, booking_id, status)
+        WITH RECURSIVE nights (booking_id, lodging_unit_id, day, check_out, status) AS (
+            SELECT id, lodging_unit_id, date(check_in), date(check_out), status
+            FROM booking_requests
+            WHERE status IN ('pending', 'confirmed') AND date(check_in) < date(check_out)
+            UNION ALL
+            SELECT booking_id, lodging_unit_id, date(day, '+1 day'), check_out, status
+            FROM nights WHERE date(day, '+1 day') < check_out
+        )
+        SELECT lodging_unit_id, day, booking_id, status FROM nights
+    """)
+
+
+@migration(6, "unit_blocks date ranges replace per-day availability_calendar blocks")
+def _unit_blocks(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS unit_blocks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            start_date DATE NOT NULL,
+            end_date DATE NOT NULL,
+            reason TEXT,
+            created_by TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id),
+            CHECK (start_date < end_date)
+        )
+    """)
+    # Overlap checks for one unit, and calendars over a date range
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_unit_blocks_unit_dates "
+                 "ON unit_blocks (lodging_unit_id, start_date, end_date)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_unit_blocks_end_start "
+                 "ON unit_blocks (end_date, start_date)")
+
+    # Collapse runs of consecutive blocked days with the same note into one
+    # range (day number minus row number is constant within a run)
+    conn.execute("""
+        INSERT INTO unit_blocks (lodging_unit_id, start_date, end_date, reason, created_by)
+        SELECT lodging_unit_id, MIN(day), date(MAX(day), '+1 day'), notes, 'migration'
+        FROM (
+            SELECT lodging_unit_id, date(date) AS day, notes,
+                   julianday(date(date)) - ROW_NUMBER() OVER (
+                       PARTITION BY lodging_unit_id, notes ORDER BY date
+                   ) AS run
+            FROM availability_calendar
+            WHERE is_available = 0
+        )
+        GROUP BY lodging_unit_id, notes, run
+    """)
+    conn.execute("DELETE FROM availability_calendar WHERE is_available = 0")
+    # Blocked days no longer live in availability_calendar, so migration 4's
+    # index would only slow down every calendar write
+    conn.execute("DROP INDEX IF EXISTS idx_availability_calendar_available_date")
+
+
+@migration(7, "booking_groups link the units of one multi-unit booking")
+def _booking_groups(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS booking_groups (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guest_name VARCHAR(100) NOT NULL,
+            check_in DATE NOT NULL,
+            check_out DATE NOT NULL,
+            guests INTEGER NOT NULL,
+            location VARCHAR(50),
+            status VARCHAR(20) DEFAULT 'pending',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # One booking_requests row per unit in the group, all sharing its status
+    if not _column_exists(conn, "booking_requests", "group_id"):
+        conn.execute("ALTER TABLE booking_requests ADD COLUMN group_id INTEGER REFERENCES booking_groups (id)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_booking_requests_group "
+                 "ON booking_requests (group_id)")
+
+
+@migration(8, "booking_holds for units held during the booking wizard")
+def _booking_holds(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS booking_holds (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            lodging_unit_id INTEGER NOT NULL,
+            check_in DATE NOT NULL,
+            check_out DATE NOT NULL,
+            session_id TEXT NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (lodging_unit_id) REFERENCES lodging_units (id)
+        )
+    """)
+    # Overlap checks for one unit answered from the index alone
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_booking_holds_unit_dates "
+                 "ON booking_holds (lodging_unit_id, check_in, check_out, expires_at)")
+    # The sweeper and the availability index read by expiry; a session replaces its hold
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_booking_holds_expires "
+                 "ON booking_holds (expires_at)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_booking_holds_session "
+                 "ON booking_holds (session_id)")
@@ -3,7 +3,124 @@ from datetime import datetime, date
 from typing import List, Dict, Optional, Tuple
 import logging
 from database.models import get_db_connection
+from database.connection import BookingConflictError, config, transaction, in_transaction, after_commit
+from database.availability import availability_index
+from database.daily_occupancy import refresh_booking_occupancy
+from database.holds import hold_sweeper
 from utils.helpers import safe_database_operation, sanitize_input
+from utils.assignment import AssignmentPlan, plan_assignments
+from utils.group_allocation import find_group_allocations, split_guests
+
+
+class _PlanConflict(Exception):
+    """Rolls back apply_assignment_plan when any assignment no longer holds"""
+
+
+def _iso(value) -> str:
+    """Dates are stored as ISO strings; accept date objects or strings"""
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def _use_availability_index(statuses=None) -> bool:
+    """Index answers plain reads; checks inside a transaction go to the database"""
+    settings = config.settings
+    return (settings.availability_index_enabled and not in_transaction()
+            and (not statuses or tuple(statuses) == settings.blocking_statuses))
+
+
+def _unit_free_condition(check_in, check_out, statuses: Optional[Tuple[str, ...]] = None,
+                         exclude_booking_id: Optional[int] = None,
+                         hold_session_id: Optional[str] = None) -> Tuple[str, list]:
+    """
+    SQL condition that lodging unit ``lu`` is free for [check_in, check_out)
+
+    Stays are half-open, so a check-out and the next check-in may share a day.
+    Unexpired booking holds count as taken, except those of hold_session_id.
+    """
+    statuses = tuple(statuses) if statuses else config.settings.blocking_statuses
+    placeholders = ", ".join("?" for _ in statuses)
+    exclude_sql = "AND br.id != ?" if exclude_booking_id else ""
+    session_sql = "AND bh.session_id != ?" if hold_session_id else ""
+    sql = f"""NOT EXISTS (
+                    SELECT 1 FROM booking_requests br
+                    WHERE br.lodging_unit_id = lu.id
+                    AND br.status IN ({placeholders})
+                    AND br.check_in < ? AND br.check_out > ?
+                    {exclude_sql}
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM unit_blocks ub
+                    WHERE ub.lodging_unit_id = lu.id
+                    AND ub.start_date < ? AND ub.end_date > ?
+                )
+                AND NOT EXISTS (
+                    SELECT 1 FROM booking_holds bh
+                    WHERE bh.lodging_unit_id = lu.id
+                    AND bh.check_in < ? AND bh.check_out > ?
+                    AND bh.expires_at > CURRENT_TIMESTAMP
+                    {session_sql}
+                )"""
+    params = list(statuses) + [_iso(check_out), _iso(check_in)]
+    if exclude_booking_id:
+        params.append(exclude_booking_id)
+    params += [_iso(check_out), _iso(check_in)]
+    params += [_iso(check_out), _iso(check_in)]
+    if hold_session_id:
+        params.append(hold_session_id)
+    return sql, params
+
+
+def _insert_booking(conn, values: Dict, hold_session_id: Optional[str] = None) -> Optional[int]:
+    """
+    Insert one booking_requests row and return its id
+
+    With a lodging_unit_id the row is inserted only if that unit is free for
+    its dates (holds of hold_session_id aside), as one INSERT ... SELECT, so
+    no other booking can land in between; returns None when the unit was taken.
+    """
+    columns = ", ".join(values)
+    placeholders = ", ".join("?" for _ in values)
+    unit_id = values.get('lodging_unit_id')
+    if not unit_id:
+        cursor = conn.execute(f"INSERT INTO booking_requests ({columns}) VALUES ({placeholders})",
+                              list(values.values()))
+        return cursor.lastrowid
+
+    free_sql, free_params = _unit_free_condition(values['check_in'], values['check_out'],
+                                                 hold_session_id=hold_session_id)
+    cursor = conn.execute(f"""
+        INSERT INTO booking_requests ({columns})
+        SELECT {placeholders} FROM lodging_units lu
+        WHERE lu.id = ? AND {free_sql}
+    """, list(values.values()) + [unit_id] + free_params)
+    return cursor.lastrowid if cursor.rowcount > 0 else None
+
+
+def _assign_if_free(conn, booking_id: int, lodging_unit_id: int, check_in, check_out,
+                    condition: str = "", guests: Optional[int] = None, group_id: Optional[int] = None) -> bool:
+    """
+    Set a booking's unit in one conditional UPDATE
+
+    Only applies while the booking still has these dates (and matches
+    condition) and the unit is free for them apart from the booking itself.
+    guests and group_id are set too when given. Returns False otherwise.
+    """
+    assignments, params = ["lodging_unit_id = ?"], [lodging_unit_id]
+    if guests is not None:
+        assignments.append("guests = ?")
+        params.append(guests)
+    if group_id is not None:
+        assignments.append("group_id = ?")
+        params.append(group_id)
+    free_sql, free_params = _unit_free_condition(check_in, check_out, exclude_booking_id=booking_id)
+    cursor = conn.execute(f"""
+        UPDATE booking_requests
+        SET {", ".join(assignments)}, updated_at = CURRENT_TIMESTAMP
+        WHERE id = ? AND check_in = ? AND check_out = ? {condition}
+        AND EXISTS (SELECT 1 FROM lodging_units lu WHERE lu.id = ? AND {free_sql})
+    """, params + [booking_id, _iso(check_in), _iso(check_out), lodging_unit_id] + free_params)
+    return cursor.rowcount > 0
+
 
 class BookingOperations:
     @staticmethod
@@ -27,13 +144,14 @@ class BookingOperations:
     def get_lodging_units_by_location(location: str) -> List[Dict]:
         """Get lodging units by location"""
         conn = get_db_connection()
-        cursor = conn.execute(
-            "SELECT * FROM lodging_units WHERE location = ? AND is_active = 1 ORDER BY name",
-            (location,)
-        )
-        units = [dict(row) for row in cursor.fetchall()]
-        conn.close()
-        return units
+        try:
+            cursor = conn.execute(
+                "SELECT * FROM lodging_units WHERE location = ? AND is_active = 1 ORDER BY name",
+                (location,)
+            )
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
     
     @staticmethod
     @safe_database_operation
@@ -61,41 +179,26 @@ class BookingOperations:
         if not sanitized_data['check_in'] or not sanitized_data['check_out']:
             raise ValueError("Check-in and check-out dates are required")
         
-        conn = get_db_connection()
-        try:
-            # Check for potential conflicts
-            if sanitized_data['lodging_unit_id']:
-                if not BookingOperations.check_availability(
-                    sanitized_data['lodging_unit_id'], 
-                    sanitized_data['check_in'], 
-                    sanitized_data['check_out']
-                ):
-                    raise ValueError("Selected accommodation is not available for those dates")
-            
-            cursor = conn.execute("""
-                INSERT INTO booking_requests 
-                (guest_name, email, phone, booking_type, check_in, check_out, 
-                 guests, lodging_unit_id, notes, special_requests)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                sanitized_data['guest_name'],
-                sanitized_data['email'],
-                sanitized_data['phone'],
-                sanitized_data['booking_type'],
-                sanitized_data['check_in'],
-                sanitized_data['check_out'],
-                sanitized_data['guests'],
-                sanitized_data['lodging_unit_id'],
-                sanitized_data['notes'],
-                sanitized_data['special_requests']
-            ))
+        # The wizard session whose hold on the unit this booking replaces
+        hold_session_id = booking_data.get('hold_session_id')
+
+        # The insert only succeeds if the unit is still free; its occupancy rows commit with it
+        with transaction() as conn:
+            booking_id = _insert_booking(conn, {
+                key: sanitized_data[key] for key in (
+                    'guest_name', 'email', 'phone', 'booking_type', 'check_in', 'check_out',
+                    'guests', 'lodging_unit_id', 'notes', 'special_requests'
+                )
+            }, hold_session_id)
+            if booking_id is None:
+                raise BookingConflictError("Selected accommodation is not available for those dates")
             
-            booking_id = cursor.lastrowid
-            conn.commit()
-            logging.info(f"Created booking request {booking_id} for {sanitized_data['guest_name']}")
-            return booking_id
-        finally:
-            conn.close()
+            if hold_session_id:
+                conn.execute("DELETE FROM booking_holds WHERE session_id = ?", (hold_session_id,))
+            refresh_booking_occupancy(conn, booking_id)
+            after_commit(availability_index.invalidate)
+        logging.info(f"Created booking request {booking_id} for {sanitized_data['guest_name']}")
+        return booking_id
     
     @staticmethod
     @safe_database_operation
@@ -123,6 +226,28 @@ class BookingOperations:
         finally:
             conn.close()
     
+    @staticmethod
+    def stream_booking_requests(status: Optional[str] = None, page_size: Optional[int] = None):
+        """Yield booking requests (newest first) page by page for large exports"""
+        query = """
+            SELECT br.*, lu.name as lodging_name, lu.location as lodging_location
+            FROM booking_requests br
+            LEFT JOIN lodging_units lu ON br.lodging_unit_id = lu.id
+        """
+        params = []
+
+        if status:
+            query += " WHERE br.status = ?"
+            params.append(status)
+
+        conn = get_db_connection()
+        try:
+            # Paged by id, so newest first without skipping or repeating rows
+            for row in conn.stream(query, params, page_size=page_size, key='id', descending=True):
+                yield dict(row)
+        finally:
+            conn.close()
+
     @staticmethod
     @safe_database_operation
     def update_booking_status(booking_id: int, status: str, notes: str = "") -> bool:
@@ -136,25 +261,43 @@ class BookingOperations:
         
         sanitized_notes = sanitize_input(notes, 2000)
         
-        conn = get_db_connection()
-        try:
-            cursor = conn.execute("""
-                UPDATE booking_requests 
-                SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (status, sanitized_notes, booking_id))
+        # The status change and its occupancy rows commit together
+        with transaction() as conn:
+            row = conn.execute("SELECT group_id FROM booking_requests WHERE id = ?", (booking_id,)).fetchone()
+            group_id = row[0] if row else None
+            if group_id:
+                # Every unit of a group booking shares one status
+                member_ids = [member[0] for member in conn.execute(
+                    "SELECT id FROM booking_requests WHERE group_id = ?", (group_id,)
+                ).fetchall()]
+                conn.execute("""
+                    UPDATE booking_groups SET status = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?
+                """, (status, group_id))
+                cursor = conn.execute("""
+                    UPDATE booking_requests
+                    SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE group_id = ?
+                """, (status, sanitized_notes, group_id))
+            else:
+                member_ids = [booking_id]
+                cursor = conn.execute("""
+                    UPDATE booking_requests 
+                    SET status = ?, notes = ?, updated_at = CURRENT_TIMESTAMP
+                    WHERE id = ?
+                """, (status, sanitized_notes, booking_id))
             
             success = cursor.rowcount > 0
-            conn.commit()
-            
             if success:
-                logging.info(f"Updated booking {booking_id} status to {status}")
-            else:
-                logging.warning(f"Failed to update booking {booking_id} - not found")
+                for member_id in member_ids:
+                    refresh_booking_occupancy(conn, member_id)
+            after_commit(availability_index.invalidate)
             
-            return success
-        finally:
-            conn.close()
+        if success:
+            logging.info(f"Updated booking {booking_id} status to {status}")
+        else:
+            logging.warning(f"Failed to update booking {booking_id} - not found")
+        
+        return success
 
     @staticmethod
     @safe_database_operation
@@ -165,46 +308,95 @@ class BookingOperations:
         if not lodging_unit_id or lodging_unit_id <= 0:
             raise ValueError("Invalid lodging unit ID")
 
-        conn = get_db_connection()
-        try:
+        # The unit is assigned only if it is still free when the update runs
+        with transaction() as conn:
             # Verify the unit exists
             cursor = conn.execute("SELECT id FROM lodging_units WHERE id = ? AND is_active = 1", (lodging_unit_id,))
             if not cursor.fetchone():
                 raise ValueError("Invalid or inactive lodging unit")
 
-            # Get booking details for availability check
-            cursor = conn.execute("""
-                SELECT check_in, check_out, guests
-                FROM booking_requests
-                WHERE id = ?
-            """, (booking_id,))
+            cursor = conn.execute("SELECT check_in, check_out FROM booking_requests WHERE id = ?", (booking_id,))
             booking = cursor.fetchone()
-
             if not booking:
                 raise ValueError("Booking not found")
 
-            check_in, check_out, guests = booking
+            if not _assign_if_free(conn, booking_id, lodging_unit_id, booking[0], booking[1]):
+                raise BookingConflictError("Selected unit is not available for these dates")
+
+            refresh_booking_occupancy(conn, booking_id)
+            after_commit(availability_index.invalidate)
+
+        logging.info(f"Assigned unit {lodging_unit_id} to booking {booking_id}")
+        return True
+
+    @staticmethod
+    @safe_database_operation
+    def assign_group_to_booking(booking_id: int, lodging_unit_ids: List[int]) -> int:
+        """
+        Book one inquiry across several units as a linked group
+
+        The inquiry keeps the first unit and one booking request is added
+        per further unit, each holding part of the party and sharing the new
+        booking_groups row. Returns the group id.
+        """
+        lodging_unit_ids = list(dict.fromkeys(lodging_unit_ids))
+        if not booking_id or booking_id <= 0:
+            raise ValueError("Invalid booking ID")
+        if len(lodging_unit_ids) < 2:
+            raise ValueError("A group booking needs at least two units")
 
-            # Check if unit is available for the dates
-            if not BookingOperations.check_availability(lodging_unit_id, check_in, check_out):
-                raise ValueError("Selected unit is not available for these dates")
+        placeholders = ", ".join("?" for _ in lodging_unit_ids)
+        with transaction() as conn:
+            booking = conn.execute("SELECT * FROM booking_requests WHERE id = ?", (booking_id,)).fetchone()
+            if not booking:
+                raise ValueError("Booking not found")
+            booking = dict(booking)
+            if booking['lodging_unit_id'] or booking.get('group_id'):
+                raise ValueError("Booking already has a room assigned")
+
+            units = [dict(row) for row in conn.execute(f"""
+                SELECT * FROM lodging_units WHERE id IN ({placeholders}) AND is_active = 1
+                ORDER BY display_order, location, name
+            """, lodging_unit_ids).fetchall()]
+            if len(units) != len(lodging_unit_ids):
+                raise ValueError("Invalid or inactive lodging unit")
+            split = split_guests(units, booking['guests'])
+            if sum(split) < booking['guests']:
+                raise ValueError("Selected units cannot hold the whole party")
+            if not all(split):
+                raise ValueError("Every unit in a group must hold at least one guest")
 
-            # Assign the room
+            locations = {unit['location'] for unit in units}
             cursor = conn.execute("""
-                UPDATE booking_requests
-                SET lodging_unit_id = ?, updated_at = CURRENT_TIMESTAMP
-                WHERE id = ?
-            """, (lodging_unit_id, booking_id))
+                INSERT INTO booking_groups (guest_name, check_in, check_out, guests, location, status)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (booking['guest_name'], booking['check_in'], booking['check_out'], booking['guests'],
+                  locations.pop() if len(locations) == 1 else None, booking['status']))
+            group_id = cursor.lastrowid
 
-            success = cursor.rowcount > 0
-            conn.commit()
+            # Each unit is claimed by a conditional write; any loss rolls the whole group back
+            if not _assign_if_free(conn, booking_id, units[0]['id'], booking['check_in'], booking['check_out'],
+                                   guests=split[0], group_id=group_id):
+                raise BookingConflictError(f"{units[0]['name']} is not available for these dates")
+            member_ids = [booking_id]
+            for unit, guests in zip(units[1:], split[1:]):
+                member_id = _insert_booking(conn, {
+                    'guest_name': booking['guest_name'], 'email': booking['email'], 'phone': booking['phone'],
+                    'booking_type': booking['booking_type'], 'check_in': booking['check_in'],
+                    'check_out': booking['check_out'], 'guests': guests, 'lodging_unit_id': unit['id'],
+                    'status': booking['status'], 'notes': booking['notes'],
+                    'special_requests': booking['special_requests'], 'group_id': group_id,
+                })
+                if member_id is None:
+                    raise BookingConflictError(f"{unit['name']} is not available for these dates")
+                member_ids.append(member_id)
 
-            if success:
-                logging.info(f"Assigned unit {lodging_unit_id} to booking {booking_id}")
+            for member_id in member_ids:
+                refresh_booking_occupancy(conn, member_id)
+            after_commit(availability_index.invalidate)
 
-            return success
-        finally:
-            conn.close()
+        logging.info(f"Booked group {group_id} for booking {booking_id} across units {lodging_unit_ids}")
+        return group_id
 
     @staticmethod
     @safe_database_operation
@@ -212,13 +404,14 @@ class BookingOperations:
         """Get all currently active stays (confirmed bookings where today is between check-in and check-out)"""
         conn = get_db_connection()
         try:
+            # Tonight's confirmed rows in unit_day_occupancy are exactly the active stays
+            # (confirmed nights are materialized whatever BOOKING_BLOCKING_STATUSES says)
             query = """
                 SELECT br.*, lu.name as lodging_name, lu.location as lodging_location
-                FROM booking_requests br
+                FROM unit_day_occupancy udo
+                JOIN booking_requests br ON br.id = udo.booking_id
                 LEFT JOIN lodging_units lu ON br.lodging_unit_id = lu.id
-                WHERE br.status = 'confirmed'
-                AND date('now') >= br.check_in
-                AND date('now') < br.check_out
+                WHERE udo.day = date('now') AND udo.status = 'confirmed'
                 ORDER BY br.check_in DESC
             """
 
@@ -230,96 +423,307 @@ class BookingOperations:
 
     @staticmethod
     @safe_database_operation
-    def check_availability(lodging_unit_id: int, check_in: date, check_out: date) -> bool:
-        """Check if a lodging unit is available for given dates"""
+    def get_daily_occupancy(start_date: date, end_date: date) -> List[Dict]:
+        """Per-day counts of occupied units and bookings in [start_date, end_date)"""
         conn = get_db_connection()
         try:
             cursor = conn.execute("""
-                SELECT COUNT(*) FROM booking_requests 
-                WHERE lodging_unit_id = ? 
-                AND status IN ('confirmed', 'pending')
-                AND (
-                    (check_in <= ? AND check_out > ?) OR
-                    (check_in < ? AND check_out >= ?) OR
-                    (check_in >= ? AND check_out <= ?)
-                )
-            """, (lodging_unit_id, check_in, check_in, check_out, check_out, check_in, check_out))
-            
-            count = cursor.fetchone()[0]
-            return count == 0
+                SELECT day,
+                       COUNT(DISTINCT lodging_unit_id) AS occupied_units,
+                       SUM(status = 'confirmed') AS confirmed,
+                       SUM(status = 'pending') AS pending
+                FROM unit_day_occupancy
+                WHERE day >= ? AND day < ?
+                GROUP BY day
+                ORDER BY day
+            """, (_iso(start_date), _iso(end_date)))
+            return [dict(row) for row in cursor.fetchall()]
         finally:
             conn.close()
-    
+
     @staticmethod
     @safe_database_operation
-    def get_available_units(check_in: date, check_out: date, guests: int = 1) -> List[Dict]:
-        """Get units available for given dates and guest count"""
+    def check_availability(lodging_unit_id: int, check_in: date, check_out: date,
+                           statuses: Optional[Tuple[str, ...]] = None,
+                           exclude_booking_id: Optional[int] = None,
+                           hold_session_id: Optional[str] = None) -> bool:
+        """
+        Check if a lodging unit is free for the nights check_in..check_out
+
+        A unit is taken by any booking in a blocking status (BOOKING_BLOCKING_STATUSES,
+        pending and confirmed by default) that overlaps the stay, by a range
+        in unit_blocks, or by an unexpired booking hold. exclude_booking_id
+        ignores that booking, e.g. when re-checking a booking's own unit, and
+        hold_session_id ignores that wizard session's holds. Outside a
+        transaction the answer comes from the availability index when it is enabled.
+        """
+        if _use_availability_index(statuses):
+            return availability_index.is_free(lodging_unit_id, check_in, check_out,
+                                              exclude_booking_id, hold_session_id)
+
+        free_sql, free_params = _unit_free_condition(check_in, check_out, statuses,
+                                                     exclude_booking_id, hold_session_id)
         conn = get_db_connection()
         try:
-            query = """
-                SELECT * FROM lodging_units
-                WHERE is_active = 1 AND capacity >= ?
-                AND id NOT IN (
-                    SELECT lodging_unit_id FROM booking_requests
-                    WHERE lodging_unit_id IS NOT NULL
-                    AND status IN ('confirmed', 'pending')
-                    AND (
-                        (check_in <= ? AND check_out > ?) OR
-                        (check_in < ? AND check_out >= ?) OR
-                        (check_in >= ? AND check_out <= ?)
-                    )
-                )
-                ORDER BY display_order, location, name
-            """
+            cursor = conn.execute(
+                f"SELECT COUNT(*) FROM lodging_units lu WHERE lu.id = ? AND {free_sql}",
+                [lodging_unit_id] + free_params
+            )
+            return cursor.fetchone()[0] > 0
+        finally:
+            conn.close()
 
-            cursor = conn.execute(query, (
-                guests, check_in, check_in, check_out, check_out, check_in, check_out
-            ))
-            
-            units = [dict(row) for row in cursor.fetchall()]
-            return units
+    @staticmethod
+    @safe_database_operation
+    def get_available_units(check_in: date, check_out: date, guests: int = 1,
+                            statuses: Optional[Tuple[str, ...]] = None,
+                            hold_session_id: Optional[str] = None) -> List[Dict]:
+        """Get active units with room for guests that are free for the given dates (index or one query)"""
+        if _use_availability_index(statuses):
+            return availability_index.free_units(check_in, check_out, guests, hold_session_id)
+
+        free_sql, free_params = _unit_free_condition(check_in, check_out, statuses,
+                                                     hold_session_id=hold_session_id)
+        conn = get_db_connection()
+        try:
+            cursor = conn.execute(f"""
+                SELECT lu.* FROM lodging_units lu
+                WHERE lu.is_active = 1 AND lu.capacity >= ?
+                AND {free_sql}
+                ORDER BY lu.display_order, lu.location, lu.name
+            """, [guests] + free_params)
+            return [dict(row) for row in cursor.fetchall()]
         finally:
             conn.close()
-    
+
     @staticmethod
     @safe_database_operation
-    def get_booking_summary() -> Dict[str, int]:
-        """Get booking summary statistics"""
+    def hold_unit(lodging_unit_id: int, check_in: date, check_out: date, session_id: str,
+                  guests: int = 1) -> int:
+        """
+        Hold a unit for a booking wizard session for BOOKING_HOLD_TTL seconds
+
+        Replaces the session's previous hold. The unit must be active and
+        have room for guests (ValueError otherwise); the hold is written only
+        if the unit is free apart from the session's own hold and raises
+        BookingConflictError when it is not.
+        """
+        if not session_id:
+            raise ValueError("A session id is required to hold a unit")
+        if _iso(check_in) >= _iso(check_out):
+            raise ValueError("Check-out date must be after check-in date")
+
+        free_sql, free_params = _unit_free_condition(check_in, check_out, hold_session_id=session_id)
+        with transaction() as conn:
+            unit = conn.execute("SELECT capacity FROM lodging_units WHERE id = ? AND is_active = 1",
+                                (lodging_unit_id,)).fetchone()
+            if not unit:
+                raise ValueError("Invalid or inactive lodging unit")
+            if (unit[0] or 0) < guests:
+                raise ValueError(f"This accommodation holds at most {unit[0]} guests")
+
+            conn.execute("DELETE FROM booking_holds WHERE session_id = ?", (session_id,))
+            cursor = conn.execute(f"""
+                INSERT INTO booking_holds (lodging_unit_id, check_in, check_out, session_id, expires_at)
+                SELECT lu.id, ?, ?, ?, datetime('now', ?) FROM lodging_units lu
+                WHERE lu.id = ? AND lu.is_active = 1 AND {free_sql}
+            """, [_iso(check_in), _iso(check_out), session_id,
+                  f"+{int(config.settings.booking_hold_ttl)} seconds", lodging_unit_id] + free_params)
+            if not cursor.rowcount:
+                raise BookingConflictError("Selected accommodation is no longer available for those dates")
+            hold_id = cursor.lastrowid
+            after_commit(availability_index.invalidate)
+
+        hold_sweeper.start()
+        logging.info(f"Held unit {lodging_unit_id} from {_iso(check_in)} to {_iso(check_out)}")
+        return hold_id
+
+    @staticmethod
+    @safe_database_operation
+    def release_hold(session_id: str) -> bool:
+        """Drop a booking wizard session's hold, if any"""
+        if not session_id:
+            return False
+        with transaction() as conn:
+            cursor = conn.execute("DELETE FROM booking_holds WHERE session_id = ?", (session_id,))
+            released = cursor.rowcount > 0
+            if released:
+                after_commit(availability_index.invalidate)
+        return released
+
+    @staticmethod
+    @safe_database_operation
+    def get_available_units_bulk(requests: List[Tuple[date, date, int]],
+                                 statuses: Optional[Tuple[str, ...]] = None) -> List[List[Dict]]:
+        """
+        get_available_units for many (check_in, check_out, guests) requests
+
+        Busy intervals are read at most once (from the availability index, or
+        one batched read over the union of the date ranges) and every request
+        is answered in memory. Results are in request order.
+        """
+        return availability_index.free_units_bulk(requests, statuses,
+                                                  use_index=_use_availability_index(statuses))
+
+    @staticmethod
+    @safe_database_operation
+    def find_group_allocations(check_in: date, check_out: date, guests: int,
+                               location: Optional[str] = None, limit: int = 5) -> List[Dict]:
+        """
+        Ranked sets of free units that together hold the party for the dates
+
+        Fewest units first, then fewest locations, then least spare capacity;
+        location restricts the sets to one location. See utils.group_allocation.
+        """
+        free_units = BookingOperations.get_available_units(check_in, check_out) or []
+        return find_group_allocations(free_units, guests, location, limit)
+
+    @staticmethod
+    @safe_database_operation
+    def find_windows(nights: int, guests: int = 1, earliest: Optional[date] = None,
+                     latest: Optional[date] = None, location: Optional[str] = None,
+                     limit: int = 5, prefer: str = 'soonest', target: Optional[date] = None) -> List[Dict]:
+        """
+        Find free stays of `nights` nights without probing day by day
+
+        Scans the gaps between each unit's sorted bookings and blocks between
+        earliest and latest (the last allowed check-out) and returns the top
+        `limit` windows ranked by prefer ('soonest', 'best_fit' or 'closest'
+        to target). Each window has lodging_unit_id, unit, check_in, check_out
+        and free_nights (length of the gap it sits in).
+        """
+        if nights < 1:
+            raise ValueError("A stay must be at least one night")
+        if prefer not in ('soonest', 'best_fit', 'closest'):
+            raise ValueError(f"Unknown window preference: {prefer}")
+        return availability_index.find_windows(nights, guests, earliest, latest, location, limit, prefer, target)
+
+    @staticmethod
+    @safe_database_operation
+    def suggest_dates(nights: int, target: date, guests: int = 1, earliest: Optional[date] = None,
+                      latest: Optional[date] = None, location: Optional[str] = None,
+                      limit: int = 5) -> List[Dict]:
+        """
+        Suggest up to `limit` alternative dates for a stay, nearest target first
+
+        Unlike find_windows(), which ranks per-unit windows, each suggestion
+        is a distinct (check_in, check_out) pair with the list of units free
+        for it, so units sharing the nearest dates don't crowd out the rest.
+        """
+        if nights < 1:
+            raise ValueError("A stay must be at least one night")
+        return availability_index.suggest_dates(nights, target, guests, earliest, latest, location, limit)
+
+    @staticmethod
+    @safe_database_operation
+    def plan_room_assignments(min_gap_nights: int = 2) -> AssignmentPlan:
+        """
+        Propose units for every upcoming pending inquiry without one
+
+        Reads units, current commitments (bookings holding a unit,
+        unit_blocks ranges and unexpired booking holds) and the inquiry queue
+        in one batch and runs the optimizer in utils.assignment. Nothing is
+        written.
+        """
+        statuses = config.settings.blocking_statuses
+        placeholders = ", ".join("?" for _ in statuses)
+        today = date.today().isoformat()
         conn = get_db_connection()
         try:
-            # Get total units
-            cursor = conn.execute("SELECT COUNT(*) FROM lodging_units WHERE is_active = 1")
-            total_units = cursor.fetchone()[0]
+            units_cursor, bookings_cursor, blocks_cursor, holds_cursor, inquiries_cursor = conn.execute_batch([
+                ("SELECT * FROM lodging_units ORDER BY display_order, location, name", ()),
+                (f"""
+                    SELECT lodging_unit_id, check_in AS start, check_out AS "end" FROM booking_requests
+                    WHERE status IN ({placeholders}) AND lodging_unit_id IS NOT NULL AND check_out > ?
+                """, statuses + (today,)),
+                ('SELECT lodging_unit_id, start_date AS start, end_date AS "end" FROM unit_blocks WHERE end_date > ?',
+                 (today,)),
+                # Units guests are holding in the booking wizard
+                ("""
+                    SELECT lodging_unit_id, check_in AS start, check_out AS "end" FROM booking_holds
+                    WHERE expires_at > CURRENT_TIMESTAMP AND check_out > ?
+                """, (today,)),
+                ("""
+                    SELECT * FROM booking_requests
+                    WHERE status = 'pending' AND lodging_unit_id IS NULL AND check_in >= ?
+                    ORDER BY check_in
+                """, (today,)),
+            ])
+            units = [dict(row) for row in units_cursor.fetchall()]
+            commitments = [dict(row) for row in bookings_cursor.fetchall()]
+            commitments += [dict(row) for row in blocks_cursor.fetchall()]
+            commitments += [dict(row) for row in holds_cursor.fetchall()]
+            inquiries = [dict(row) for row in inquiries_cursor.fetchall()]
+        finally:
+            conn.close()
 
-            # Get pending bookings/requests
-            cursor = conn.execute("SELECT COUNT(*) FROM booking_requests WHERE status = 'pending'")
-            pending_bookings = cursor.fetchone()[0]
+        plan = plan_assignments(units, commitments, inquiries, min_gap_nights)
+        logging.info(f"Planned {len(plan.assignments)} of {len(inquiries)} inquiries "
+                     f"({plan.fulfilled_nights}/{plan.requested_nights} nights)")
+        return plan
 
-            # Get confirmed bookings
-            cursor = conn.execute("SELECT COUNT(*) FROM booking_requests WHERE status = 'confirmed'")
-            confirmed_bookings = cursor.fetchone()[0]
+    @staticmethod
+    @safe_database_operation
+    def apply_assignment_plan(assignments: List[Dict]) -> Dict:
+        """
+        Assign the units of a reviewed plan in one transaction
 
-            # Get today's check-ins
-            today = date.today()
-            cursor = conn.execute("SELECT COUNT(*) FROM booking_requests WHERE check_in = ? AND status = 'confirmed'", (today,))
-            todays_checkins = cursor.fetchone()[0]
+        Every assignment is re-checked against the database first; if any
+        inquiry was changed or its unit was taken since planning, nothing is
+        applied. Returns {'applied': count, 'conflicts': [booking ids]}.
+        """
+        conflicts = []
+        try:
+            with transaction() as conn:
+                for assignment in assignments:
+                    booking_id = assignment['booking_id']
+                    if not _assign_if_free(conn, booking_id, assignment['lodging_unit_id'],
+                                           assignment['check_in'], assignment['check_out'],
+                                           "AND status = 'pending' AND lodging_unit_id IS NULL"):
+                        conflicts.append(booking_id)
+                        continue
+                    refresh_booking_occupancy(conn, booking_id)
 
-            # Confirmed bookings this month
-            cursor = conn.execute("""
-                SELECT COUNT(*) FROM booking_requests
-                WHERE status = 'confirmed'
-                AND strftime('%Y-%m', check_in) = strftime('%Y-%m', 'now')
-            """)
-            confirmed_this_month = cursor.fetchone()[0]
+                if conflicts:
+                    raise _PlanConflict()
+                after_commit(availability_index.invalidate)
+        except _PlanConflict:
+            logging.warning(f"Assignment plan not applied; changed since planning: {conflicts}")
+            return {'applied': 0, 'conflicts': conflicts}
 
-            # Current occupancy (active bookings today)
-            cursor = conn.execute("""
-                SELECT COUNT(*) FROM booking_requests
-                WHERE status = 'confirmed'
-                AND date('now') >= check_in
-                AND date('now') < check_out
-            """)
-            current_occupancy = cursor.fetchone()[0]
+        logging.info(f"Applied assignment plan for {len(assignments)} inquiries")
+        return {'applied': len(assignments), 'conflicts': []}
+
+    @staticmethod
+    @safe_database_operation
+    def get_booking_summary() -> Dict[str, int]:
+        """Get booking summary statistics"""
+        conn = get_db_connection()
+        try:
+            today = date.today()
+            cursors = conn.execute_batch([
+                # Total units
+                ("SELECT COUNT(*) FROM lodging_units WHERE is_active = 1", ()),
+                # Pending bookings/requests
+                ("SELECT COUNT(*) FROM booking_requests WHERE status = 'pending'", ()),
+                # Confirmed bookings
+                ("SELECT COUNT(*) FROM booking_requests WHERE status = 'confirmed'", ()),
+                # Today's check-ins
+                ("SELECT COUNT(*) FROM booking_requests WHERE check_in = ? AND status = 'confirmed'", (today,)),
+                # Confirmed bookings this month
+                ("""
+                    SELECT COUNT(*) FROM booking_requests
+                    WHERE status = 'confirmed'
+                    AND strftime('%Y-%m', check_in) = strftime('%Y-%m', 'now')
+                """, ()),
+                # Current occupancy (active bookings today)
+                ("""
+                    SELECT COUNT(*) FROM unit_day_occupancy
+                    WHERE day = date('now') AND status = 'confirmed'
+                """, ()),
+            ])
+            (total_units, pending_bookings, confirmed_bookings, todays_checkins,
+             confirmed_this_month, current_occupancy) = [cursor.fetchone()[0] for cursor in cursors]
 
             return {
                 'total_units': total_units,
@@ -334,64 +738,101 @@ class BookingOperations:
             conn.close()
     
     @staticmethod
-    def check_availability(lodging_unit_id: int, check_in: date, check_out: date) -> bool:
-        """Check if a lodging unit is available for given dates"""
+    @safe_database_operation
+    def get_unit_blocks(start_date: date, end_date: date, lodging_unit_id: Optional[int] = None) -> List[Dict]:
+        """Get blocked ranges overlapping [start_date, end_date), optionally for one unit"""
         conn = get_db_connection()
-        
-        # Check for confirmed bookings that overlap
-        cursor = conn.execute("""
-            SELECT COUNT(*) FROM booking_requests
-            WHERE lodging_unit_id = ? 
-            AND status = 'confirmed'
-            AND NOT (check_out <= ? OR check_in >= ?)
-        """, (lodging_unit_id, check_in.isoformat(), check_out.isoformat()))
-        
-        overlapping_bookings = cursor.fetchone()[0]
-        
-        # Check availability calendar for blocked dates
-        cursor = conn.execute("""
-            SELECT COUNT(*) FROM availability_calendar
-            WHERE lodging_unit_id = ?
-            AND date >= ? AND date < ?
-            AND is_available = 0
-        """, (lodging_unit_id, check_in.isoformat(), check_out.isoformat()))
-        
-        blocked_dates = cursor.fetchone()[0]
-        
-        conn.close()
-        return overlapping_bookings == 0 and blocked_dates == 0
-    
+        try:
+            query = """
+                SELECT ub.*, lu.name as lodging_name, lu.location as lodging_location
+                FROM unit_blocks ub
+                LEFT JOIN lodging_units lu ON ub.lodging_unit_id = lu.id
+                WHERE ub.end_date > ? AND ub.start_date < ?
+            """
+            params = [_iso(start_date), _iso(end_date)]
+            if lodging_unit_id:
+                query += " AND ub.lodging_unit_id = ?"
+                params.append(lodging_unit_id)
+            query += " ORDER BY ub.start_date, lu.display_order, lu.name"
+
+            cursor = conn.execute(query, params)
+            return [dict(row) for row in cursor.fetchall()]
+        finally:
+            conn.close()
+
     @staticmethod
-    def get_available_units(check_in: date, check_out: date, min_capacity: int = 1) -> List[Dict]:
-        """Get all available units for given dates and capacity"""
-        units = BookingOperations.get_all_lodging_units()
-        available_units = []
-        
-        for unit in units:
-            if unit['capacity'] >= min_capacity:
-                if BookingOperations.check_availability(unit['id'], check_in, check_out):
-                    available_units.append(unit)
-        
-        return available_units
-    
+    def block_dates(lodging_unit_id: int, start_date: date, end_date: date, notes: str = "",
+                    created_by: Optional[str] = None) -> bool:
+        """Block dates [start_date, end_date) for a lodging unit"""
+        return bool(BookingOperations.block_units([lodging_unit_id], start_date, end_date, notes, created_by))
+
     @staticmethod
-    def block_dates(lodging_unit_id: int, start_date: date, end_date: date, notes: str = "") -> bool:
-        """Block dates for a lodging unit"""
+    @safe_database_operation
+    def block_units(lodging_unit_ids: List[int], start_date: date, end_date: date,
+                    reason: str = "", created_by: Optional[str] = None) -> int:
+        """Block [start_date, end_date) for several units at once (e.g. a whole location)"""
+        if _iso(start_date) >= _iso(end_date):
+            raise ValueError("Block end date must be after the start date")
+
+        reason = sanitize_input(reason, 500)
+        rows = [(unit_id, _iso(start_date), _iso(end_date), reason, created_by)
+                for unit_id in dict.fromkeys(lodging_unit_ids)]
+        if not rows:
+            return 0
+
         conn = get_db_connection()
-        
-        current_date = start_date
-        while current_date < end_date:
-            conn.execute("""
-                INSERT OR REPLACE INTO availability_calendar
-                (lodging_unit_id, date, is_available, notes)
-                VALUES (?, ?, 0, ?)
-            """, (lodging_unit_id, current_date.isoformat(), notes))
-            
-            # Move to next day
-            from datetime import timedelta
-            current_date += timedelta(days=1)
-        
-        conn.commit()
-        conn.close()
+        try:
+            # One range row per unit, sent as a single batch
+            conn.executemany("""
+                INSERT INTO unit_blocks (lodging_unit_id, start_date, end_date, reason, created_by)
+                VALUES (?, ?, ?, ?, ?)
+            """, rows)
+            conn.commit()
+        finally:
+            conn.close()
+        after_commit(availability_index.invalidate)
+
+        logging.info(f"Blocked {len(rows)} units from {_iso(start_date)} to {_iso(end_date)}")
+        return len(rows)
+
+    @staticmethod
+    @safe_database_operation
+    def unblock_units(lodging_unit_ids: List[int], start_date: date, end_date: date) -> bool:
+        """
+        Free [start_date, end_date) for several units
+
+        Blocks inside the range are removed, blocks overlapping an edge are
+        trimmed, and a block spanning the whole range is split in two.
+        """
+        unit_ids = list(dict.fromkeys(lodging_unit_ids))
+        if not unit_ids:
+            return False
+        start, end = _iso(start_date), _iso(end_date)
+        units = ", ".join("?" for _ in unit_ids)
+
+        with transaction() as conn:
+            # Tail of blocks spanning the whole range
+            conn.execute(f"""
+                INSERT INTO unit_blocks (lodging_unit_id, start_date, end_date, reason, created_by)
+                SELECT lodging_unit_id, ?, end_date, reason, created_by FROM unit_blocks
+                WHERE lodging_unit_id IN ({units}) AND start_date < ? AND end_date > ?
+            """, [end] + unit_ids + [start, end])
+            # Blocks starting before the range now end where it starts
+            conn.execute(f"""
+                UPDATE unit_blocks SET end_date = ?
+                WHERE lodging_unit_id IN ({units}) AND start_date < ? AND end_date > ?
+            """, [start] + unit_ids + [start, start])
+            # Blocks starting inside the range and ending after it start where it ends
+            conn.execute(f"""
+                UPDATE unit_blocks SET start_date = ?
+                WHERE lodging_unit_id IN ({units}) AND start_date >= ? AND start_date < ? AND end_date > ?
+            """, [end] + unit_ids + [start, end, end])
+            # Blocks entirely inside the range
+            conn.execute(f"""
+                DELETE FROM unit_blocks
+                WHERE lodging_unit_id IN ({units}) AND start_date >= ? AND end_date <= ?
+            """, unit_ids + [start, end])
+            after_commit(availability_index.invalidate)
+
+        logging.info(f"Unblocked {len(unit_ids)} units from {start} to {end}")
         return True
-    
@@ -449,36 +449,28 @@ class PropertyManagementOperations:
         """Get comprehensive property management dashboard summary"""
         conn = get_db_connection()
         try:
-            summary = {}
-            
-            # Pending maintenance tasks
-            cursor = conn.execute("SELECT COUNT(*) FROM maintenance_tasks WHERE status = 'pending'")
-            summary['pending_maintenance'] = cursor.fetchone()[0]
-            
-            # Overdue maintenance
-            cursor = conn.execute("SELECT COUNT(*) FROM maintenance_tasks WHERE scheduled_date < ? AND status = 'pending'", (date.today(),))
-            summary['overdue_maintenance'] = cursor.fetchone()[0]
-            
-            # Pending todos
-            cursor = conn.execute("SELECT COUNT(*) FROM property_todos WHERE status = 'pending'")
-            summary['pending_todos'] = cursor.fetchone()[0]
-            
-            # Overdue todos
-            cursor = conn.execute("SELECT COUNT(*) FROM property_todos WHERE due_date < ? AND status = 'pending'", (date.today(),))
-            summary['overdue_todos'] = cursor.fetchone()[0]
-            
-            # Recent notes
-            cursor = conn.execute("SELECT COUNT(*) FROM property_notes WHERE created_at >= ?", (datetime.now() - timedelta(days=7),))
-            summary['recent_notes'] = cursor.fetchone()[0]
-            
-            # Total property files
-            cursor = conn.execute("SELECT COUNT(*) FROM property_files")
-            summary['total_files'] = cursor.fetchone()[0]
-            
-            # Inspections due soon (next 30 days)
-            cursor = conn.execute("SELECT COUNT(*) FROM property_inspections WHERE next_inspection_date BETWEEN ? AND ?", 
-                                (date.today(), date.today() + timedelta(days=30)))
-            summary['inspections_due_soon'] = cursor.fetchone()[0]
+            today = date.today()
+            queries = {
+                # Pending maintenance tasks
+                'pending_maintenance': ("SELECT COUNT(*) FROM maintenance_tasks WHERE status = 'pending'", ()),
+                # Overdue maintenance
+                'overdue_maintenance': ("SELECT COUNT(*) FROM maintenance_tasks WHERE scheduled_date < ? AND status = 'pending'", (today,)),
+                # Pending todos
+                'pending_todos': ("SELECT COUNT(*) FROM property_todos WHERE status = 'pending'", ()),
+                # Overdue todos
+                'overdue_todos': ("SELECT COUNT(*) FROM property_todos WHERE due_date < ? AND status = 'pending'", (today,)),
+                # Recent notes
+                'recent_notes': ("SELECT COUNT(*) FROM property_notes WHERE created_at >= ?", (datetime.now() - timedelta(days=7),)),
+                # Total property files
+                'total_files': ("SELECT COUNT(*) FROM property_files", ()),
+                # Inspections due soon (next 30 days)
+                'inspections_due_soon': ("SELECT COUNT(*) FROM property_inspections WHERE next_inspection_date BETWEEN ? AND ?",
+                                         (today, today + timedelta(days=30))),
+            }
+
+            # One round trip for all counts
+            cursors = conn.execute_batch(queries.values())
+            summary = {key: cursor.fetchone()[0] for key, cursor in zip(queries, cursors)}
             
             return summary
         finally:
@@ -3,13 +3,13 @@
 Fix facility names and make non-bookable facilities inactive for booking
 """
 
-import sqlite3
 import sys
+from database.connection import get_db_connection
 
 def fix_facilities():
     """Fix duplicate location names and make facilities non-bookable"""
 
-    conn = sqlite3.connect('wellspring_bookings.db')
+    conn = get_db_connection()
     cursor = conn.cursor()
 
     print("Fixing facility names and bookability...")
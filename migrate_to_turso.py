@@ -32,6 +32,9 @@ from database.models import initialize_database, seed_initial_data
 from database.connection import get_db_connection
 import sqlite3
 
+# Rows read from the local database and sent to Turso per request
+PAGE_SIZE = 500
+
 def migrate_data():
     """Migrate data from local SQLite to Turso"""
 
@@ -66,22 +69,25 @@ def migrate_data():
     # Tables to migrate (in order due to foreign keys)
     tables = [
         "lodging_units",
+        "booking_groups",
         "booking_requests",
         "property_notes",
         "maintenance_tasks",
         "property_todos",
         "property_files",
         "property_inspections",
-        "maintenance_schedules"
+        "maintenance_schedules",
+        "unit_blocks",
+        "unit_day_occupancy"
     ]
 
     for table in tables:
         print(f"\n  Migrating table: {table}")
 
         try:
-            # Get all rows from local table
+            # Read the local table a page at a time
             local_cursor = local_conn.execute(f"SELECT * FROM {table}")
-            rows = local_cursor.fetchall()
+            rows = local_cursor.fetchmany(PAGE_SIZE)
 
             if not rows:
                 print(f"    [SKIP] No data in {table}")
@@ -95,12 +101,13 @@ def migrate_data():
             column_names = ", ".join(columns)
             insert_sql = f"INSERT OR REPLACE INTO {table} ({column_names}) VALUES ({placeholders})"
 
-            # Insert each row into Turso
+            # Insert each page into Turso as one batched request
             count = 0
-            for row in rows:
-                values = tuple(row[col] for col in columns)
-                turso_conn.execute(insert_sql, values)
-                count += 1
+            while rows:
+                values = [tuple(row[col] for col in columns) for row in rows]
+                turso_conn.executemany(insert_sql, values)
+                count += len(values)
+                rows = local_cursor.fetchmany(PAGE_SIZE)
 
             turso_conn.commit()
             print(f"    [OK] Migrated {count} rows")
@@ -1,3 +1,4 @@
+import uuid
 import streamlit as st
 from datetime import datetime, date, timedelta
 from utils.helpers import (
@@ -8,6 +9,7 @@ from utils.helpers import (
     format_error_message
 )
 from utils.styles import show_success_message, show_error_message
+from database.connection import BookingConflictError, config
 from database.operations import BookingOperations
 
 def show_booking_page():
@@ -24,6 +26,10 @@ def show_booking_page():
     if 'booking_step' not in st.session_state:
         st.session_state.booking_step = 1
 
+    # Identifies this visitor's holds on units picked at step 4
+    if 'hold_session_id' not in st.session_state:
+        st.session_state.hold_session_id = uuid.uuid4().hex
+
     # Simple step indicator using native Streamlit
     steps = ["Type", "Dates", "Details", "Room", "Confirm"]
     current_step = st.session_state.booking_step
@@ -166,6 +172,15 @@ def show_date_selection():
         st.error(format_error_message(guest_error, "Guest Count"))
         return
     
+    # Offer nearby openings when the chosen dates are full
+    available_units = BookingOperations.get_available_units(
+        check_in, check_out, guests, hold_session_id=st.session_state.hold_session_id
+    )
+    if available_units is not None and not available_units:
+        st.warning("No accommodations are free for these dates.")
+        if st.checkbox("💡 Suggest dates", key="suggest_dates"):
+            show_date_suggestions(check_in, duration, guests)
+    
     col1, col2 = st.columns(2)
     with col1:
         if st.button("← Back"):
@@ -180,6 +195,35 @@ def show_date_selection():
             st.session_state.booking_step = 3
             st.rerun()
 
+def show_date_suggestions(check_in: date, nights: int, guests: int):
+    """List the free stays of the same length nearest the requested check-in"""
+    # Each suggestion is a distinct date pair with every unit free for it
+    suggestions = BookingOperations.suggest_dates(
+        nights, check_in, guests,
+        earliest=max(date.today(), check_in - timedelta(days=30)),
+        latest=min(check_in + timedelta(days=120), date.today() + timedelta(days=365 + nights)),
+        limit=5
+    ) or []
+
+    if not suggestions:
+        st.info("We couldn't find an opening near those dates. Please contact us and we'll help you plan your stay.")
+        return
+
+    for suggestion in suggestions:
+        suggested_in, suggested_out, units = suggestion['check_in'], suggestion['check_out'], suggestion['units']
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            locations = ", ".join(sorted({unit['location'] for unit in units}))
+            st.write(f"**{suggested_in.strftime('%a %b %d')} – {suggested_out.strftime('%a %b %d')}** "
+                     f"· {len(units)} accommodation{'s' if len(units) != 1 else ''} ({locations})")
+        with col2:
+            if st.button("Use these dates", key=f"use_dates_{suggested_in}"):
+                st.session_state.check_in = suggested_in
+                st.session_state.check_out = suggested_out
+                st.session_state.guests = guests
+                st.session_state.booking_step = 3
+                st.rerun()
+
 def show_guest_info():
     """Step 3: Guest information"""
     st.header("Step 3: Your information")
@@ -267,12 +311,16 @@ def show_guest_info():
 def show_lodging_selection():
     """Step 4: Lodging selection"""
     st.header("Step 4: Choose your accommodation")
+
+    if 'booking_conflict' in st.session_state:
+        st.error(st.session_state.pop('booking_conflict'))
     
-    # Get available units
+    # Get available units (a unit this visitor is holding still counts as available)
     available_units = BookingOperations.get_available_units(
         st.session_state.check_in,
         st.session_state.check_out,
-        st.session_state.guests
+        st.session_state.guests,
+        hold_session_id=st.session_state.hold_session_id
     )
     
     if not available_units:
@@ -307,20 +355,35 @@ def show_lodging_selection():
             with col2:
                 st.write("")  # Spacer
                 if st.button(f"Select", key=f"select_unit_{unit['id']}"):
-                    selected_unit_id = unit['id']
-                    st.session_state.selected_unit = unit
-                    st.session_state.booking_step = 5
-                    st.rerun()
+                    # Hold the unit while the guest confirms
+                    try:
+                        held = BookingOperations.hold_unit(
+                            unit['id'], st.session_state.check_in, st.session_state.check_out,
+                            st.session_state.hold_session_id, st.session_state.guests
+                        )
+                    except BookingConflictError:
+                        st.error(f"Sorry, {unit['name']} was just taken for these dates. Please choose another accommodation.")
+                    else:
+                        if held:
+                            selected_unit_id = unit['id']
+                            st.session_state.selected_unit = unit
+                            st.session_state.booking_step = 5
+                            st.rerun()
+                        # None: hold_unit already reported a database error
+                        st.error(f"We couldn't reserve {unit['name']} just now. Please try again.")
     
     # Option to proceed without specific unit selection
     st.markdown("---")
     st.markdown("**Not sure which accommodation to choose?**")
     if st.button("Let staff choose the best option for me"):
+        BookingOperations.release_hold(st.session_state.hold_session_id)
         st.session_state.selected_unit = None
         st.session_state.booking_step = 5
         st.rerun()
     
     if st.button("← Back"):
+        BookingOperations.release_hold(st.session_state.hold_session_id)
+        st.session_state.selected_unit = None
         st.session_state.booking_step = 3
         st.rerun()
 
@@ -359,6 +422,10 @@ def show_confirmation():
     {st.session_state.get('notes', 'None')}
     """)
 
+    if st.session_state.get('selected_unit'):
+        st.caption(f"⏳ We're holding {st.session_state.selected_unit['name']} for you for "
+                   f"{max(int(config.settings.booking_hold_ttl // 60), 1)} minutes while you submit.")
+
     with st.container():
         st.markdown("### 📞 Next Steps:")
         st.markdown("""
@@ -395,7 +462,8 @@ def show_confirmation():
                 'guests': st.session_state.guests,
                 'lodging_unit_id': st.session_state.selected_unit['id'] if st.session_state.get('selected_unit') else None,
                 'special_requests': st.session_state.get('special_requests', ''),
-                'notes': st.session_state.get('notes', '')
+                'notes': st.session_state.get('notes', ''),
+                'hold_session_id': st.session_state.hold_session_id
             }
             
             try:
@@ -421,6 +489,15 @@ def show_confirmation():
                     st.session_state.booking_step = 1
                     st.rerun()
                     
+            except BookingConflictError:
+                # Someone else took the unit since step 4; back to choosing, with the reason
+                unit = st.session_state.pop('selected_unit', None)
+                st.session_state.booking_conflict = (
+                    f"Sorry, {unit['name'] if unit else 'that accommodation'} was just booked by someone else "
+                    "for these dates. Please choose another accommodation."
+                )
+                st.session_state.booking_step = 4
+                st.rerun()
             except Exception as e:
                 st.error(f"An error occurred while submitting your request: {str(e)}")
                 st.error("Please try again or contact us directly.")
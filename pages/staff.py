@@ -1,5 +1,7 @@
+import io
 import streamlit as st
 import pandas as pd
+from csv import DictWriter
 from datetime import datetime, date, timedelta
 from utils.auth import require_auth, create_logout_button
 from utils.helpers import (
@@ -7,7 +9,15 @@ from utils.helpers import (
     format_date_range, get_booking_type_info, create_availability_calendar,
     create_visual_calendar, get_availability_summary, format_lodging_display
 )
+from utils.occupancy import build_occupancy_matrix
+from utils.group_allocation import find_group_allocations
 from utils.styles import show_success_message, show_error_message
+from database.connection import (
+    BookingConflictError, transaction, config, query_stats, get_turso_pool, get_turso_replica
+)
+from database.availability import availability_index
+from database.daily_occupancy import check_occupancy, rebuild_occupancy
+from database.migrations import current_version, latest_version
 from database.operations import BookingOperations
 from database.property_operations import PropertyManagementOperations
 from pages.property_management import show_property_management_page
@@ -29,8 +39,8 @@ def show_staff_page():
     # Create mobile-friendly tabs/selectbox
     mobile_page = st.selectbox(
         "Choose a view:",
-        ["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports"],
-        index=["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports"].index(st.session_state.staff_page),
+        ["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports", "Diagnostics"],
+        index=["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports", "Diagnostics"].index(st.session_state.staff_page),
         key="mobile_staff_nav"
     )
 
@@ -46,8 +56,8 @@ def show_staff_page():
         st.header("📋 Dashboard Menu")
         sidebar_page = st.radio(
             "Select view:",
-            ["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports"],
-            index=["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports"].index(st.session_state.staff_page),
+            ["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports", "Diagnostics"],
+            index=["Overview", "Booking Requests", "Active Stays", "Assign Rooms", "Manage Bookings", "Availability", "Property Management", "Reports", "Diagnostics"].index(st.session_state.staff_page),
             key="staff_page_selection"
         )
 
@@ -75,6 +85,8 @@ def show_staff_page():
         show_property_management_page()
     elif page == "Reports":
         show_reports()
+    elif page == "Diagnostics":
+        show_diagnostics()
 
 def show_overview():
     """Enhanced dashboard overview with key metrics and quick calendar"""
@@ -102,9 +114,10 @@ def show_overview():
     
     units = BookingOperations.get_all_lodging_units()
     bookings = BookingOperations.get_all_booking_requests()
+    blocked = BookingOperations.get_unit_blocks(date.today(), date.today() + timedelta(days=7))
     
     if units and bookings is not None:
-        availability_df = create_availability_calendar(units, bookings, days_ahead=7)
+        availability_df = create_availability_calendar(units, bookings, days_ahead=7, blocked=blocked)
         
         if not availability_df.empty:
             create_visual_calendar(availability_df)
@@ -328,15 +341,17 @@ def show_availability_management():
     
     location_filter = None if selected_location == "All Locations" else selected_location
     
-    # Create availability calendar
-    availability_df = create_availability_calendar(units, bookings, days_ahead=21)
+    # Build the occupancy matrix once; the calendar and summary derive from it
+    blocked = BookingOperations.get_unit_blocks(date.today(), date.today() + timedelta(days=21))
+    occupancy = build_occupancy_matrix(units, bookings or [], days=21, blocked=blocked)
+    availability_df = occupancy.to_dataframe()
     
     if availability_df.empty:
         st.warning("No availability data to display")
         return
     
     # Show summary statistics
-    summary = get_availability_summary(availability_df)
+    summary = get_availability_summary(occupancy)
     if summary:
         col1, col2, col3, col4 = st.columns(4)
         with col1:
@@ -348,6 +363,8 @@ def show_availability_management():
         with col4:
             st.metric("Occupancy Rate", f"{summary.get('occupancy_rate', 0)}%")
     
+    show_block_dates_form(units, location_filter)
+    
     st.markdown("---")
     
     # Visual calendar display
@@ -377,6 +394,8 @@ def show_availability_management():
                 with col2:
                     if day['available']:
                         st.success("Available")
+                    elif day['status'] == 'blocked':
+                        st.info("Blocked")
                     else:
                         if day['booking_info'] and day['booking_info']['status'] == 'pending':
                             st.warning("Pending")
@@ -389,6 +408,123 @@ def show_availability_management():
                         st.write(f"Guest: {info.get('guest_name', 'Unknown')} ({info.get('booking_type', 'N/A')})")
 
 
+def show_block_dates_form(units, location_filter=None):
+    """Block or unblock a date range for several units (e.g. a whole location)"""
+    with st.expander("🚫 Block or unblock dates"):
+        unit_names = {unit['id']: f"{unit['name']} ({unit['location']})" for unit in units}
+        default_units = [unit['id'] for unit in units if unit['location'] == location_filter]
+        selected_units = st.multiselect(
+            "Units:", list(unit_names), default=default_units,
+            format_func=unit_names.get, key="block_units"
+        )
+        col1, col2 = st.columns(2)
+        with col1:
+            block_start = st.date_input("From:", value=date.today(), key="block_start")
+        with col2:
+            block_end = st.date_input("Until (exclusive):", value=date.today() + timedelta(days=7), key="block_end")
+        reason = st.text_input("Reason:", key="block_reason", placeholder="e.g. Winter maintenance")
+        created_by = st.text_input("Your name:", key="block_created_by")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Block dates", type="primary", disabled=not selected_units):
+                if block_start >= block_end:
+                    show_error_message("The end date must be after the start date.")
+                elif BookingOperations.block_units(selected_units, block_start, block_end, reason, created_by or None):
+                    show_success_message(f"Blocked {len(selected_units)} units from {block_start} to {block_end}.")
+                    st.rerun()
+        with col2:
+            if st.button("Unblock dates", disabled=not selected_units):
+                if block_start >= block_end:
+                    show_error_message("The end date must be after the start date.")
+                elif BookingOperations.unblock_units(selected_units, block_start, block_end):
+                    show_success_message(f"Unblocked {len(selected_units)} units from {block_start} to {block_end}.")
+                    st.rerun()
+
+        blocks = BookingOperations.get_unit_blocks(date.today(), date.today() + timedelta(days=365))
+        if blocks:
+            st.write("**Upcoming blocks:**")
+            st.dataframe(
+                pd.DataFrame(blocks)[['lodging_name', 'start_date', 'end_date', 'reason', 'created_by']],
+                use_container_width=True, hide_index=True
+            )
+
+def show_group_options(booking, free_units):
+    """Offer sets of free units that together hold a party, and book one as a linked group"""
+    with st.expander(f"👥 Book across several units ({booking['guests']} guests)"):
+        locations = sorted({unit['location'] for unit in free_units})
+        location = st.selectbox("Location:", ["Any"] + locations, key=f"group_location_{booking['id']}")
+        options = find_group_allocations(free_units, booking['guests'], None if location == "Any" else location,
+                                         min_units=2)
+
+        if not options:
+            st.info("No combination of free units holds the whole party for these dates.")
+            return
+
+        for i, option in enumerate(options):
+            col1, col2 = st.columns([3, 1])
+            with col1:
+                st.write(f"**{' + '.join(unit['name'] for unit in option['units'])}**")
+                st.caption(f"{len(option['units'])} units · {option['capacity']} beds "
+                           f"({option['spare']} spare) · {', '.join(option['locations'])}")
+            with col2:
+                if st.button("Book group", key=f"group_{booking['id']}_{i}"):
+                    try:
+                        group_id = BookingOperations.assign_group_to_booking(
+                            booking['id'], [unit['id'] for unit in option['units']]
+                        )
+                    except BookingConflictError as e:
+                        show_error_message(f"{e}. Please pick another set of units.")
+                        group_id = None
+                    if group_id:
+                        show_success_message(f"Booked {booking['guest_name']} across {len(option['units'])} units "
+                                             f"(group #{group_id}).")
+                        st.rerun()
+
+def show_assignment_plan():
+    """Propose units for the whole inquiry queue and apply them after review"""
+    with st.expander("🧮 Plan all assignments"):
+        st.caption("Places every upcoming unassigned inquiry at once, filling as many nights as possible "
+                   "while avoiding short gaps between stays that nobody can book.")
+        min_gap_nights = st.number_input("Gaps shorter than this many nights count as unusable:",
+                                         min_value=1, max_value=14, value=2, key="plan_min_gap")
+        if st.button("Plan assignments", key="plan_assignments"):
+            st.session_state.assignment_plan = BookingOperations.plan_room_assignments(int(min_gap_nights))
+
+        plan = st.session_state.get('assignment_plan')
+        if not plan:
+            return
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Inquiries placed", f"{len(plan.assignments)} / {len(plan.assignments) + len(plan.unassigned)}")
+        with col2:
+            st.metric("Nights filled", f"{plan.fulfilled_nights} / {plan.requested_nights}")
+        with col3:
+            st.metric("Unusable gap nights", plan.orphan_nights_after,
+                      delta=plan.orphan_nights_after - plan.orphan_nights_before, delta_color="inverse")
+
+        if plan.assignments:
+            st.dataframe(plan.to_dataframe(), use_container_width=True, hide_index=True)
+        for inquiry in plan.unassigned:
+            st.write(f"• {inquiry['guest_name']} ({inquiry['check_in']} to {inquiry['check_out']}): {inquiry['reason']}")
+
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Apply plan", type="primary", disabled=not plan.assignments, key="apply_plan"):
+                result = BookingOperations.apply_assignment_plan(plan.assignments)
+                if result and result['applied']:
+                    del st.session_state.assignment_plan
+                    show_success_message(f"Assigned rooms to {result['applied']} inquiries.")
+                    st.rerun()
+                elif result:
+                    show_error_message(f"{len(result['conflicts'])} inquiries changed since planning; "
+                                       "nothing was applied. Please plan again.")
+        with col2:
+            if st.button("Discard plan", key="discard_plan"):
+                del st.session_state.assignment_plan
+                st.rerun()
+
 def show_active_stays():
     """Show all currently active stays"""
     st.header("🏠 Active Stays")
@@ -491,7 +627,16 @@ def show_inquiry_assignment():
     if unassigned:
         st.warning(f"⏳ {len(unassigned)} {'inquiry needs' if len(unassigned) == 1 else 'inquiries need'} room assignment")
 
-        for booking in unassigned:
+        show_assignment_plan()
+
+        # Free units for every inquiry, answered from one read of the bookings
+        stays = [(datetime.strptime(b['check_in'], '%Y-%m-%d').date(),
+                  datetime.strptime(b['check_out'], '%Y-%m-%d').date(),
+                  1) for b in unassigned]
+        free_by_inquiry = BookingOperations.get_available_units_bulk(stays) or [[] for _ in stays]
+
+        for booking, (check_in, check_out, _), free_units in zip(unassigned, stays, free_by_inquiry):
+            available_units = [unit for unit in free_units if unit['capacity'] >= booking['guests']]
             with st.container():
                 st.markdown("---")
 
@@ -499,8 +644,6 @@ def show_inquiry_assignment():
 
                 with col1:
                     st.markdown(f"### {booking['guest_name']}")
-                    check_in = datetime.strptime(booking['check_in'], '%Y-%m-%d').date()
-                    check_out = datetime.strptime(booking['check_out'], '%Y-%m-%d').date()
                     st.markdown(f"**Dates:** {format_date_range(check_in, check_out)}")
                     st.markdown(f"**Type:** {booking['booking_type'].title()}")
                     st.markdown(f"**Guests:** {booking['guests']}")
@@ -515,13 +658,6 @@ def show_inquiry_assignment():
                 if booking.get('special_requests'):
                     st.info(f"**Special Requests:** {booking['special_requests']}")
 
-                # Get available units for these dates
-                available_units = BookingOperations.get_available_units(
-                    check_in,
-                    check_out,
-                    booking['guests']
-                )
-
                 if not available_units:
                     st.error("❌ No available accommodations for these dates and guest count")
                     col1, col2 = st.columns(2)
@@ -571,13 +707,18 @@ def show_inquiry_assignment():
                                     except ValueError as e:
                                         st.error(f"Failed to assign room: {str(e)}")
 
+                # Split across units only for retreats, or when no single unit holds the party
+                if booking['guests'] > 1 and (booking['booking_type'] == 'retreat' or not available_units):
+                    show_group_options(booking, free_units)
+
     if assigned_pending:
         st.markdown("---")
         st.subheader("📋 Pending Inquiries with Rooms Assigned")
         st.info(f"{len(assigned_pending)} {'inquiry has' if len(assigned_pending) == 1 else 'inquiries have'} rooms assigned and awaiting confirmation")
 
         for booking in assigned_pending:
-            with st.expander(f"{booking['guest_name']} - {booking.get('lodging_name', 'Unknown')}"):
+            group = f" (group #{booking['group_id']})" if booking.get('group_id') else ""
+            with st.expander(f"{booking['guest_name']} - {booking.get('lodging_name', 'Unknown')}{group}"):
                 col1, col2 = st.columns(2)
 
                 with col1:
@@ -600,8 +741,11 @@ def show_inquiry_assignment():
                 with col2:
                     if st.button(f"Change Room", key=f"change_{booking['id']}"):
                         # Clear the assignment to allow re-assignment
-                        if BookingOperations.assign_room_to_booking(booking['id'], booking['lodging_unit_id']):
-                            st.info("You can now assign a different room above")
+                        try:
+                            if BookingOperations.assign_room_to_booking(booking['id'], booking['lodging_unit_id']):
+                                st.info("You can now assign a different room above")
+                        except BookingConflictError as e:
+                            show_error_message(str(e))
 
 
 def show_direct_booking_form():
@@ -704,12 +848,13 @@ def show_direct_booking_form():
                         'notes': f"Direct booking created by staff on {datetime.now().strftime('%Y-%m-%d %H:%M')}"
                     }
 
-                    booking_id = BookingOperations.create_booking_request(booking_data)
+                    # Create and auto-confirm together, so a failure leaves no pending booking behind
+                    with transaction():
+                        booking_id = BookingOperations.create_booking_request(booking_data)
+                        if booking_id and not BookingOperations.update_booking_status(booking_id, 'confirmed', booking_data['notes']):
+                            raise ValueError("The booking could not be confirmed")
 
                     if booking_id:
-                        # Auto-confirm the booking
-                        BookingOperations.update_booking_status(booking_id, 'confirmed', booking_data['notes'])
-
                         st.success(f"✅ Booking created and confirmed! Booking ID: {booking_id}")
                         st.balloons()
                         st.info("The booking has been automatically confirmed. You can view it in 'Manage Bookings' or 'Active Stays'.")
@@ -724,6 +869,18 @@ def show_direct_booking_form():
                     st.error(f"Error creating booking: {str(e)}")
 
 
+def bookings_to_csv(bookings) -> str:
+    """Write booking dicts to CSV text, held in memory since st.download_button needs the whole file"""
+    output = io.StringIO()
+    writer = None
+    for booking in bookings:
+        if writer is None:
+            writer = DictWriter(output, fieldnames=list(booking.keys()))
+            writer.writeheader()
+        writer.writerow(booking)
+    return output.getvalue()
+
+
 def show_reports():
     """Show various reports"""
     st.header("📈 Reports")
@@ -787,6 +944,19 @@ def show_reports():
     for location, count in location_counts.items():
         st.write(f"• {location}: {count} bookings")
     
+    # Nightly occupancy over the report range
+    st.subheader("🛏️ Occupancy")
+    daily = BookingOperations.get_daily_occupancy(start_date, end_date + timedelta(days=1))
+    if daily:
+        occupancy_df = pd.DataFrame(daily).set_index('day')
+        total_units = len(BookingOperations.get_all_lodging_units() or [])
+        nights = (end_date - start_date).days + 1
+        if total_units:
+            st.metric("Average occupancy", f"{occupancy_df['occupied_units'].sum() / (total_units * nights) * 100:.1f}%")
+        st.bar_chart(occupancy_df[['confirmed', 'pending']])
+    else:
+        st.info("No occupied nights in the selected range.")
+    
     # Export functionality
     st.markdown("---")
     st.subheader("📥 Export Data")
@@ -811,12 +981,11 @@ def show_reports():
     with col2:
         if st.button("Export All Data"):
             try:
-                all_data = BookingOperations.get_all_booking_requests(limit=1000)
-                df = pd.DataFrame(all_data)
-                csv = df.to_csv(index=False)
+                # Bookings are read a page at a time; only the CSV text is held in full
+                all_csv = bookings_to_csv(BookingOperations.stream_booking_requests())
                 st.download_button(
                     label="Download All Bookings CSV",
-                    data=csv,
+                    data=all_csv,
                     file_name=f"all_bookings_{datetime.now().strftime('%Y%m%d')}.csv",
                     mime="text/csv",
                     key="download_all"
@@ -884,5 +1053,96 @@ def show_reports():
             mime="text/csv"
         )
 
+def show_diagnostics():
+    """Database query statistics for tuning page performance"""
+    st.header("🩺 Diagnostics")
+    settings = config.settings
+
+    if not settings.query_stats_enabled:
+        st.info("Query statistics are disabled (set QUERY_STATS_ENABLED=true to collect them). "
+                "Slow queries are still logged.")
+
+    previous, current = query_stats.render_stats()
+
+    # Per-render counts: the previous run is the page you were just looking at
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Backend", settings.backend)
+    with col2:
+        st.metric("Queries (last page view)", previous['queries'] if previous else 0)
+    with col3:
+        st.metric("DB time (last page view)", f"{previous['duration_ms']:.0f} ms" if previous else "0 ms")
+    with col4:
+        st.metric("Slow query threshold", f"{settings.slow_query_ms:.0f} ms")
+
+    st.caption(f"Schema version {current_version()} (latest {latest_version()})")
+
+    if previous and previous['call_sites']:
+        st.subheader(f"📄 Queries by call site ({previous['label']} view)")
+        st.dataframe(
+            pd.DataFrame(
+                sorted(previous['call_sites'].items(), key=lambda item: item[1], reverse=True),
+                columns=["Call site", "Queries"]
+            ),
+            use_container_width=True,
+            hide_index=True
+        )
+
+    st.subheader("📈 Queries by fingerprint")
+    summary = query_stats.summary()
+    if summary:
+        df = pd.DataFrame([{
+            'Query': row['fingerprint'],
+            'Backend': row['backend'],
+            'Calls': row['calls'],
+            'Total ms': round(row['total_ms'], 1),
+            'Avg ms': round(row['avg_ms'], 2),
+            'Max ms': round(row['max_ms'], 1),
+            'Rows': row['rows'],
+            'Call sites': ", ".join(row['call_sites'])
+        } for row in summary])
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.info("No queries recorded yet.")
+
+    st.subheader("🐢 Slow queries")
+    slow = [record.as_dict() for record in reversed(query_stats.slow_queries)]
+    if slow:
+        df = pd.DataFrame(slow)
+        df['recorded_at'] = pd.to_datetime(df['recorded_at'], unit='s')
+        st.dataframe(df, use_container_width=True, hide_index=True)
+    else:
+        st.success("No queries above the slow query threshold.")
+    if settings.slow_query_log_path:
+        st.caption(f"Slow queries are also written to {settings.slow_query_log_path}")
+
+    if settings.use_turso:
+        st.subheader("🔌 Turso connections")
+        st.json(get_turso_pool().stats())
+        replica = get_turso_replica()
+        if replica is not None:
+            st.json(replica.stats())
+
+    st.subheader("📅 Availability index")
+    st.json(availability_index.stats())
+
+    st.subheader("🛏️ Daily occupancy table")
+    col1, col2 = st.columns(2)
+    with col1:
+        if st.button("Check consistency"):
+            report = check_occupancy()
+            if report['consistent']:
+                st.success("unit_day_occupancy matches the bookings.")
+            else:
+                st.warning(f"{report['missing_rows']} missing and {report['extra_rows']} unexpected rows.")
+                st.json(report)
+    with col2:
+        if st.button("Rebuild occupancy table"):
+            st.success(f"Rebuilt with {rebuild_occupancy()} rows.")
+
+    if st.button("Reset statistics"):
+        query_stats.reset()
+        st.rerun()
+
 if __name__ == "__main__":
     show_staff_page()
\ No newline at end of file
@@ -0,0 +1,47 @@
+#!/usr/bin/env python3
+"""
+Check or rebuild the materialized unit_day_occupancy table
+
+Usage:
+    python rebuild_occupancy.py           # report drift only
+    python rebuild_occupancy.py --rebuild # recompute the table from bookings
+"""
+
+import sys
+from database.migrations import migrate
+from database.daily_occupancy import check_occupancy, rebuild_occupancy
+
+def main():
+    """Report unit_day_occupancy consistency, rebuilding it when asked"""
+
+    print("Checking daily occupancy...")
+    print("=" * 80)
+
+    migrate()
+
+    report = check_occupancy()
+    print(f"Missing rows:    {report['missing_rows']}")
+    print(f"Unexpected rows: {report['extra_rows']}")
+    for row in report['missing_examples']:
+        print(f"  missing  {row}")
+    for row in report['extra_examples']:
+        print(f"  extra    {row}")
+
+    if "--rebuild" in sys.argv:
+        count = rebuild_occupancy()
+        print(f"\n[OK] Rebuilt unit_day_occupancy ({count} rows)")
+        return True
+
+    if report['consistent']:
+        print("\n[OK] unit_day_occupancy matches booking_requests")
+        return True
+
+    print("\n[WARN] Drift found; run with --rebuild to fix")
+    return False
+
+if __name__ == "__main__":
+    try:
+        sys.exit(0 if main() else 1)
+    except Exception as e:
+        print(f"\n[ERROR] {e}", file=sys.stderr)
+        sys.exit(1)
@@ -3,18 +3,22 @@
 Remove Lodge Shared Room and reorganize room display order
 """
 
-import sqlite3
 import sys
+from database.connection import get_db_connection
+from database.migrations import migrate
 
 def reorganize_rooms():
     """Remove Lodge Shared Room and set display order"""
 
-    conn = sqlite3.connect('wellspring_bookings.db')
-    cursor = conn.cursor()
-
     print("Reorganizing rooms...")
     print("=" * 80)
 
+    # The display_order column is added by a schema migration
+    migrate()
+
+    conn = get_db_connection()
+    cursor = conn.cursor()
+
     # 1. Remove Lodge Shared Room
     print("\n1. Removing Lodge Shared Room...")
     print("-" * 80)
@@ -45,22 +49,8 @@ def reorganize_rooms():
     else:
         print("Lodge Shared Room not found - already removed")
 
-    # 2. Check if display_order column exists, if not add it
-    print("\n2. Adding display_order column if needed...")
-    print("-" * 80)
-
-    cursor.execute("PRAGMA table_info(lodging_units)")
-    columns = [col[1] for col in cursor.fetchall()]
-
-    if 'display_order' not in columns:
-        print("Adding display_order column...")
-        cursor.execute("ALTER TABLE lodging_units ADD COLUMN display_order INTEGER DEFAULT 999")
-        print("[OK] Column added")
-    else:
-        print("display_order column already exists")
-
-    # 3. Set display order: Lodge rooms/dorm first, then Uptown cabins, then others
-    print("\n3. Setting display order...")
+    # 2. Set display order: Lodge rooms/dorm first, then Uptown cabins, then others
+    print("\n2. Setting display order...")
     print("-" * 80)
 
     # Order:
@@ -97,8 +87,8 @@ def reorganize_rooms():
         if cursor.rowcount > 0:
             print(f"  {order:3d}. {name}")
 
-    # 4. Update get_available_units and similar queries to use display_order
-    print("\n4. Current room listing (ordered)...")
+    # 3. Update get_available_units and similar queries to use display_order
+    print("\n3. Current room listing (ordered)...")
     print("-" * 80)
 
     cursor.execute("""
@@ -23,6 +23,97 @@ def test_database_initialization():
         print(f"  [FAIL] Database initialization failed: {e}")
         return False
 
+def test_migrations():
+    """Test migrate() applies each version once and is a no-op when up to date"""
+    print("\n[TEST] Migrations...")
+    import sqlite3
+    import tempfile
+    from database.connection import config, get_db_connection, query_stats, reset_sqlite_connections
+    from database.migrations import _baseline_schema, latest_version, migrate, reset_migration_cache
+
+    previous_env = {name: os.environ.get(name) for name in ("DATABASE_PATH", "BOOKING_BLOCKING_STATUSES")}
+    tmp = tempfile.TemporaryDirectory()
+
+    def use_database(name):
+        os.environ["DATABASE_PATH"] = os.path.join(tmp.name, name)
+        config.reload()
+        reset_sqlite_connections()
+        return os.environ["DATABASE_PATH"]
+
+    def fetch(sql):
+        conn = get_db_connection()
+        try:
+            return [tuple(row) for row in conn.execute(sql).fetchall()]
+        finally:
+            conn.close()
+
+    try:
+        versions = list(range(1, latest_version() + 1))
+        use_database("fresh.db")
+        assert migrate() == versions, "Fresh database did not get every migration"
+
+        statements = []
+        listener = lambda record, parameters: statements.append(record.sql)
+        query_stats.add_listener(listener)
+        try:
+            assert migrate() == [], "Second migrate() applied migrations again"
+            # A new process has no cache, but still only reads the version
+            reset_migration_cache()
+            assert migrate() == [], "Up-to-date database migrated again after a restart"
+        finally:
+            query_stats.remove_listener(listener)
+        assert len(statements) == 1 and statements[0].lstrip().upper().startswith("SELECT"), \
+            f"Warm start ran {statements}"
+        recorded = [row[0] for row in fetch("SELECT version FROM schema_migrations ORDER BY version")]
+        assert recorded == versions, f"schema_migrations holds {recorded}"
+        print(f"  [PASS] Versions 1-{latest_version()} recorded once; warm start is one SELECT")
+
+        # A database created before versioned migrations is upgraded in place
+        path = use_database("baseline.db")
+        legacy = sqlite3.connect(path)
+        _baseline_schema(legacy)
+        legacy.execute("INSERT INTO lodging_units (name, location, type, capacity) "
+                       "VALUES ('Legacy Cabin', 'Uptown', 'private', 2)")
+        legacy.executemany(
+            "INSERT INTO booking_requests (guest_name, email, booking_type, check_in, check_out, guests, "
+            "lodging_unit_id, status) VALUES ('Legacy Guest', 'legacy@example.com', 'respite', ?, ?, 1, 1, ?)",
+            [('2030-01-01', '2030-01-04', 'confirmed'), ('2030-03-01', '2030-03-03', 'pending')]
+        )
+        legacy.executemany(
+            "INSERT INTO availability_calendar (lodging_unit_id, date, is_available, notes) VALUES (1, ?, 0, 'Repairs')",
+            [('2030-02-01',), ('2030-02-02',)]
+        )
+        legacy.commit()
+        legacy.close()
+
+        # Migration 5 backfills the same statuses whatever the runtime config says
+        os.environ["BOOKING_BLOCKING_STATUSES"] = "confirmed"
+        config.reload()
+        assert migrate() == versions, "Baseline database was not fully migrated"
+        assert fetch("SELECT name, display_order FROM lodging_units") == [('Legacy Cabin', 999)], \
+            "Existing units lost or not given a display order"
+        nights = fetch("SELECT booking_id, COUNT(*) FROM unit_day_occupancy GROUP BY booking_id ORDER BY booking_id")
+        assert nights == [(1, 3), (2, 2)], f"Backfilled nights {nights}"
+        assert fetch("SELECT start_date, end_date, reason FROM unit_blocks") == \
+            [('2030-02-01', '2030-02-03', 'Repairs')], "Blocked days not converted to a range"
+        indexes = {row[0] for row in fetch("SELECT name FROM sqlite_master WHERE type = 'index'")}
+        assert 'idx_availability_calendar_available_date' not in indexes, "Dead blocked-dates index kept"
+        assert 'idx_booking_holds_unit_dates' in indexes, "Later migrations' indexes missing"
+        print(f"  [PASS] Baseline database upgraded in place with its data")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Migrations test failed: {e}")
+        return False
+    finally:
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        config.reload()
+        reset_sqlite_connections()
+        tmp.cleanup()
+
 def test_lodging_units():
     """Test lodging units retrieval"""
     print("\n[TEST] Lodging Units Operations...")
@@ -163,6 +254,40 @@ def test_configuration():
         print(f"  [FAIL] Configuration test failed: {e}")
         return False
 
+def test_settings_reload():
+    """Test database settings are a frozen snapshot refreshed by reload()"""
+    print("\n[TEST] Settings Reload...")
+    from database.connection import config
+    previous = os.environ.get("TURSO_BATCH_SIZE")
+    try:
+        import dataclasses
+
+        before = config.settings
+        assert config.settings is before, "Settings were re-resolved on every access"
+        try:
+            before.turso_batch_size = 1
+            raise AssertionError("Settings snapshot is mutable")
+        except dataclasses.FrozenInstanceError:
+            pass
+
+        os.environ["TURSO_BATCH_SIZE"] = str(before.turso_batch_size + 7)
+        assert config.settings.turso_batch_size == before.turso_batch_size, "Environment read without reload()"
+        after = config.reload()
+        assert after is config.settings and after.turso_batch_size == before.turso_batch_size + 7, \
+            "reload() did not pick up the environment"
+        assert after.local_db_path == before.local_db_path, "Unchanged settings lost on reload"
+        print(f"  [PASS] Snapshot is frozen and reload() re-reads the environment")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Settings reload test failed: {e}")
+        return False
+    finally:
+        if previous is None:
+            os.environ.pop("TURSO_BATCH_SIZE", None)
+        else:
+            os.environ["TURSO_BATCH_SIZE"] = previous
+        config.reload()
+
 def test_helpers():
     """Test helper functions"""
     print("\n[TEST] Helper Functions...")
@@ -212,6 +337,1467 @@ def test_availability():
         print(f"  [FAIL] Availability test failed: {e}")
         return False
 
+def test_availability_index():
+    """Test the in-memory availability index agrees with the SQL checks"""
+    print("\n[TEST] Availability Index...")
+    from database.connection import get_db_connection, transaction
+    from database.availability import availability_index
+    from database.operations import BookingOperations
+
+    booking_ids = []
+    try:
+
+        base = date.today() + timedelta(days=400)
+        for offset, nights in ((0, 5), (10, 2)):
+            booking_ids.append(BookingOperations.create_booking_request({
+                'guest_name': 'Index Probe', 'email': 'probe@example.com',
+                'booking_type': 'respite', 'guests': 1, 'lodging_unit_id': 1,
+                'check_in': (base + timedelta(days=offset)).isoformat(),
+                'check_out': (base + timedelta(days=offset + nights)).isoformat(),
+            }))
+        assert all(booking_ids), "Probe bookings were not created"
+        BookingOperations.block_dates(2, base, base + timedelta(days=3), "Index probe")
+
+        loads = availability_index.loads
+        mismatches = []
+        for unit_id in (1, 2, 3):
+            for start in range(-3, 14):
+                for nights in (1, 2, 4):
+                    check_in = base + timedelta(days=start)
+                    check_out = check_in + timedelta(days=nights)
+                    indexed = BookingOperations.check_availability(unit_id, check_in, check_out)
+                    with transaction():
+                        direct = BookingOperations.check_availability(unit_id, check_in, check_out)
+                    if indexed != direct:
+                        mismatches.append((unit_id, check_in, check_out, indexed, direct))
+        assert not mismatches, f"Index disagrees with SQL: {mismatches[:3]}"
+        assert availability_index.loads - loads <= 1, "Index reloaded between reads"
+        print(f"  [PASS] is_free matches SQL for {3 * 17 * 3} windows")
+
+        check_in, check_out = base + timedelta(days=1), base + timedelta(days=3)
+        indexed = [unit['id'] for unit in BookingOperations.get_available_units(check_in, check_out)]
+        with transaction():
+            direct = [unit['id'] for unit in BookingOperations.get_available_units(check_in, check_out)]
+        assert indexed == direct, f"free_units {indexed} != {direct}"
+        assert BookingOperations.check_availability(1, check_in, check_out, exclude_booking_id=booking_ids[0])
+        conflicts = availability_index.conflicts(1, base, base + timedelta(days=12))
+        assert [c['booking_id'] for c in conflicts] == booking_ids, f"Unexpected conflicts {conflicts}"
+        print(f"  [PASS] free_units, exclusions and conflicts agree")
+
+        BookingOperations.update_booking_status(booking_ids[0], 'cancelled')
+        assert BookingOperations.check_availability(1, check_in, check_out), "Index not invalidated on write"
+        print(f"  [PASS] Writes invalidate the index")
+
+        # The shared snapshot is loaded from the Turso primary, never the replica
+        import database.availability as availability
+        from database.connection import TURSO_AVAILABLE, config, reset_turso_pool, reset_turso_replica
+        requested = []
+        def recording_connection(primary=False):
+            requested.append(primary)
+            return get_db_connection(primary=primary)
+        availability.get_db_connection = recording_connection
+        try:
+            availability_index.invalidate()
+            availability_index.is_free(1, check_in, check_out)
+        finally:
+            availability.get_db_connection = get_db_connection
+        assert requested == [True], f"Index load asked for connections {requested}"
+        if TURSO_AVAILABLE:
+            turso_env = {'USE_TURSO': 'true', 'TURSO_DATABASE_URL': 'libsql://probe.turso.io',
+                         'TURSO_AUTH_TOKEN': 'probe', 'TURSO_REPLICA_PATH': 'replica-probe.db'}
+            saved = {name: os.environ.get(name) for name in turso_env}
+            os.environ.update(turso_env)
+            try:
+                config.reload()
+                # Clients are checked out on first use, so nothing is sent here
+                assert get_db_connection().replica is not None, "Replica not configured"
+                assert get_db_connection(primary=True).replica is None, "primary=True still reads the replica"
+            finally:
+                for name, value in saved.items():
+                    if value is None:
+                        os.environ.pop(name, None)
+                    else:
+                        os.environ[name] = value
+                config.reload()
+                reset_turso_replica()
+                reset_turso_pool()
+            print(f"  [PASS] Index loads bypass the Turso replica")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Availability index test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM booking_requests WHERE guest_name = ?", ("Index Probe",))
+            conn.execute("DELETE FROM unit_blocks WHERE reason = ?", ("Index probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        availability_index.invalidate()
+
+def test_occupancy_matrix():
+    """Test the vectorized occupancy matrix"""
+    print("\n[TEST] Occupancy Matrix...")
+    try:
+        import time
+        from utils.occupancy import build_occupancy_matrix, FREE, PENDING, CONFIRMED, BLOCKED
+        from utils.helpers import get_availability_summary
+
+        start = date(2025, 1, 1)
+        units = [{'id': unit_id, 'name': f'Unit {unit_id}', 'location': 'Lodge', 'capacity': 2}
+                 for unit_id in (1, 2, 3)]
+        bookings = [
+            {'lodging_unit_id': 1, 'status': 'pending', 'check_in': '2024-12-30', 'check_out': '2025-01-04'},
+            {'lodging_unit_id': 1, 'status': 'confirmed', 'check_in': '2025-01-03', 'check_out': '2025-01-05'},
+            {'lodging_unit_id': 2, 'status': 'cancelled', 'check_in': '2025-01-01', 'check_out': '2025-01-09'},
+            {'lodging_unit_id': 3, 'status': 'confirmed', 'check_in': '2025-01-09', 'check_out': '2025-02-01'},
+        ]
+        blocked = [{'lodging_unit_id': 2, 'date': '2025-01-02'}]
+        matrix = build_occupancy_matrix(units, bookings, days=10, start=start, blocked=blocked)
+
+        assert list(matrix.status[0]) == [PENDING] * 2 + [CONFIRMED] * 2 + [FREE] * 6, matrix.status[0]
+        assert list(matrix.booking_ref[0][:5]) == [0, 0, 1, 1, -1], matrix.booking_ref[0]
+        assert list(matrix.status[1]) == [FREE, BLOCKED] + [FREE] * 8, matrix.status[1]
+        assert list(matrix.status[2]) == [FREE] * 8 + [CONFIRMED] * 2, matrix.status[2]
+        print(f"  [PASS] Range fills, precedence and clipping correct")
+
+        df = matrix.to_dataframe()
+        assert len(df) == 30 and df['date'].iloc[0] == start, "Unexpected calendar shape"
+        assert df['booking_info'].iloc[2]['status'] == 'confirmed', "Missing booking back-reference"
+        summary = get_availability_summary(matrix)
+        assert summary == {**get_availability_summary(df), 'pending_slots': 2, 'confirmed_slots': 4,
+                           'blocked_slots': 1}, summary
+        print(f"  [PASS] Calendar and summary derived from the matrix: {summary['occupancy_rate']}% occupied")
+
+        many_units = [{'id': unit_id, 'name': str(unit_id), 'location': 'Lodge', 'capacity': 1} for unit_id in range(50)]
+        many_bookings = [{'lodging_unit_id': i % 50, 'status': 'confirmed',
+                          'check_in': (start + timedelta(days=i % 300)).isoformat(),
+                          'check_out': (start + timedelta(days=i % 300 + 5)).isoformat()} for i in range(2000)]
+        started = time.perf_counter()
+        build_occupancy_matrix(many_units, many_bookings, days=365, start=start).to_dataframe()
+        elapsed = (time.perf_counter() - started) * 1000
+        assert elapsed < 1000, f"365-day calendar took {elapsed:.0f}ms"
+        print(f"  [PASS] 50 units x 365 days in {elapsed:.1f}ms")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Occupancy matrix test failed: {e}")
+        return False
+
+def test_daily_occupancy():
+    """Test the materialized unit_day_occupancy table stays in step with bookings"""
+    print("\n[TEST] Daily Occupancy Table...")
+    from database.connection import get_db_connection
+    from database.daily_occupancy import check_occupancy, rebuild_occupancy
+    from database.operations import BookingOperations
+
+    booking_id = None
+    try:
+        check_in = date.today() - timedelta(days=1)
+        booking_id = BookingOperations.create_booking_request({
+            'guest_name': 'Occupancy Probe', 'email': 'probe@example.com',
+            'booking_type': 'respite', 'guests': 1,
+            'check_in': check_in.isoformat(),
+            'check_out': (check_in + timedelta(days=3)).isoformat(),
+        })
+        assert booking_id, "Probe booking was not created"
+
+        conn = get_db_connection()
+        try:
+            nights = lambda: conn.execute(
+                "SELECT lodging_unit_id, status FROM unit_day_occupancy WHERE booking_id = ? ORDER BY day",
+                (booking_id,)).fetchall()
+            assert [tuple(row) for row in nights()] == [(None, 'pending')] * 3, nights()
+
+            BookingOperations.assign_room_to_booking(booking_id, 1)
+            BookingOperations.update_booking_status(booking_id, 'confirmed')
+            assert [tuple(row) for row in nights()] == [(1, 'confirmed')] * 3, nights()
+            stays = BookingOperations.get_active_stays()
+            assert booking_id in [stay['id'] for stay in stays], "Active stay not found"
+            print(f"  [PASS] Create, assign and confirm maintain 3 nights")
+
+            BookingOperations.update_booking_status(booking_id, 'cancelled')
+            assert nights() == [], "Cancelled booking still occupies nights"
+            print(f"  [PASS] Cancellation removes nights")
+        finally:
+            conn.close()
+
+        # Confirmed nights stay materialized even when confirmed does not block units
+        from database.connection import config
+        previous = os.environ.get("BOOKING_BLOCKING_STATUSES")
+        os.environ["BOOKING_BLOCKING_STATUSES"] = "pending"
+        try:
+            config.reload()
+            BookingOperations.update_booking_status(booking_id, 'confirmed')
+            stays = BookingOperations.get_active_stays()
+            assert booking_id in [stay['id'] for stay in stays], "Active stay lost when confirmed is not blocking"
+            assert check_occupancy()['consistent'], "Drift with non-default blocking statuses"
+        finally:
+            if previous is None:
+                os.environ.pop("BOOKING_BLOCKING_STATUSES", None)
+            else:
+                os.environ["BOOKING_BLOCKING_STATUSES"] = previous
+            config.reload()
+        print(f"  [PASS] Active stays do not depend on BOOKING_BLOCKING_STATUSES")
+
+        report = check_occupancy()
+        assert report['consistent'], f"Drift: {report}"
+        conn = get_db_connection()
+        try:
+            conn.execute("INSERT INTO unit_day_occupancy (lodging_unit_id, day, booking_id, status) "
+                         "VALUES (1, '2000-01-01', ?, 'confirmed')", (booking_id,))
+            conn.commit()
+        finally:
+            conn.close()
+        assert check_occupancy()['extra_rows'] == 1, "Checker missed drift"
+        rebuild_occupancy()
+        assert check_occupancy()['consistent'], "Rebuild did not restore consistency"
+        print(f"  [PASS] Checker detects drift and rebuild repairs it")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Daily occupancy test failed: {e}")
+        return False
+    finally:
+        if booking_id:
+            conn = get_db_connection()
+            try:
+                conn.execute("DELETE FROM booking_requests WHERE id = ?", (booking_id,))
+                conn.commit()
+            finally:
+                conn.close()
+
+def test_unit_blocks():
+    """Test range-based unit blocks"""
+    print("\n[TEST] Unit Blocks...")
+    from database.connection import get_db_connection, transaction
+    from database.operations import BookingOperations
+
+    def blocks(unit_id):
+        return [(b['start_date'], b['end_date']) for b in
+                BookingOperations.get_unit_blocks(season_start, season_end, lodging_unit_id=unit_id)
+                if b['reason'] == 'Block probe']
+
+    season_start = date.today() + timedelta(days=500)
+    season_end = season_start + timedelta(days=90)
+    day = lambda offset: (season_start + timedelta(days=offset)).isoformat()
+    try:
+        assert BookingOperations.block_units([1, 2], season_start, season_end, "Block probe", "tests") == 2
+        assert blocks(1) == [(day(0), day(90))], blocks(1)
+        for unit_id in (1, 2):
+            assert not BookingOperations.check_availability(unit_id, day(40), day(42))
+            with transaction():
+                assert not BookingOperations.check_availability(unit_id, day(40), day(42))
+        assert BookingOperations.check_availability(1, day(90), day(92)), "Block end should be exclusive"
+        print(f"  [PASS] A 90-day block for two units is one row each")
+
+        BookingOperations.unblock_units([1], day(30), day(40))
+        assert blocks(1) == [(day(0), day(30)), (day(40), day(90))], blocks(1)
+        BookingOperations.unblock_units([1], day(-5), day(10))
+        BookingOperations.unblock_units([1], day(80), day(95))
+        assert blocks(1) == [(day(10), day(30)), (day(40), day(80))], blocks(1)
+        BookingOperations.unblock_units([1, 2], season_start, season_end)
+        assert blocks(1) == [] and blocks(2) == [], "Unblock left ranges behind"
+        assert BookingOperations.check_availability(2, day(40), day(42)), "Index not invalidated on unblock"
+        print(f"  [PASS] Unblock splits, trims and removes ranges")
+
+        from database.migrations import _unit_blocks
+        with transaction() as conn:
+            conn.executemany(
+                "INSERT INTO availability_calendar (lodging_unit_id, date, is_available, notes) VALUES (?, ?, 0, ?)",
+                [(3, day(offset), "Block probe") for offset in (0, 1, 2, 5)]
+            )
+            _unit_blocks(conn)
+        assert blocks(3) == [(day(0), day(3)), (day(5), day(6))], blocks(3)
+        print(f"  [PASS] Per-day rows convert into ranges")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Unit blocks test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM unit_blocks WHERE reason = ?", ("Block probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+
+def test_find_windows():
+    """Test the free-window search against day-by-day availability checks"""
+    print("\n[TEST] Window Search...")
+    from database.connection import get_db_connection
+    from database.operations import BookingOperations
+
+    base = date.today() + timedelta(days=600)
+    day = lambda offset: base + timedelta(days=offset)
+    try:
+        units = BookingOperations.get_all_lodging_units()
+        # Only unit 1 is open between day 0 and day 30
+        BookingOperations.block_units([unit['id'] for unit in units if unit['id'] != 1],
+                                      day(0), day(30), "Window probe")
+        # Unit 1 is taken on days 0-4, 6-9 and 14-19: gaps of 2 and 4 nights, then free from day 19
+        for start, end in ((0, 4), (6, 9), (14, 19)):
+            BookingOperations.create_booking_request({
+                'guest_name': 'Window Probe', 'email': 'probe@example.com',
+                'booking_type': 'respite', 'guests': 1, 'lodging_unit_id': 1,
+                'check_in': day(start).isoformat(), 'check_out': day(end).isoformat(),
+            })
+
+        soonest = BookingOperations.find_windows(3, earliest=day(0), latest=day(30))
+        assert [(w['lodging_unit_id'], w['check_in'], w['free_nights']) for w in soonest[:2]] == \
+            [(1, day(9), 5), (1, day(19), 11)], soonest
+        best_fit = BookingOperations.find_windows(2, earliest=day(0), latest=day(30), prefer='best_fit')
+        assert (best_fit[0]['check_in'], best_fit[0]['free_nights']) == (day(4), 2), best_fit[0]
+        closest = BookingOperations.find_windows(2, earliest=day(0), latest=day(30), prefer='closest', target=day(12))
+        assert closest[0]['check_in'] == day(12), closest[0]
+        print(f"  [PASS] soonest, best_fit and closest rank the gaps correctly")
+
+        for nights in (1, 2, 3, 5):
+            found = BookingOperations.find_windows(nights, earliest=day(0), latest=day(30), limit=50)
+            assert all(BookingOperations.check_availability(w['lodging_unit_id'], w['check_in'], w['check_out'])
+                       for w in found), f"Window not free for {nights} nights"
+            brute = next(offset for offset in range(30 - nights + 1)
+                         if BookingOperations.check_availability(1, day(offset), day(offset + nights)))
+            assert found[0]['check_in'] == day(brute), (nights, found[0], brute)
+        print(f"  [PASS] Windows are free and the soonest matches a day-by-day probe")
+
+        # Every unit is taken on days 40-45, so all share the nearest free dates
+        BookingOperations.block_units([unit['id'] for unit in units], day(40), day(45), "Window probe")
+        suggestions = BookingOperations.suggest_dates(2, day(41), earliest=day(32), latest=day(60))
+        assert [s['check_in'] for s in suggestions] == [day(38), day(37), day(45), day(36), day(46)], \
+            [s['check_in'] for s in suggestions]
+        for suggestion in suggestions:
+            assert suggestion['check_out'] == suggestion['check_in'] + timedelta(days=2), suggestion
+            assert len(suggestion['units']) == len(units), "Suggestion is missing free units"
+            assert all(BookingOperations.check_availability(unit['id'], suggestion['check_in'], suggestion['check_out'])
+                       for unit in suggestion['units']), "Suggested unit is not free"
+        print(f"  [PASS] {len(units)} units sharing the closest dates still give 5 distinct suggestions")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Window search test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM booking_requests WHERE guest_name = ?", ("Window Probe",))
+            conn.execute("DELETE FROM unit_blocks WHERE reason = ?", ("Window probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+
+def test_bulk_availability():
+    """Test batch availability matches per-request checks with a single read"""
+    print("\n[TEST] Bulk Availability...")
+    from database.connection import get_db_connection, query_stats, transaction
+    from database.operations import BookingOperations
+
+    base = date.today() + timedelta(days=700)
+    day = lambda offset: base + timedelta(days=offset)
+    try:
+        BookingOperations.create_booking_request({
+            'guest_name': 'Bulk Probe', 'email': 'probe@example.com',
+            'booking_type': 'respite', 'guests': 1, 'lodging_unit_id': 1,
+            'check_in': day(2).isoformat(), 'check_out': day(6).isoformat(),
+        })
+        BookingOperations.block_units([2], day(4), day(9), "Bulk probe")
+        stays = [(day(start), day(start + nights), guests)
+                 for start in range(0, 10, 2) for nights in (1, 3) for guests in (1, 4)]
+
+        expected = [[unit['id'] for unit in BookingOperations.get_available_units(*stay)] for stay in stays]
+        assert any(1 not in ids for ids in expected) and any(2 not in ids for ids in expected), \
+            "Probe bookings did not affect availability"
+
+        # Inside a transaction the index is bypassed and the bulk read goes to SQL
+        for use_index in (True, False):
+            records = []
+            listener = lambda record, parameters: records.append(record)
+            query_stats.add_listener(listener)
+            try:
+                if use_index:
+                    bulk = BookingOperations.get_available_units_bulk(stays)
+                else:
+                    with transaction():
+                        bulk = BookingOperations.get_available_units_bulk(stays)
+            finally:
+                query_stats.remove_listener(listener)
+            assert [[unit['id'] for unit in units] for units in bulk] == expected, \
+                f"Bulk results differ (index={use_index})"
+            if not use_index:
+                assert len(records) <= 4, f"Expected one batched read, got {len(records)} queries"
+        print(f"  [PASS] {len(stays)} requests match per-request results with and without the index")
+
+        assert BookingOperations.get_available_units_bulk([]) == [], "Empty request list should give no results"
+        print(f"  [PASS] Empty request list handled")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Bulk availability test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM booking_requests WHERE guest_name = ?", ("Bulk Probe",))
+            conn.execute("DELETE FROM unit_blocks WHERE reason = ?", ("Bulk probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+
+def test_assignment_plan():
+    """Test the room-assignment optimizer and applying its plan"""
+    print("\n[TEST] Assignment Plan...")
+    import random
+    import time
+    from database.connection import get_db_connection
+    from database.operations import BookingOperations
+    from utils.assignment import plan_assignments
+
+    day = lambda offset: (date(2030, 1, 1) + timedelta(days=offset)).isoformat()
+    inquiry = lambda booking_id, start, end, guests=1, booking_type='respite': {
+        'id': booking_id, 'guest_name': f'Guest {booking_id}', 'guests': guests,
+        'booking_type': booking_type, 'check_in': day(start), 'check_out': day(end)}
+    try:
+        units = [{'id': 1, 'name': 'Big', 'location': 'Lodge', 'type': 'shared', 'capacity': 3, 'is_active': 1},
+                 {'id': 2, 'name': 'Small', 'location': 'Lodge', 'type': 'private', 'capacity': 1, 'is_active': 1},
+                 {'id': 3, 'name': 'Hall', 'location': 'Facilities', 'type': 'classroom', 'capacity': 15, 'is_active': 1}]
+
+        # The 3-night gap on unit 2 is filled exactly instead of opening a new gap on unit 1
+        plan = plan_assignments(units, [{'lodging_unit_id': 2, 'start': day(0), 'end': day(3)},
+                                        {'lodging_unit_id': 2, 'start': day(6), 'end': day(9)},
+                                        {'lodging_unit_id': 1, 'start': day(0), 'end': day(4)}],
+                                [inquiry(1, 3, 6)])
+        assert [(a['booking_id'], a['lodging_unit_id']) for a in plan.assignments] == [(1, 2)], plan.assignments
+        assert plan.orphan_nights_after == 0, plan.orphan_nights_after
+        print(f"  [PASS] Stays fill gaps instead of fragmenting free units")
+
+        # Greedy puts the long stay on unit 1 (no orphan night); repair moves it so the party of 3 fits
+        plan = plan_assignments(units, [{'lodging_unit_id': 1, 'start': day(10), 'end': day(20)},
+                                        {'lodging_unit_id': 2, 'start': day(11), 'end': day(20)}],
+                                [inquiry(1, 0, 10), inquiry(2, 5, 8, guests=3)])
+        assert {a['booking_id']: a['lodging_unit_id'] for a in plan.assignments} == {1: 2, 2: 1}, plan.assignments
+        assert plan.fulfilled_nights == plan.requested_nights == 13, plan.fulfilled_nights
+        plan = plan_assignments(units, [], [inquiry(1, 0, 3, guests=5), inquiry(2, 0, 3, guests=20)])
+        assert [a['lodging_unit_id'] for a in plan.assignments] == [] and \
+            [i['reason'] for i in plan.unassigned] == ["No unit suits this party"] * 2, plan.unassigned
+        plan = plan_assignments(units, [], [inquiry(1, 0, 3, guests=5, booking_type='retreat')])
+        assert [a['lodging_unit_id'] for a in plan.assignments] == [3], plan.assignments
+        print(f"  [PASS] Repair step, capacity and unit types respected")
+
+        # A season's queue on the seeded layout
+        rng = random.Random(7)
+        season = [{'id': i, 'name': f'Unit {i}', 'location': 'Lodge', 'type': 'private' if i < 18 else 'shared',
+                   'capacity': 1 if i < 18 else 4, 'is_active': 1} for i in range(1, 23)]
+        commitments = []
+        for unit in season:
+            start = rng.randrange(0, 20)
+            while start < 180:
+                nights = rng.randint(3, 21)
+                commitments.append({'lodging_unit_id': unit['id'], 'start': day(start), 'end': day(start + nights)})
+                start += nights + rng.randint(5, 30)
+        queue = []
+        for booking_id in range(1, 401):
+            start = rng.randrange(0, 170)
+            queue.append(inquiry(booking_id, start, start + rng.randint(3, 21), guests=rng.choice([1, 1, 1, 2, 3])))
+        started = time.perf_counter()
+        plan = plan_assignments(season, commitments, queue)
+        elapsed = time.perf_counter() - started
+        assert elapsed < 1.0, f"Planning took {elapsed:.2f}s"
+
+        capacity = {unit['id']: unit['capacity'] for unit in season}
+        busy = {}
+        for commitment in commitments:
+            busy.setdefault(commitment['lodging_unit_id'], []).append((commitment['start'], commitment['end']))
+        for assignment in plan.assignments:
+            assert capacity[assignment['lodging_unit_id']] >= assignment['guests'], assignment
+            intervals = busy.setdefault(assignment['lodging_unit_id'], [])
+            assert all(not (start < assignment['check_out'] and end > assignment['check_in'])
+                       for start, end in intervals), f"Overlap on unit {assignment['lodging_unit_id']}"
+            intervals.append((assignment['check_in'], assignment['check_out']))
+        print(f"  [PASS] {len(plan.assignments)}/{len(queue)} inquiries, "
+              f"{plan.fulfilled_nights}/{plan.requested_nights} nights planned in {elapsed * 1000:.0f}ms")
+
+        # Plan and apply against the database
+        start = date.today() + timedelta(days=800)
+        created = []
+        for offset in (0, 3):
+            BookingOperations.create_booking_request({
+                'guest_name': 'Plan Probe', 'email': 'probe@example.com', 'booking_type': 'respite', 'guests': 1,
+                'check_in': (start + timedelta(days=offset)).isoformat(),
+                'check_out': (start + timedelta(days=offset + 3)).isoformat(),
+            })
+        probes = [a for a in BookingOperations.plan_room_assignments().assignments if a['guest_name'] == 'Plan Probe']
+        assert len(probes) == 2, probes
+        # Back-to-back stays share a unit rather than splitting two units
+        assert probes[0]['lodging_unit_id'] == probes[1]['lodging_unit_id'], probes
+
+        # A unit taken since planning rolls the whole plan back
+        stolen = dict(probes[0])
+        BookingOperations.block_units([stolen['lodging_unit_id']], start, start + timedelta(days=1), "Plan probe")
+        result = BookingOperations.apply_assignment_plan(probes)
+        assert result == {'applied': 0, 'conflicts': [stolen['booking_id']]}, result
+        assert not any(b.get('lodging_unit_id') for b in BookingOperations.get_all_booking_requests('pending')
+                       if b['guest_name'] == 'Plan Probe'), "Partial plan applied"
+        print(f"  [PASS] Conflicting plan rolled back")
+
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM unit_blocks WHERE reason = ?", ("Plan probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+        result = BookingOperations.apply_assignment_plan(probes)
+        assert result == {'applied': 2, 'conflicts': []}, result
+        assigned = {b['id']: b['lodging_unit_id'] for b in BookingOperations.get_all_booking_requests('pending')
+                    if b['guest_name'] == 'Plan Probe'}
+        assert assigned == {a['booking_id']: a['lodging_unit_id'] for a in probes}, assigned
+        print(f"  [PASS] Plan applied in one transaction")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Assignment plan test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM booking_requests WHERE guest_name = ?", ("Plan Probe",))
+            conn.execute("DELETE FROM unit_blocks WHERE reason = ?", ("Plan probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+
+def test_group_allocation():
+    """Test multi-unit group allocation and linked group bookings"""
+    print("\n[TEST] Group Allocation...")
+    import time
+    from database.connection import get_db_connection
+    from database.operations import BookingOperations
+    from utils.group_allocation import find_group_allocations
+
+    def layout(*spec):
+        units = []
+        for count, location, capacity in spec:
+            for _ in range(count):
+                units.append({'id': len(units) + 1, 'name': f"{location} {len(units) + 1}",
+                              'location': location, 'capacity': capacity})
+        return units
+
+    try:
+        units = layout((7, 'Lodge', 1), (1, 'Lodge', 6), (1, 'Lodge', 4), (4, 'A-frame', 3), (1, 'Facilities', 15))
+        names = lambda option: sorted(unit['name'] for unit in option['units'])
+        options = find_group_allocations(units, 10)
+        assert [len(option['units']) for option in options] == sorted(len(option['units']) for option in options)
+        assert names(options[0]) == ['Facilities 14'], options[0]
+        assert (names(options[1]), options[1]['spare']) == (['Lodge 8', 'Lodge 9'], 0), options[1]
+        assert all(option['capacity'] - min(unit['capacity'] for unit in option['units']) < 10
+                   for option in options), "Non-minimal set offered"
+        a_frame = find_group_allocations(units, 8, location='A-frame')
+        assert [(len(option['units']), option['locations']) for option in a_frame] == [(3, ['A-frame'])], a_frame
+        assert find_group_allocations(units, 40) == [], "Party larger than every unit combined"
+        print(f"  [PASS] Sets ranked by fewest units, minimal and location-constrained")
+
+        many = layout(*[(40, f"Site {k}", 1 + k % 4) for k in range(10)])
+        started = time.perf_counter()
+        options = find_group_allocations(many, 15)
+        elapsed = time.perf_counter() - started
+        assert options and elapsed < 0.5, f"{len(many)} units took {elapsed:.2f}s"
+        assert all(option['capacity'] >= 15 for option in options), options
+        print(f"  [PASS] {len(many)} units searched in {elapsed * 1000:.0f}ms")
+
+        start = date.today() + timedelta(days=900)
+        check_in, check_out = start, start + timedelta(days=3)
+        booking_id = BookingOperations.create_booking_request({
+            'guest_name': 'Group Probe', 'email': 'probe@example.com', 'booking_type': 'retreat',
+            'guests': 10, 'check_in': check_in.isoformat(), 'check_out': check_out.isoformat(),
+        })
+        options = BookingOperations.find_group_allocations(check_in, check_out, 10, location='Lodge')
+        assert options and options[0]['locations'] == ['Lodge'], options
+        unit_ids = [unit['id'] for unit in options[0]['units']]
+        group_id = BookingOperations.assign_group_to_booking(booking_id, unit_ids)
+        assert group_id, "Group booking failed"
+
+        members = [b for b in BookingOperations.get_all_booking_requests('pending') if b.get('group_id') == group_id]
+        assert sorted(b['lodging_unit_id'] for b in members) == sorted(unit_ids), members
+        assert sum(b['guests'] for b in members) == 10, members
+        assert not any(BookingOperations.check_availability(unit_id, check_in, check_out) for unit_id in unit_ids), \
+            "Group units still free"
+        print(f"  [PASS] Group {group_id} books {len(members)} units for 10 guests")
+
+        other = next(b['id'] for b in members if b['id'] != booking_id)
+        assert BookingOperations.update_booking_status(other, 'confirmed'), "Status update failed"
+        conn = get_db_connection()
+        try:
+            statuses = {row[0] for row in conn.execute(
+                "SELECT status FROM booking_requests WHERE group_id = ?", (group_id,)).fetchall()}
+            group_status = conn.execute("SELECT status FROM booking_groups WHERE id = ?", (group_id,)).fetchone()[0]
+        finally:
+            conn.close()
+        assert statuses == {'confirmed'} and group_status == 'confirmed', (statuses, group_status)
+        print(f"  [PASS] One status change applies to the whole group")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Group allocation test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM booking_requests WHERE guest_name = ?", ("Group Probe",))
+            conn.execute("DELETE FROM booking_groups WHERE guest_name = ?", ("Group Probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+
+def test_booking_conflicts():
+    """Test that simultaneous submissions for one unit produce exactly one booking"""
+    print("\n[TEST] Booking Conflicts...")
+    import threading
+    from database.connection import BookingConflictError, get_db_connection
+    from database.operations import BookingOperations
+
+    start = date.today() + timedelta(days=1000)
+    try:
+        submissions = 16
+        barrier = threading.Barrier(submissions)
+        outcomes = []
+
+        def submit(offset):
+            booking = {
+                'guest_name': 'Conflict Probe', 'email': 'probe@example.com', 'booking_type': 'respite',
+                'guests': 1, 'lodging_unit_id': 1,
+                # Every stay overlaps every other one by at least a night
+                'check_in': (start + timedelta(days=offset % 2)).isoformat(),
+                'check_out': (start + timedelta(days=3 + offset % 2)).isoformat(),
+            }
+            barrier.wait()
+            try:
+                outcomes.append(('booked', BookingOperations.create_booking_request(booking)))
+            except BookingConflictError:
+                outcomes.append(('conflict', None))
+            except Exception as e:
+                outcomes.append(('error', str(e)))
+
+        threads = [threading.Thread(target=submit, args=(i,)) for i in range(submissions)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        kinds = [kind for kind, _ in outcomes]
+        assert kinds.count('booked') == 1 and kinds.count('conflict') == submissions - 1, outcomes
+        assert all(booking_id for kind, booking_id in outcomes if kind == 'booked'), outcomes
+        conn = get_db_connection()
+        try:
+            stored = conn.execute("SELECT COUNT(*) FROM booking_requests WHERE guest_name = ?",
+                                  ("Conflict Probe",)).fetchone()[0]
+        finally:
+            conn.close()
+        assert stored == 1, f"{stored} overlapping bookings stored"
+        print(f"  [PASS] {submissions} simultaneous submissions: 1 booked, {submissions - 1} conflicts")
+
+        # Assignment is conditional too, including blocked ranges
+        inquiry = BookingOperations.create_booking_request({
+            'guest_name': 'Conflict Probe', 'email': 'probe@example.com', 'booking_type': 'respite',
+            'guests': 1, 'check_in': start.isoformat(), 'check_out': (start + timedelta(days=2)).isoformat(),
+        })
+        try:
+            BookingOperations.assign_room_to_booking(inquiry, 1)
+            raise AssertionError("Assigned an occupied unit")
+        except BookingConflictError:
+            pass
+        BookingOperations.block_units([2], start, start + timedelta(days=1), "Conflict probe")
+        try:
+            BookingOperations.create_booking_request({
+                'guest_name': 'Conflict Probe', 'email': 'probe@example.com', 'booking_type': 'respite',
+                'guests': 1, 'lodging_unit_id': 2,
+                'check_in': start.isoformat(), 'check_out': (start + timedelta(days=2)).isoformat(),
+            })
+            raise AssertionError("Booked a blocked unit")
+        except BookingConflictError:
+            pass
+        assert BookingOperations.assign_room_to_booking(inquiry, 3), "Free unit not assigned"
+        print(f"  [PASS] Occupied and blocked units rejected with a conflict")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Booking conflict test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM booking_requests WHERE guest_name = ?", ("Conflict Probe",))
+            conn.execute("DELETE FROM unit_blocks WHERE reason = ?", ("Conflict probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+
+def test_rows():
+    """Test compact rows behave like sqlite3.Row and survive copy and pickle"""
+    print("\n[TEST] Rows...")
+    try:
+        import copy
+        import pickle
+        from database.connection import Row, StaticResult, TursoCursorWrapper, get_db_connection
+
+        conn = get_db_connection()
+        try:
+            sqlite_row = conn.execute("SELECT 1 AS id, 'Cabin' AS name").fetchone()
+        finally:
+            conn.close()
+        turso_row = TursoCursorWrapper(StaticResult(('id', 'name'), [(1, 'Cabin')]), Row).fetchone()
+
+        for row in (sqlite_row, turso_row):
+            assert dict(row) == {'id': 1, 'name': 'Cabin'}, f"dict(row) gave {dict(row)}"
+            assert row.name == 'Cabin' and row['id'] == 1 and row[1] == 'Cabin', "Column access failed"
+            assert not hasattr(row, 'missing'), "Unknown column did not raise AttributeError"
+            for clone in (copy.copy(row), copy.deepcopy(row), pickle.loads(pickle.dumps(row))):
+                assert clone == row and dict(clone) == dict(row), "Copied row differs"
+        print(f"  [PASS] dict(), attribute access, copy and pickle work on both backends")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Row test failed: {e}")
+        return False
+
+def test_query_instrumentation():
+    """Test query instrumentation records call sites"""
+    print("\n[TEST] Query Instrumentation...")
+    from database.connection import config
+    previous_env = {name: os.environ.get(name) for name in ("QUERY_STATS_ENABLED", "SLOW_QUERY_MS")}
+    try:
+        from database.connection import query_stats, fingerprint_sql
+        from database.operations import BookingOperations
+
+        records = []
+        listener = lambda record, parameters: records.append(record)
+        query_stats.add_listener(listener)
+        try:
+            query_stats.begin_render("test")
+            BookingOperations.get_booking_summary()
+        finally:
+            query_stats.remove_listener(listener)
+
+        assert records, "No queries recorded"
+        call_sites = {record.call_site for record in records}
+        assert 'BookingOperations.get_booking_summary' in call_sites, f"Unexpected call sites: {call_sites}"
+        previous, current = query_stats.render_stats()
+        assert current['queries'] >= len(records), "Render counts not aggregated"
+        print(f"  [PASS] Recorded {len(records)} queries from {sorted(call_sites)}")
+
+        assert fingerprint_sql("SELECT * FROM t WHERE id IN (1, 2) AND name = 'x'") == \
+            "SELECT * FROM t WHERE id IN (...) AND name = ?", "Fingerprint normalisation failed"
+        print(f"  [PASS] SQL fingerprints normalise literals")
+
+        # Disabled with no listeners: nothing is aggregated, slow statements are still logged
+        os.environ.update(QUERY_STATS_ENABLED="false", SLOW_QUERY_MS="1000000")
+        config.reload()
+        query_stats.reset()
+        BookingOperations.get_booking_summary()
+        assert not query_stats.summary() and not query_stats.slow_queries, "Disabled stats recorded queries"
+        os.environ["SLOW_QUERY_MS"] = "0"
+        config.reload()
+        BookingOperations.get_booking_summary()
+        assert not query_stats.summary(), "Disabled stats aggregated slow queries"
+        slow_sites = {record.call_site for record in query_stats.slow_queries}
+        assert 'BookingOperations.get_booking_summary' in slow_sites, f"Slow queries not logged: {slow_sites}"
+        print(f"  [PASS] Disabled stats only log slow statements")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Query instrumentation test failed: {e}")
+        return False
+    finally:
+        for name, value in previous_env.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        config.reload()
+        query_stats.reset()
+
+class _FakeTursoClient:
+    """Stand-in libsql client: counts requests, answers writes with one affected row"""
+
+    def __init__(self, healthy=True):
+        self.healthy = healthy
+        self.closed = False
+        self.requests = 0
+
+    def execute(self, sql, parameters=None):
+        from database.connection import StaticResult
+        self.requests += 1
+        if not self.healthy:
+            raise ConnectionError("connection reset")
+        return StaticResult(rows_affected=1)
+
+    def batch(self, statements):
+        from database.connection import StaticResult
+        self.requests += 1
+        return [StaticResult(rows_affected=1) for _ in statements]
+
+    def close(self):
+        self.closed = True
+
+class _SQLiteBackedClient(_FakeTursoClient):
+    """Stand-in libsql client that answers requests from an in-memory SQLite database"""
+
+    def __init__(self):
+        import sqlite3
+        super().__init__()
+        self.db = sqlite3.connect(":memory:", isolation_level=None, check_same_thread=False)
+
+    def execute(self, sql, parameters=None):
+        self.requests += 1
+        if not self.healthy:
+            raise ConnectionError("connection reset")
+        return self._run(sql, parameters)
+
+    def batch(self, statements):
+        self.requests += 1
+        if not self.healthy:
+            raise ConnectionError("connection reset")
+        self.db.execute("BEGIN")
+        try:
+            results = [self._run(*stmt) if isinstance(stmt, tuple) else self._run(stmt)
+                       for stmt in statements]
+        except Exception:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+        return results
+
+    def _run(self, sql, parameters=None):
+        from database.connection import StaticResult
+        cursor = self.db.execute(sql, parameters or [])
+        columns = tuple(d[0] for d in cursor.description) if cursor.description else ()
+        return StaticResult(columns, cursor.fetchall() if columns else [],
+                            max(cursor.rowcount, 0), cursor.lastrowid)
+
+def test_sqlite_connection_cache():
+    """Test each thread reuses one cached SQLite connection"""
+    print("\n[TEST] SQLite Connection Cache...")
+    try:
+        import sqlite3
+        import threading
+        from database.connection import SQLiteConnectionManager, config, get_db_connection
+
+        first = get_db_connection()
+        first.close()
+        second = get_db_connection()
+        try:
+            assert second is first, "Connection was reopened on the same thread"
+        finally:
+            second.close()
+
+        others = []
+        thread = threading.Thread(target=lambda: others.append(get_db_connection()))
+        thread.start()
+        thread.join()
+        others[0].close()
+        assert others[0] is not first, "Threads shared one SQLite connection"
+
+        # A helper that fails mid-query still returns its checkout
+        from database.operations import BookingOperations
+        try:
+            BookingOperations.get_lodging_units_by_location(["not", "bindable"])
+            raise AssertionError("Unbindable parameter did not raise")
+        except sqlite3.Error:
+            pass
+        assert first.checkouts == 0, f"Failed helper leaked {first.checkouts} checkout(s)"
+        print(f"  [PASS] One connection per thread, reused across checkouts")
+
+        # An abandoned transaction is rolled back when the last checkout closes
+        manager = SQLiteConnectionManager()
+        path = config.settings.local_db_path
+        conn = manager.get(path, 300)
+        conn.execute("INSERT INTO property_todos (title) VALUES (?)", ("Cache probe",))
+        conn.close()
+        assert not conn.in_transaction, "Uncommitted write leaked into the next checkout"
+        assert manager.get(path, 300) is conn, "Connection not reused by the manager"
+        conn.close()
+
+        # Past its lifetime the idle connection is replaced
+        fresh = manager.get(path, 0)
+        fresh.close()
+        assert fresh is not conn, "Expired connection was reused"
+        manager.reset()
+        print(f"  [PASS] Abandoned writes rolled back and expired connections replaced")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] SQLite connection cache test failed: {e}")
+        return False
+
+def test_turso_client_pool():
+    """Test pooled Turso clients are reused, released and replaced"""
+    print("\n[TEST] Turso Client Pool...")
+    try:
+        from database.connection import TursoClientPool
+
+        pool = TursoClientPool("libsql://example.turso.io", "token", max_size=1,
+                               idle_timeout=60, health_check_interval=60)
+        pool._create_client = lambda websocket=False: _FakeTursoClient()
+
+        first = pool.acquire()
+        pool.release(first)
+        assert pool.acquire() is first, "Released client was not reused"
+        second = pool.acquire()
+        assert second is not first, "A checked-out client was handed out twice"
+        pool.release(first)
+        pool.release(second)
+        assert second.closed and not first.closed, "Surplus client not closed when the pool is full"
+        assert pool.stats()['idle_clients'] == 1, "Pool kept more idle clients than max_size"
+        print(f"  [PASS] Clients are reused and surplus clients closed")
+
+        # A client idle past the health-check interval is pinged and replaced if broken
+        first.healthy = False
+        pool.health_check_interval = 0
+        replacement = pool.acquire()
+        assert replacement is not first and first.closed, "Unhealthy client was reused"
+        pool.release(replacement)
+        pool.idle_timeout = 0
+        fresh = pool.acquire()
+        assert fresh is not replacement and replacement.closed, "Expired idle client was reused"
+        pool.release(fresh, discard=True)
+        print(f"  [PASS] Unhealthy and expired clients are replaced")
+
+        # Checkouts beyond max_clients wait for a release, then fail fast
+        import threading
+        from database.connection import DatabaseUnavailableError
+        pool.max_clients, pool.checkout_timeout = 2, 0.05
+        held = [pool.acquire(), pool.acquire()]
+        try:
+            pool.acquire()
+            raise AssertionError("Pool handed out more than max_clients clients")
+        except DatabaseUnavailableError:
+            pass
+        pool.checkout_timeout = 5
+        threading.Timer(0.05, pool.release, args=(held.pop(),)).start()
+        held.append(pool.acquire())
+        assert pool.stats()['checked_out'] == 2, f"Checkout count drifted: {pool.stats()}"
+        for client in held:
+            pool.release(client)
+        pool.close()
+        assert pool.stats()['idle_clients'] == 0 and pool.stats()['checked_out'] == 0, "Closed pool kept clients"
+        print(f"  [PASS] At most max_clients clients are checked out at once")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Turso client pool test failed: {e}")
+        return False
+
+def test_turso_batches():
+    """Test executemany is sent as batched requests with a summed rowcount"""
+    print("\n[TEST] Turso Batches...")
+    try:
+        from database.connection import TursoConnectionWrapper
+
+        client = _FakeTursoClient()
+        conn = TursoConnectionWrapper(client)
+        rows = [(f"Batch probe {i}",) for i in range(5)]
+        cursor = conn.executemany("INSERT INTO property_todos (title) VALUES (?)", rows)
+        assert client.requests == 1, f"Expected one batch request, got {client.requests}"
+        assert cursor.rowcount == 5, f"Expected rowcount 5, got {cursor.rowcount}"
+
+        client.requests = 0
+        cursors = conn.batch([("INSERT INTO property_todos (title) VALUES (?)", row) for row in rows],
+                             chunk_size=2)
+        assert client.requests == 3, f"Expected 3 chunked requests, got {client.requests}"
+        assert len(cursors) == 5 and all(c.rowcount == 1 for c in cursors), "Missing per-statement cursors"
+        print(f"  [PASS] 5 inserts in 1 request (rowcount 5), or 3 requests of 2")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Turso batch test failed: {e}")
+        return False
+
+def test_execute_batch():
+    """Test execute_batch returns one cursor per statement, in order, on both backends"""
+    print("\n[TEST] Execute Batch...")
+    try:
+        import sqlite3
+        from database.connection import (DatabaseUnavailableError, Row, TursoConnectionWrapper,
+                                         get_db_connection)
+
+        statements = [
+            ("SELECT ? AS value", (1,)),
+            ("SELECT ? || ? AS value", ("a", "b")),
+            ("SELECT ? AS value", (date(2024, 1, 5),)),
+        ]
+        failing = [
+            ("INSERT INTO property_todos (title) VALUES (?)", ("Batch probe",)),
+            ("SELECT * FROM missing_table", None),
+        ]
+        count_probes = "SELECT COUNT(*) FROM property_todos WHERE title = 'Batch probe'"
+
+        client = _SQLiteBackedClient()
+        client.db.execute("CREATE TABLE property_todos (title TEXT)")
+        turso = TursoConnectionWrapper(client)
+        turso.row_factory = Row
+        local = get_db_connection()
+        try:
+            for name, conn, count in (("sqlite", local, lambda: local.execute(count_probes).fetchone()[0]),
+                                      ("turso", turso, lambda: client.db.execute(count_probes).fetchone()[0])):
+                client.requests = 0
+                values = [cursor.fetchone()['value'] for cursor in conn.execute_batch(statements)]
+                assert values == [1, 'ab', '2024-01-05'], f"{name} batch returned {values}"
+                try:
+                    conn.execute_batch(failing)
+                    raise AssertionError(f"{name} batch with a bad statement did not raise")
+                except sqlite3.OperationalError:
+                    pass
+                assert count() == 0, f"{name} batch kept the insert of a failed batch"
+            assert client.requests == 2, f"Expected one Turso request per batch, got {client.requests}"
+        finally:
+            local.close()
+        print(f"  [PASS] Results in statement order with their own params; errors raise and roll back")
+
+        client.healthy = False
+        try:
+            turso.execute_batch(statements)
+            raise AssertionError("Unreachable Turso batch did not raise")
+        except DatabaseUnavailableError:
+            pass
+        print(f"  [PASS] An unreachable primary raises DatabaseUnavailableError")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Execute batch test failed: {e}")
+        return False
+
+def test_streaming():
+    """Test streamed reads return every row once, in key order, on both backends"""
+    print("\n[TEST] Streaming...")
+    try:
+        from database.connection import TursoConnectionWrapper, Row, get_db_connection
+        from database.operations import BookingOperations
+
+        client = _SQLiteBackedClient()
+        client.db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, rank INTEGER)")
+        # rank ties make the inner ORDER BY ambiguous
+        client.db.executemany("INSERT INTO items VALUES (?, ?)", [(i, i % 3) for i in range(1, 11)])
+        conn = TursoConnectionWrapper(client)
+        conn.row_factory = Row
+        query = "SELECT * FROM items ORDER BY rank"
+        ids = [row['id'] for row in conn.stream(query, page_size=3, key='id')]
+        assert ids == list(range(1, 11)), f"Ascending stream returned {ids}"
+        assert client.requests == 4, f"Expected 4 page requests, got {client.requests}"
+        ids = [row['id'] for row in conn.stream(query, page_size=3, key='id', descending=True)]
+        assert ids == list(range(10, 0, -1)), f"Descending stream returned {ids}"
+        print(f"  [PASS] Turso keyset pages cover every row once, in key order")
+
+        # Between pages the pooled client is back in the pool
+        from database.connection import TursoClientPool
+        pool = TursoClientPool("libsql://example.turso.io", "token")
+        pool._create_client = lambda websocket=False: client
+        pooled = TursoConnectionWrapper(None, pool)
+        pooled.row_factory = Row
+        rows = pooled.stream(query, page_size=3, key='id')
+        next(rows)
+        assert pool.stats()['checked_out'] == 0, "Stream held its Turso client between pages"
+        assert len(list(rows)) == 9, "Stream did not resume after releasing its client"
+        pool.close()
+
+        # ...and a paused SQLite stream holds no read lock, so writers can commit
+        import sqlite3
+        from database.connection import config
+        conn = get_db_connection()
+        try:
+            rows = conn.stream("SELECT id FROM lodging_units", page_size=2, key='id')
+            next(rows)
+            writer = sqlite3.connect(config.settings.local_db_path, timeout=0)
+            try:
+                writer.execute("INSERT INTO property_todos (title) VALUES ('Stream probe')")
+                writer.commit()
+                writer.execute("DELETE FROM property_todos WHERE title = 'Stream probe'")
+                writer.commit()
+            finally:
+                writer.close()
+            rows.close()
+        finally:
+            conn.close()
+        print(f"  [PASS] Paused streams hold no Turso client or SQLite lock")
+
+        streamed = [row['id'] for row in BookingOperations.stream_booking_requests(page_size=2)]
+        conn = get_db_connection()
+        try:
+            stored = [row[0] for row in conn.execute("SELECT id FROM booking_requests ORDER BY id DESC")]
+        finally:
+            conn.close()
+        assert streamed == stored, "Streamed bookings differ from the table"
+        print(f"  [PASS] {len(streamed)} bookings streamed newest first")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Streaming test failed: {e}")
+        return False
+
+def test_turso_replica():
+    """Test replica reads respect staleness, read-your-writes and failed syncs"""
+    print("\n[TEST] Turso Replica...")
+    try:
+        import tempfile
+        from database.connection import Row, TursoClientPool, TursoConnectionWrapper, TursoReplica
+
+        primary = _SQLiteBackedClient()
+        primary.db.execute("CREATE TABLE items (id INTEGER PRIMARY KEY, label TEXT)")
+        primary.db.execute("CREATE INDEX idx_items_label ON items (label)")
+        primary.db.execute("INSERT INTO items VALUES (1, 'synced')")
+        pool = TursoClientPool("libsql://example.turso.io", "token")
+        pool._create_client = lambda websocket=False: primary
+
+        with tempfile.TemporaryDirectory() as tmp:
+            replica = TursoReplica(os.path.join(tmp, "replica.db"), max_staleness=60, sync_on_write=False)
+            sync_requests = []
+            replica.request_sync = sync_requests.append
+            conn = TursoConnectionWrapper(None, pool, replica)
+            conn.row_factory = Row
+            read = lambda: conn.execute("SELECT label FROM items WHERE id = 1").fetchone()['label']
+            try:
+                assert not replica.can_serve(), "Replica served reads before its first sync"
+                replica.sync(primary)
+                primary.requests = 0
+                assert read() == 'synced' and primary.requests == 0, "Fresh replica read went to the primary"
+
+                # Past max_staleness reads go to the primary and a refresh is requested
+                replica.synced_at -= 120
+                primary.db.execute("UPDATE items SET label = 'moved on' WHERE id = 1")
+                assert read() == 'moved on' and primary.requests == 1, "Stale replica served a read"
+                assert sync_requests == [pool], "Stale read did not request a sync"
+                print(f"  [PASS] Fresh replicas serve reads, stale ones are refused")
+
+                # A session that wrote reads the primary until a later sync
+                replica.sync(primary)
+                conn.execute("UPDATE items SET label = 'written' WHERE id = 1")
+                assert not replica.can_serve(), "Writer may read its stale replica"
+                assert replica.can_serve(session='another session'), "Other sessions lost the replica"
+                assert read() == 'written', "Writer did not see its own write"
+                replica.sync(primary)
+                primary.requests = 0
+                assert read() == 'written' and primary.requests == 0, "Synced replica not used again"
+                print(f"  [PASS] Writers read the primary until the next sync")
+
+                # A failed sync counts against the breaker and keeps the writer off the replica
+                conn.execute("UPDATE items SET label = 'newest' WHERE id = 1")
+                conn.close()
+                syncs = replica.syncs
+                primary.healthy = False
+                replica._sync_in_background(pool)
+                primary.healthy = True
+                assert pool.breaker.stats()['consecutive_failures'] == 1, "Failed sync not recorded"
+                assert primary.closed and pool.stats()['idle_clients'] == 0, "Broken client returned to the pool"
+                primary.closed = False
+                assert replica.syncs == syncs and not replica.can_serve(), "Failed sync counted as fresh"
+                assert read() == 'newest', "Stale replica data served after a failed sync"
+                print(f"  [PASS] Failed syncs count towards the breaker and never serve stale rows")
+            finally:
+                conn.close()
+                replica.close()
+        pool.close()
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Turso replica test failed: {e}")
+        return False
+
+def test_circuit_breaker():
+    """Test the Turso circuit breaker opens and recovers"""
+    print("\n[TEST] Circuit Breaker...")
+    try:
+        import time
+        from database.connection import CircuitBreaker, DatabaseUnavailableError
+
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.2)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_failure()
+        assert breaker.state == "open", f"Breaker should be open, got {breaker.state}"
+        try:
+            breaker.before_call()
+            raise AssertionError("Open breaker let a call through")
+        except DatabaseUnavailableError:
+            pass
+        print(f"  [PASS] Breaker fails fast after repeated failures")
+
+        time.sleep(0.25)
+        breaker.before_call()
+        breaker.record_success()
+        assert breaker.state == "closed", f"Breaker should close after a good trial, got {breaker.state}"
+        print(f"  [PASS] Breaker closes after a successful trial request")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Circuit breaker test failed: {e}")
+        return False
+
+def test_transactions():
+    """Test unit-of-work transactions"""
+    print("\n[TEST] Transactions...")
+    try:
+        from database.connection import get_db_connection, transaction
+
+        with transaction() as conn:
+            inner = get_db_connection()
+            assert inner is conn, "Nested helper did not reuse the pinned connection"
+            inner.close()
+            with transaction() as nested:
+                assert nested is conn, "Nested transaction did not join the outer one"
+        print(f"  [PASS] Nested helpers share one connection")
+
+        try:
+            with transaction() as conn:
+                conn.execute("INSERT INTO property_todos (title) VALUES (?)", ("Rollback probe",))
+                conn.commit()  # deferred to the end of the block
+                raise RuntimeError("abort")
+        except RuntimeError:
+            pass
+        conn = get_db_connection()
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM property_todos WHERE title = ?", ("Rollback probe",)).fetchone()[0]
+        finally:
+            conn.close()
+        assert count == 0, "Transaction was not rolled back"
+        print(f"  [PASS] Failed transaction rolled back")
+
+        # A helper failing inside the block raises instead of returning None,
+        # so the helpers before it are rolled back too
+        from database.operations import BookingOperations
+        try:
+            with transaction():
+                booking_id = BookingOperations.create_booking_request({
+                    'guest_name': 'Unit Of Work Probe', 'email': 'probe@example.com', 'booking_type': 'respite',
+                    'guests': 1, 'check_in': (date.today() + timedelta(days=1200)).isoformat(),
+                    'check_out': (date.today() + timedelta(days=1202)).isoformat(),
+                })
+                assert booking_id, "First helper failed"
+                BookingOperations.update_booking_status(booking_id, 'no-such-status')
+            raise AssertionError("Failing helper did not raise inside transaction()")
+        except ValueError:
+            pass
+        conn = get_db_connection()
+        try:
+            count = conn.execute("SELECT COUNT(*) FROM booking_requests WHERE guest_name = ?",
+                                 ("Unit Of Work Probe",)).fetchone()[0]
+        finally:
+            conn.close()
+        assert count == 0, "First helper's booking was committed"
+        assert BookingOperations.update_booking_status(999999, 'no-such-status') is None, \
+            "Outside a transaction a failing helper should return None"
+        print(f"  [PASS] A failing helper rolls back the whole block")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Transaction test failed: {e}")
+        return False
+
+def test_booking_holds():
+    """Test that a unit held in the booking wizard is taken for everyone but its session"""
+    print("\n[TEST] Booking Holds...")
+    from database.connection import BookingConflictError, get_db_connection, transaction
+    from database.holds import purge_expired_holds
+    from database.operations import BookingOperations
+
+    check_in = date.today() + timedelta(days=1100)
+    check_out = check_in + timedelta(days=2)
+    try:
+        assert BookingOperations.hold_unit(1, check_in, check_out, 'hold-probe-a'), "Hold not placed"
+
+        # Taken for another session, free for the one holding it, from the index and from SQL
+        assert not BookingOperations.check_availability(1, check_in, check_out)
+        assert BookingOperations.check_availability(1, check_in, check_out, hold_session_id='hold-probe-a')
+        with transaction():
+            assert not BookingOperations.check_availability(1, check_in, check_out,
+                                                            hold_session_id='hold-probe-b')
+            assert BookingOperations.check_availability(1, check_in, check_out, hold_session_id='hold-probe-a')
+        free = [unit['id'] for unit in BookingOperations.get_available_units(check_in, check_out)]
+        assert 1 not in free, "Held unit listed as available"
+        try:
+            BookingOperations.hold_unit(1, check_in + timedelta(days=1), check_out, 'hold-probe-b')
+            raise AssertionError("Held unit held twice")
+        except BookingConflictError:
+            pass
+        print(f"  [PASS] Held unit is taken for other sessions only")
+
+        # A unit too small for the party is refused (None), which is not a conflict
+        small = min(BookingOperations.get_available_units(check_in, check_out), key=lambda unit: unit['capacity'])
+        assert BookingOperations.hold_unit(small['id'], check_in, check_out, 'hold-probe-c',
+                                           small['capacity'] + 1) is None, "Hold ignored the party size"
+        print(f"  [PASS] Holds respect unit capacity")
+
+        # Submitting with the session consumes its hold
+        booking_id = BookingOperations.create_booking_request({
+            'guest_name': 'Hold Probe', 'email': 'probe@example.com', 'booking_type': 'respite',
+            'guests': 1, 'lodging_unit_id': 1, 'check_in': check_in.isoformat(),
+            'check_out': check_out.isoformat(), 'hold_session_id': 'hold-probe-a',
+        })
+        assert booking_id, "Booking over own hold rejected"
+        conn = get_db_connection()
+        try:
+            held = conn.execute("SELECT COUNT(*) FROM booking_holds WHERE session_id = ?",
+                                ('hold-probe-a',)).fetchone()[0]
+            assert held == 0, "Hold left behind after submission"
+            # An expired hold blocks nothing and is purged
+            conn.execute("""
+                INSERT INTO booking_holds (lodging_unit_id, check_in, check_out, session_id, expires_at)
+                VALUES (2, ?, ?, 'hold-probe-c', datetime('now', '-1 minute'))
+            """, (check_in.isoformat(), check_out.isoformat()))
+            conn.commit()
+        finally:
+            conn.close()
+        assert BookingOperations.check_availability(2, check_in, check_out), "Expired hold still blocks"
+        with transaction():
+            assert BookingOperations.check_availability(2, check_in, check_out), "Expired hold still blocks"
+        assert purge_expired_holds() >= 1, "Expired hold not purged"
+
+        # The room planner and group allocation leave held units alone
+        units = [unit['id'] for unit in BookingOperations.get_available_units(check_in, check_out, 2)
+                 if unit['type'] != 'classroom']
+        for unit_id in units[:-1]:
+            assert BookingOperations.hold_unit(unit_id, check_in, check_out, f'hold-probe-plan-{unit_id}')
+        inquiry = BookingOperations.create_booking_request({
+            'guest_name': 'Hold Probe', 'email': 'probe@example.com', 'booking_type': 'respite',
+            'guests': 2, 'check_in': check_in.isoformat(), 'check_out': check_out.isoformat(),
+        })
+        plan = BookingOperations.plan_room_assignments()
+        planned = [a['lodging_unit_id'] for a in plan.assignments if a['booking_id'] == inquiry]
+        assert planned == [units[-1]], f"Planner proposed {planned}, only unit {units[-1]} is not held"
+        allocations = BookingOperations.find_group_allocations(check_in, check_out, 2)
+        assert all(unit['id'] not in units[:-1] for allocation in allocations for unit in allocation['units']), \
+            "Group allocation offered a held unit"
+        print(f"  [PASS] Planner and group allocation skip held units")
+
+        assert BookingOperations.hold_unit(3, check_in, check_out, 'hold-probe-b')
+        assert BookingOperations.release_hold('hold-probe-b'), "Hold not released"
+        assert BookingOperations.check_availability(3, check_in, check_out), "Released hold still blocks"
+        print(f"  [PASS] Holds are consumed on submit, released, and ignored once expired")
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Booking hold test failed: {e}")
+        return False
+    finally:
+        conn = get_db_connection()
+        try:
+            conn.execute("DELETE FROM booking_holds WHERE session_id LIKE 'hold-probe-%'")
+            conn.execute("DELETE FROM booking_requests WHERE guest_name = ?", ("Hold Probe",))
+            conn.commit()
+        finally:
+            conn.close()
+        from database.availability import availability_index
+        availability_index.invalidate()
+
+
+def test_query_plans():
+    """Test that operation queries use indexes instead of full table scans"""
+    print("\n[TEST] Query Plans...")
+    try:
+        import re
+        from database.connection import query_stats, get_db_connection, transaction
+        from database.availability import availability_index
+        from database.operations import BookingOperations
+        from database.property_operations import PropertyManagementOperations as Property
+
+        # Small reference tables where a full scan is expected and cheap
+        allowed_scans = {'lodging_units'}
+        # Unfiltered exports read every row; walking the table in key order is the cheapest plan
+        full_exports = {'BookingOperations.stream_booking_requests'}
+
+        def in_transaction(operation, *args):
+            with transaction():
+                return operation(*args)
+
+        check_in = date.today() + timedelta(days=30)
+        check_out = date.today() + timedelta(days=33)
+        operations = [
+            lambda: BookingOperations.get_all_lodging_units(),
+            lambda: BookingOperations.get_lodging_units_by_location('Lodge'),
+            lambda: BookingOperations.get_all_booking_requests(),
+            lambda: BookingOperations.get_all_booking_requests('pending'),
+            lambda: list(BookingOperations.stream_booking_requests()),
+            lambda: list(BookingOperations.stream_booking_requests('confirmed')),
+            lambda: BookingOperations.get_active_stays(),
+            lambda: BookingOperations.check_availability(1, check_in, check_out),
+            lambda: BookingOperations.get_available_units(check_in, check_out),
+            lambda: availability_index.invalidate() or availability_index.is_free(1, check_in, check_out),
+            # Inside a transaction availability is answered by SQL
+            lambda: in_transaction(BookingOperations.check_availability, 1, check_in, check_out),
+            lambda: in_transaction(BookingOperations.get_available_units, check_in, check_out),
+            lambda: in_transaction(BookingOperations.get_available_units_bulk, [(check_in, check_out, 1)]),
+            lambda: in_transaction(BookingOperations.check_availability, 1, check_in, check_out,
+                                   None, None, 'plan-probe'),
+            lambda: BookingOperations.release_hold('plan-probe'),
+            lambda: BookingOperations.get_booking_summary(),
+            lambda: BookingOperations.plan_room_assignments(),
+            lambda: BookingOperations.get_unit_blocks(check_in, check_out),
+            lambda: BookingOperations.get_unit_blocks(check_in, check_out, lodging_unit_id=1),
+            lambda: BookingOperations.get_daily_occupancy(check_in, check_out),
+            lambda: BookingOperations.update_booking_status(999999, 'pending'),
+            lambda: BookingOperations.assign_group_to_booking(999999, [1, 2]),
+            lambda: Property.get_property_notes(),
+            lambda: Property.get_property_notes(unit_id=1),
+            lambda: Property.get_property_notes(note_type='general'),
+            lambda: Property.get_maintenance_tasks(),
+            lambda: Property.get_maintenance_tasks(unit_id=1),
+            lambda: Property.get_maintenance_tasks(status='pending'),
+            lambda: Property.get_maintenance_tasks(overdue_only=True),
+            lambda: Property.update_maintenance_task(999999, status='pending'),
+            lambda: Property.get_todos(),
+            lambda: Property.get_todos(status=None),
+            lambda: Property.get_todos(unit_id=1),
+            lambda: Property.get_todos(category='general'),
+            lambda: Property.get_todos(overdue_only=True),
+            lambda: Property.update_todo(999999, status='pending'),
+            lambda: Property.get_property_files(),
+            lambda: Property.get_property_files(unit_id=1),
+            lambda: Property.get_inspections(),
+            lambda: Property.get_inspections(unit_id=1),
+            lambda: Property.get_maintenance_schedules(),
+            lambda: Property.get_maintenance_schedules(unit_id=1),
+            lambda: Property.get_maintenance_schedules(overdue_only=True),
+            lambda: Property.get_property_dashboard_summary(),
+        ]
+
+        captured = {}
+        def capture(record, parameters):
+            if record.call_site.startswith(('BookingOperations.', 'PropertyManagementOperations.', 'AvailabilityIndex.')):
+                captured[(record.sql, tuple(parameters or ()))] = record.call_site
+
+        query_stats.add_listener(capture)
+        try:
+            for operation in operations:
+                operation()
+        finally:
+            query_stats.remove_listener(capture)
+
+        assert captured, "No operation queries captured"
+        failures = []
+        conn = get_db_connection()
+        try:
+            for (sql, parameters), call_site in captured.items():
+                # Map aliases (FROM booking_requests br) back to table names
+                tables = {alias or table: table for table, alias in
+                          re.findall(r"(?:FROM|JOIN|UPDATE)\s+(\w+)(?:\s+(?:AS\s+)?(?!WHERE|LEFT|JOIN|ON|ORDER|SET|GROUP|LIMIT)(\w+))?", sql, re.I)}
+                for row in conn.execute("EXPLAIN QUERY PLAN " + sql, parameters).fetchall():
+                    scan = re.fullmatch(r"SCAN (\w+)", row[3])
+                    if call_site in full_exports and not re.search(r"\bWHERE\b", sql, re.I):
+                        continue
+                    if scan and tables.get(scan.group(1), scan.group(1)) not in allowed_scans:
+                        failures.append(f"{call_site}: {row[3]}")
+        finally:
+            conn.close()
+
+        assert not failures, "Full table scans: " + "; ".join(sorted(set(failures)))
+        print(f"  [PASS] {len(captured)} operation queries use indexes")
+
+        return True
+    except Exception as e:
+        print(f"  [FAIL] Query plan test failed: {e}")
+        return False
+
 def run_all_tests():
     """Run all tests"""
     print("=" * 60)
@@ -221,11 +1807,34 @@ def run_all_tests():
     tests = [
         test_database_initialization,
         test_configuration,
+        test_settings_reload,
+        test_migrations,
         test_lodging_units,
         test_booking_operations,
         test_property_management,
         test_helpers,
-        test_availability
+        test_availability,
+        test_rows,
+        test_query_instrumentation,
+        test_sqlite_connection_cache,
+        test_turso_client_pool,
+        test_turso_batches,
+        test_execute_batch,
+        test_streaming,
+        test_turso_replica,
+        test_circuit_breaker,
+        test_transactions,
+        test_query_plans,
+        test_availability_index,
+        test_occupancy_matrix,
+        test_daily_occupancy,
+        test_unit_blocks,
+        test_find_windows,
+        test_bulk_availability,
+        test_assignment_plan,
+        test_group_allocation,
+        test_booking_conflicts,
+        test_booking_holds
     ]
 
     results = []
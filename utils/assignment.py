@@ -0,0 +1,262 @@
+"""
+Room-assignment optimizer for the pending inquiry queue
+
+plan_assignments() places every pending inquiry without a unit onto the
+units around the existing commitments (bookings already holding a unit
+and unit_blocks ranges). Inquiries are placed greedily, longest stays
+first, each on the unit where it leaves the fewest orphan nights (free
+gaps shorter than min_gap_nights that nobody is likely to book), then the
+least spare capacity. A repair pass then retries every inquiry left over
+by moving already-planned inquiries that are in its way onto other units.
+
+Nothing is written here; the plan is reviewed by staff and applied with
+BookingOperations.apply_assignment_plan().
+"""
+
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+
+# Unit types an inquiry of a booking type must not be placed in; booking
+# types not listed may use any unit type
+EXCLUDED_UNIT_TYPES = {
+    'respite': {'classroom'},
+    'refuge': {'classroom'},
+}
+
+# Passes of the repair step over the inquiries still unplaced
+_REPAIR_PASSES = 3
+
+
+def _day(value) -> int:
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def _orphan(gap: Optional[int], min_gap_nights: int) -> int:
+    """Nights in a closed gap too short to be booked; open gaps (None) are never orphaned"""
+    return gap if gap is not None and 0 < gap < min_gap_nights else 0
+
+
+class _Timeline:
+    """
+    Disjoint busy intervals of one unit as day ordinals, sorted by start
+
+    owners[i] is None for existing commitments (which never move) or the
+    booking id of an inquiry placed by the plan.
+    """
+
+    __slots__ = ('starts', 'ends', 'owners')
+
+    def __init__(self, intervals: Iterable[tuple]):
+        self.starts, self.ends, self.owners = [], [], []
+        # Commitments may overlap each other (a block over a booking); merge them
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+                self.owners.append(None)
+
+    def fits(self, start: int, end: int) -> bool:
+        k = bisect_right(self.starts, start)
+        return (k == 0 or self.ends[k - 1] <= start) and (k == len(self.starts) or self.starts[k] >= end)
+
+    def overlapping(self, start: int, end: int) -> List[int]:
+        """Positions of intervals overlapping [start, end)"""
+        k = bisect_left(self.starts, end)
+        positions = []
+        i = k - 1
+        while i >= 0 and self.ends[i] > start:
+            positions.append(i)
+            i -= 1
+        return positions
+
+    def placement_cost(self, start: int, end: int, min_gap_nights: int) -> tuple:
+        """(orphan nights added, nights to the nearest neighbour) for a stay that fits"""
+        k = bisect_right(self.starts, start)
+        before = start - self.ends[k - 1] if k > 0 else None
+        after = self.starts[k] - end if k < len(self.starts) else None
+        whole = before + (end - start) + after if before is not None and after is not None else None
+        orphaned = (_orphan(before, min_gap_nights) + _orphan(after, min_gap_nights)
+                    - _orphan(whole, min_gap_nights))
+        slack = min(gap for gap in (before, after, 10 ** 6) if gap is not None)
+        return orphaned, slack
+
+    def insert(self, start: int, end: int, owner: int):
+        k = bisect_right(self.starts, start)
+        self.starts.insert(k, start)
+        self.ends.insert(k, end)
+        self.owners.insert(k, owner)
+
+    def remove(self, owner: int):
+        k = self.owners.index(owner)
+        del self.starts[k], self.ends[k], self.owners[k]
+
+    def orphan_nights(self, min_gap_nights: int) -> int:
+        return sum(_orphan(self.starts[i] - self.ends[i - 1], min_gap_nights)
+                   for i in range(1, len(self.starts)))
+
+
+class AssignmentPlan:
+    """
+    Proposed unit for each pending inquiry
+
+    assignments holds one dict per placed inquiry (booking_id,
+    lodging_unit_id, unit_name, location, guest_name, guests, check_in,
+    check_out, nights); unassigned holds the inquiries that could not be
+    placed, each with a 'reason'.
+    """
+
+    def __init__(self, assignments: List[Dict], unassigned: List[Dict], requested_nights: int,
+                 orphan_nights_before: int, orphan_nights_after: int):
+        self.assignments = assignments
+        self.unassigned = unassigned
+        self.requested_nights = requested_nights
+        self.orphan_nights_before = orphan_nights_before
+        self.orphan_nights_after = orphan_nights_after
+
+    @property
+    def fulfilled_nights(self) -> int:
+        return sum(assignment['nights'] for assignment in self.assignments)
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """One row per proposed assignment, for review"""
+        if not self.assignments:
+            return pd.DataFrame()
+        return pd.DataFrame([{
+            'Guest': assignment['guest_name'],
+            'Guests': assignment['guests'],
+            'Check-in': assignment['check_in'],
+            'Check-out': assignment['check_out'],
+            'Nights': assignment['nights'],
+            'Unit': assignment['unit_name'],
+            'Location': assignment['location'],
+        } for assignment in self.assignments])
+
+
+def plan_assignments(units: List[Dict], commitments: Iterable[Dict], inquiries: List[Dict],
+                     min_gap_nights: int = 2) -> AssignmentPlan:
+    """
+    Propose a unit for each inquiry
+
+    units are lodging_units rows in display order (inactive units are
+    skipped); commitments are {'lodging_unit_id', 'start', 'end'} busy
+    ranges; inquiries are booking_requests rows without a unit. A unit is
+    eligible when it has room for the party and its type is allowed for the
+    booking type (EXCLUDED_UNIT_TYPES).
+    """
+    units = [unit for unit in units if unit.get('is_active', 1)]
+    order = {unit['id']: i for i, unit in enumerate(units)}
+    busy: Dict[int, list] = {unit['id']: [] for unit in units}
+    for commitment in commitments:
+        if commitment['lodging_unit_id'] in busy:
+            busy[commitment['lodging_unit_id']].append((_day(commitment['start']), _day(commitment['end'])))
+    timelines = {unit_id: _Timeline(intervals) for unit_id, intervals in busy.items()}
+    orphan_nights_before = sum(timeline.orphan_nights(min_gap_nights) for timeline in timelines.values())
+
+    stays = {}
+    for inquiry in inquiries:
+        start, end = _day(inquiry['check_in']), _day(inquiry['check_out'])
+        if start < end:
+            excluded = EXCLUDED_UNIT_TYPES.get(inquiry.get('booking_type'), ())
+            eligible = [unit['id'] for unit in units
+                        if (unit.get('capacity') or 0) >= inquiry['guests'] and unit.get('type') not in excluded]
+            stays[inquiry['id']] = (start, end, eligible)
+    capacity = {unit['id']: unit.get('capacity') or 0 for unit in units}
+    guests = {inquiry['id']: inquiry['guests'] for inquiry in inquiries}
+    placed: Dict[int, int] = {}
+
+    def best_unit(booking_id: int, skip: Optional[int] = None) -> Optional[int]:
+        start, end, eligible = stays[booking_id]
+        best = None
+        for unit_id in eligible:
+            timeline = timelines[unit_id]
+            if unit_id == skip or not timeline.fits(start, end):
+                continue
+            orphaned, slack = timeline.placement_cost(start, end, min_gap_nights)
+            key = (orphaned, capacity[unit_id] - guests[booking_id], slack, order[unit_id])
+            if best is None or key < best[0]:
+                best = (key, unit_id)
+        return best[1] if best else None
+
+    def place(booking_id: int, unit_id: int):
+        start, end, _ = stays[booking_id]
+        timelines[unit_id].insert(start, end, booking_id)
+        placed[booking_id] = unit_id
+
+    def unplace(booking_id: int):
+        timelines[placed.pop(booking_id)].remove(booking_id)
+
+    # Longest stays first, then larger parties, which have fewer units to choose from
+    queue = sorted(stays, key=lambda booking_id: (stays[booking_id][0] - stays[booking_id][1],
+                                                 -guests[booking_id], stays[booking_id][0], booking_id))
+    for booking_id in queue:
+        unit_id = best_unit(booking_id)
+        if unit_id is not None:
+            place(booking_id, unit_id)
+
+    # Repair: free a unit for a leftover inquiry by moving the planned inquiries in its way
+    for _ in range(_REPAIR_PASSES):
+        progress = False
+        for booking_id in queue:
+            if booking_id in placed:
+                continue
+            start, end, eligible = stays[booking_id]
+            for unit_id in eligible:
+                timeline = timelines[unit_id]
+                movers = [timeline.owners[i] for i in timeline.overlapping(start, end)]
+                if not movers or None in movers:
+                    continue
+                for mover in movers:
+                    unplace(mover)
+                place(booking_id, unit_id)
+                moved = {}
+                for mover in movers:
+                    target = best_unit(mover, skip=unit_id)
+                    if target is None:
+                        break
+                    place(mover, target)
+                    moved[mover] = target
+                if len(moved) == len(movers):
+                    progress = True
+                    break
+                # Undo: the movers go back where they were
+                for mover in moved:
+                    unplace(mover)
+                unplace(booking_id)
+                for mover in movers:
+                    place(mover, unit_id)
+        if not progress:
+            break
+
+    units_by_id = {unit['id']: unit for unit in units}
+    assignments, unassigned = [], []
+    requested_nights = 0
+    for inquiry in sorted(inquiries, key=lambda inquiry: (str(inquiry['check_in']), inquiry['id'])):
+        if inquiry['id'] not in stays:
+            unassigned.append(dict(inquiry, reason="Check-out is not after check-in"))
+            continue
+        start, end, eligible = stays[inquiry['id']]
+        requested_nights += end - start
+        unit_id = placed.get(inquiry['id'])
+        if unit_id is None:
+            reason = "No free unit for these dates" if eligible else "No unit suits this party"
+            unassigned.append(dict(inquiry, reason=reason))
+            continue
+        assignments.append({
+            'booking_id': inquiry['id'],
+            'lodging_unit_id': unit_id,
+            'unit_name': units_by_id[unit_id]['name'],
+            'location': units_by_id[unit_id]['location'],
+            'guest_name': inquiry['guest_name'],
+            'guests': inquiry['guests'],
+            'check_in': inquiry['check_in'],
+            'check_out': inquiry['check_out'],
+            'nights': end - start,
+        })
+
+    orphan_nights_after = sum(timeline.orphan_nights(min_gap_nights) for timeline in timelines.values())
+    return AssignmentPlan(assignments, unassigned, requested_nights, orphan_nights_before, orphan_nights_after)
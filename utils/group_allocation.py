@@ -0,0 +1,115 @@
+"""
+Multi-unit allocation for group (retreat) bookings
+
+A party larger than any single free unit needs a set of units whose
+combined capacity covers it. find_group_allocations() searches the free
+units for minimal such sets (no unit could be dropped), ranked by fewest
+units, then fewest locations, then least spare capacity.
+
+Units with the same location and capacity are interchangeable, so the
+search runs over those classes (how many units to take from each) rather
+than over individual units. It is a depth-first branch and bound: classes
+are tried largest capacity first and a branch is cut as soon as even the
+largest remaining units cannot cover the party. A node budget bounds the
+work however many units are added.
+"""
+
+import heapq
+from typing import Dict, List, Optional
+
+# Most units one group may be spread across
+MAX_GROUP_UNITS = 8
+
+# Search nodes explored per call before returning the best sets found so far
+_NODE_BUDGET = 20000
+
+
+def split_guests(units: List[Dict], guests: int) -> List[int]:
+    """Guests per unit, filling the largest units first"""
+    remaining = guests
+    split = [0] * len(units)
+    for i in sorted(range(len(units)), key=lambda i: -(units[i].get('capacity') or 0)):
+        split[i] = min(remaining, units[i].get('capacity') or 0)
+        remaining -= split[i]
+    return split
+
+
+def find_group_allocations(units: List[Dict], guests: int, location: Optional[str] = None,
+                           limit: int = 5, min_units: int = 1, max_units: int = MAX_GROUP_UNITS) -> List[Dict]:
+    """
+    Ranked sets of units whose combined capacity covers guests
+
+    units are the free units for the stay, in display order; location limits
+    the sets to one location and min_units skips smaller sets. Each result has 'units' (in display order),
+    'capacity', 'spare' and 'locations'.
+    """
+    units = [unit for unit in units if (unit.get('capacity') or 0) > 0
+             and (not location or unit.get('location') == location)]
+
+    classes: Dict[tuple, List[Dict]] = {}
+    for unit in units:
+        classes.setdefault((unit['location'], unit['capacity']), []).append(unit)
+    keys = sorted(classes, key=lambda key: -key[1])
+    counts = [len(classes[key]) for key in keys]
+
+    found = []   # max-heap on the ranking key, holding the best `limit` sets
+    nodes = 0
+
+    def best_reach(i: int, slots: int) -> int:
+        """Most capacity `slots` more units from classes i.. can add"""
+        reach = 0
+        for j in range(i, len(keys)):
+            take = min(slots, counts[j])
+            reach += take * keys[j][1]
+            slots -= take
+            if not slots:
+                break
+        return reach
+
+    def search(i: int, slots: int, capacity: int, chosen: List[int], locations: frozenset, smallest: int):
+        nonlocal nodes
+        nodes += 1
+        if capacity >= guests:
+            # Only minimal sets: without their smallest unit they would fall short
+            if capacity - smallest >= guests or sum(chosen) < min_units:
+                return
+            key = (sum(chosen), len(locations), capacity - guests)
+            entry = (tuple(-k for k in key), tuple(chosen))
+            if len(found) < limit:
+                heapq.heappush(found, entry)
+            elif entry > found[0]:
+                heapq.heapreplace(found, entry)
+            return
+        if i == len(keys) or not slots or nodes > _NODE_BUDGET:
+            return
+        # Bound: even the largest remaining units cannot cover the party
+        if capacity + best_reach(i, slots) < guests:
+            return
+        if len(found) == limit:
+            worst_units, worst_locations = -found[0][0][0], -found[0][0][1]
+            if (sum(chosen) + 1, len(locations)) > (worst_units, worst_locations):
+                return
+        for take in range(min(slots, counts[i]), -1, -1):
+            chosen.append(take)
+            search(i + 1, slots - take, capacity + take * keys[i][1], chosen,
+                   locations | {keys[i][0]} if take else locations,
+                   keys[i][1] if take else smallest)
+            chosen.pop()
+
+    search(0, max_units, 0, [], frozenset(), 0)
+
+    order = {id(unit): position for position, unit in enumerate(units)}
+    allocations = []
+    for ranking, chosen in sorted(found, reverse=True):
+        picked = []
+        for key, take in zip(keys, chosen):
+            picked.extend(classes[key][:take])
+        picked.sort(key=lambda unit: order[id(unit)])
+        capacity = sum(unit['capacity'] for unit in picked)
+        allocations.append({
+            'units': [dict(unit) for unit in picked],
+            'capacity': capacity,
+            'spare': capacity - guests,
+            'locations': sorted({unit['location'] for unit in picked}),
+        })
+    return allocations
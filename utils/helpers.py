@@ -1,9 +1,11 @@
 import streamlit as st
+import altair as alt
 from datetime import datetime, date, timedelta
 from typing import List, Dict, Tuple, Optional
 import pandas as pd
 import logging
 from functools import wraps
+from database.connection import BookingConflictError, DatabaseUnavailableError, in_transaction
 
 def validate_email(email: str) -> bool:
     """Enhanced email validation with better pattern matching"""
@@ -191,54 +193,14 @@ def display_lodging_unit_card(unit: Dict, show_capacity: bool = True):
         </div>
         """, unsafe_allow_html=True)
 
-def create_availability_calendar(units: List[Dict], bookings: List[Dict], days_ahead: int = 30) -> pd.DataFrame:
-    """Create availability calendar data with enhanced booking conflict detection"""
-    today = date.today()
-    dates = [today + timedelta(days=i) for i in range(days_ahead)]
-    
-    calendar_data = []
-    for unit in units:
-        for date_item in dates:
-            # Enhanced availability check
-            is_available = True
-            booking_info = None
-            
-            for booking in bookings:
-                if (booking.get('lodging_unit_id') == unit['id'] and 
-                    booking.get('status') in ['confirmed', 'pending'] and
-                    booking.get('check_in') and booking.get('check_out')):
-                    
-                    # Convert string dates to date objects if needed
-                    check_in = booking['check_in']
-                    check_out = booking['check_out']
-                    if isinstance(check_in, str):
-                        check_in = datetime.strptime(check_in, '%Y-%m-%d').date()
-                    if isinstance(check_out, str):
-                        check_out = datetime.strptime(check_out, '%Y-%m-%d').date()
-                    
-                    if check_in <= date_item < check_out:
-                        is_available = False
-                        booking_info = {
-                            'guest_name': booking.get('guest_name', 'Reserved'),
-                            'status': booking.get('status', 'unknown'),
-                            'booking_type': booking.get('booking_type', '')
-                        }
-                        break
-            
-            calendar_data.append({
-                'unit_id': unit['id'],
-                'unit_name': unit['name'],
-                'location': unit['location'],
-                'capacity': unit['capacity'],
-                'date': date_item,
-                'available': is_available,
-                'booking_info': booking_info
-            })
-    
-    return pd.DataFrame(calendar_data)
+def create_availability_calendar(units: List[Dict], bookings: List[Dict], days_ahead: int = 30,
+                                 blocked: Optional[List[Dict]] = None) -> pd.DataFrame:
+    """Create availability calendar data (one row per unit and day) from the occupancy matrix"""
+    from utils.occupancy import build_occupancy_matrix
+    return build_occupancy_matrix(units, bookings, days=days_ahead, blocked=blocked).to_dataframe()
 
 def create_visual_calendar(availability_df: pd.DataFrame, selected_location: str = None) -> None:
-    """Create a visual calendar display for availability"""
+    """Render the availability calendar as one heatmap (units x days) with hover details"""
     # Filter by location if specified
     if selected_location:
         availability_df = availability_df[availability_df['location'] == selected_location]
@@ -247,47 +209,40 @@ def create_visual_calendar(availability_df: pd.DataFrame, selected_location: str
         st.warning("No availability data to display")
         return
     
-    # Get unique dates and units
-    dates = sorted(availability_df['date'].unique())
-    units = availability_df[['unit_id', 'unit_name', 'location']].drop_duplicates()
-    
-    # Create calendar grid
     st.subheader(f"Availability Calendar - {selected_location or 'All Locations'}")
-    
-    # Date header
-    cols = st.columns([2] + [1] * min(len(dates), 14))  # Show up to 14 days
-    cols[0].write("**Unit**")
-    
-    for i, date_item in enumerate(dates[:14]):  # Limit to first 14 days for display
-        cols[i+1].write(f"**{date_item.strftime('%m/%d')}**")
-    
-    # Unit rows
-    for _, unit in units.iterrows():
-        cols = st.columns([2] + [1] * 14)
-        cols[0].write(f"{unit['unit_name']} ({unit['location']})")
-        
-        unit_availability = availability_df[availability_df['unit_id'] == unit['unit_id']]
-        
-        for i, date_item in enumerate(dates[:14]):
-            day_data = unit_availability[unit_availability['date'] == date_item]
-            
-            if not day_data.empty:
-                is_available = day_data.iloc[0]['available']
-                if is_available:
-                    cols[i+1].success("✓")
-                else:
-                    booking_info = day_data.iloc[0]['booking_info']
-                    if booking_info and booking_info['status'] == 'pending':
-                        cols[i+1].warning("⏳")
-                    else:
-                        cols[i+1].error("✗")
-            else:
-                cols[i+1].write("-")
-    
-    # Legend
-    st.markdown("""
-    **Legend:** ✓ Available | ✗ Booked | ⏳ Pending | - No data
-    """)
+
+    info = availability_df['booking_info']
+    if 'status' in availability_df:
+        status = availability_df['status']
+    else:
+        status = info.map(lambda b: b['status'] if b else 'blocked').where(~availability_df['available'], 'free')
+    chart_df = pd.DataFrame({
+        'unit': availability_df['unit_name'] + " (" + availability_df['location'] + ")",
+        'day': pd.to_datetime(availability_df['date']),
+        'status': status,
+        'guest': info.map(lambda b: b.get('guest_name', '') if b else ''),
+        'booking_type': info.map(lambda b: b.get('booking_type', '') if b else ''),
+    })
+    unit_order = list(dict.fromkeys(chart_df['unit']))
+
+    chart = alt.Chart(chart_df).mark_rect(stroke='white', strokeWidth=1).encode(
+        x=alt.X('yearmonthdate(day):O', title=None,
+                axis=alt.Axis(format='%m/%d', labelAngle=0, orient='top')),
+        y=alt.Y('unit:N', sort=unit_order, title=None),
+        color=alt.Color('status:N', title=None, legend=alt.Legend(orient='bottom'), scale=alt.Scale(
+            domain=['free', 'pending', 'confirmed', 'blocked'],
+            range=['#c8e6c9', '#ffe082', '#ef9a9a', '#b0bec5'],
+        )),
+        tooltip=[
+            alt.Tooltip('unit:N', title='Unit'),
+            alt.Tooltip('day:T', title='Date', format='%a %b %d'),
+            alt.Tooltip('status:N', title='Status'),
+            alt.Tooltip('guest:N', title='Guest'),
+            alt.Tooltip('booking_type:N', title='Type'),
+        ],
+    ).properties(height=max(22 * len(unit_order), 120))
+
+    st.altair_chart(chart, use_container_width=True)
 
 def format_booking_status(status: str) -> str:
     """Format booking status with emoji (no HTML)"""
@@ -360,12 +315,28 @@ def sanitize_input(text: str, max_length: int = 1000) -> str:
     return text
 
 def safe_database_operation(func):
-    """Decorator for safe database operations with error handling"""
+    """
+    Decorator for safe database operations with error handling
+
+    Inside an outer transaction() block errors are re-raised instead, so the
+    block rolls back rather than committing the helpers that did succeed.
+    """
     @wraps(func)
     def wrapper(*args, **kwargs):
         try:
             return func(*args, **kwargs)
+        except BookingConflictError:
+            # The caller tells the user what to pick instead
+            raise
+        except DatabaseUnavailableError as e:
+            if in_transaction():
+                raise
+            logging.error(f"Database unavailable: {str(e)}")
+            st.error("The booking database is temporarily unavailable. Please try again in a minute.")
+            return None
         except Exception as e:
+            if in_transaction():
+                raise
             logging.error(f"Database operation failed: {str(e)}")
             st.error("A database error occurred. Please try again or contact support.")
             return None
@@ -402,8 +373,10 @@ def format_error_message(error: str, context: str = None) -> str:
         return f"❌ {context}: {error}"
     return f"❌ {error}"
 
-def get_availability_summary(availability_df: pd.DataFrame) -> Dict[str, int]:
-    """Get availability summary statistics"""
+def get_availability_summary(availability_df) -> Dict[str, int]:
+    """Get availability summary statistics from an OccupancyMatrix or calendar DataFrame"""
+    if hasattr(availability_df, 'summary'):
+        return availability_df.summary()
     if availability_df.empty:
         return {}
     